@@ -1,6 +1,9 @@
-from basyx.aas import model
 import FPD2AAS_Functions as func
-from datetime import datetime
+import FPD_Model
+import FPD_Mapping
+
+# Kept here for callers that used FPD.parse_datetime
+parse_datetime = FPD_Model.parse_datetime
 
 # -------------------------------
 # Extract project, process, and elements from FPD data
@@ -8,13 +11,81 @@ from datetime import datetime
 def extract_data(fpd_data):
     """
     Extracts project, process, and element information from FPD JSON data.
+    The elements are decoded into FPD_Model objects and returned as an
+    ElementIndex, both in a single pass.
     """
     project = fpd_data[0]
     info = fpd_data[1]
     process = info["process"]
-    elements = info["elementDataInformation"]
+    elements = ElementIndex(info["elementDataInformation"])
     return project, process, elements
 
+# -------------------------------
+# FPD element types mapped to the process collection
+# -------------------------------
+STATE_TYPES = ("Product", "Energy", "Information")
+
+# -------------------------------
+# Index of elements by id and by $type suffix
+# -------------------------------
+class ElementIndex:
+    """
+    Single-pass index over the FPD elements, decoded into FPD_Model objects.
+    Maps each id to its element and each $type suffix (e.g. "Product") to the
+    elements of that type, in input order. Iterating the index yields the
+    decoded elements in their original order.
+    """
+
+    def __init__(self, elements=()):
+        self.elements = []
+        self.by_id = {}
+        self.by_type = {}
+        for el in elements:
+            self.add(el)
+
+    def add(self, el):
+        """
+        Adds a single element (JSON or already decoded) to the index.
+        """
+        el = FPD_Model.decode(el)
+        self.elements.append(el)
+        self.by_id.setdefault(el.id, el)
+        self.by_type.setdefault(el.type, []).append(el)
+
+    def of_type(self, t):
+        """
+        Returns the elements whose $type ends with the given suffix.
+        """
+        suffixes = [k for k in self.by_type if k.endswith(t)]
+        if not suffixes:
+            return []
+        if suffixes == [t]:
+            return self.by_type[t]
+        # Several buckets match; scan once to keep the input order
+        return [el for el in self.elements if el.type.endswith(t)]
+
+    def name_of(self, element_id):
+        """
+        Returns the name of the element with the given id, or None if unknown.
+        """
+        el = self.by_id.get(element_id)
+        return el.name if el is not None else None
+
+    def __iter__(self):
+        return iter(self.elements)
+
+    def __len__(self):
+        return len(self.elements)
+
+    def __getitem__(self, i):
+        return self.elements[i]
+
+def _as_index(elements):
+    """
+    Returns the given elements as an ElementIndex, building one if needed.
+    """
+    return elements if isinstance(elements, ElementIndex) else ElementIndex(elements)
+
 # -------------------------------
 # Add project information to submodel
 # -------------------------------
@@ -33,240 +104,147 @@ def add_project_info(project):
 def get_elements_by_type(elements, t):
     """
     Helper function to filter elements by their $type suffix.
+    Returns the decoded elements.
     """
-    return [el for el in elements if el["$type"].endswith(t)]
+    return _as_index(elements).of_type(t)
 
 # -------------------------------
-# Add state information (Product, Energy, Information) to process collection
+# Elements of the process collection in process order
 # -------------------------------
-def add_state_info(elements, smc_process):
+def mapped_elements(elements):
     """
-    Adds state information (Product, Energy, Information) to the process collection.
+    Yields the decoded elements of the process collection in process order
+    (the order of FPD_Mapping.MAPPINGS).
     """
-    for state_type in ["Product", "Energy", "Information"]:
-        for el in get_elements_by_type(elements, state_type):
-            assigned_to = el.get("isAssignedTo", [])
-            assigned_to_str = ",".join(assigned_to) if assigned_to else None
-            characs = el.get("characteristics", [])
-            if characs:
-                ch = characs[0]  # Use only the first characteristic
-                category = ch.get("category", {})
-                desc = ch.get("descriptiveElement", {})
-                rel = ch.get("relationalElement", {})
-                validity = desc.get("validityLimits", [{}])[0]
-
-                smc_state = func.create_state_collection(
-                    id_short_smc=el["name"],
-                    unique_ident_ident=el["id"],
-                    long_name_ident=el["identification"].get("longName", ""),
-                    short_name_ident=el["identification"].get("shortName", ""),
-                    version_ident=el["identification"].get("versionNumber", ""),
-                    revision_ident=el["identification"].get("revisionNumber", ""),
-
-                    unique_ident=category.get("uniqueIdent", ""),
-                    long_name=category.get("longName", ""),
-                    short_name=category.get("shortName", ""),
-                    version=category.get("versionNumber", ""),
-                    revision=category.get("revisionNumber", ""),
-
-                    prop_view=rel.get("view", ""),
-                    prop_model=rel.get("model", ""),
-                    prop_regulation=rel.get("regulationsForRelationalGeneration", ""),
+    elements = _as_index(elements)
+    for t in FPD_Mapping.BUILDERS:
+        yield from get_elements_by_type(elements, t)
 
-                    value_determination_process=desc.get("valueDeterminationProcess", ""),
-                    representivity=desc.get("representivity", ""),
-
-                    value_actual_value=float(desc.get("actualValues", {}).get("value", 0)),
-                    unit_actual_value=desc.get("actualValues", {}).get("unit", ""),
-                    value_setpoint=float(desc.get("setpointValue", {}).get("value", 0)),
-                    unit_setpoint=desc.get("setpointValue", {}).get("unit", ""),
-
-                    limit_type=desc.get("validityLimits", [{}])[0].get("limitType", ""),
-                    from_date=parse_datetime(validity.get("from")),
-                    to_date=parse_datetime(validity.get("to")),
-                    assignment=assigned_to_str
-                )
-            else:
-                # If no characteristics, create state collection with basic info
-                smc_state = func.create_state_collection(
-                    id_short_smc=el["name"],
-                    unique_ident_ident=el["id"],
-                    long_name_ident=el["identification"].get("longName", ""),
-                    short_name_ident=el["identification"].get("shortName", ""),
-                    version_ident=el["identification"].get("versionNumber", ""),
-                    revision_ident=el["identification"].get("revisionNumber", ""),
-                    assignment=assigned_to_str
-                )
+# -------------------------------
+# Build the collection of a single element
+# -------------------------------
+def build_collection(el, trusted=False):
+    """
+    Builds the process collection entry of a decoded element with the builder
+    compiled from FPD_Mapping.MAPPINGS for its type. With trusted the basyx
+    checks are skipped; only for input that passed FPD_Validate.
+    """
+    return FPD_Mapping.BUILDERS[el.type].build(el, trusted)
 
-            # Explicitly set the stateType property after creation
-            for elem in smc_state.value:
-                if isinstance(elem, model.Property) and elem.id_short == "stateType":
-                    elem.value = state_type
-                    break
+# -------------------------------
+# Add state information (Product, Energy, Information) to process collection
+# -------------------------------
+def add_state_info(elements, smc_process, trusted=False):
+    """
+    Adds state information (Product, Energy, Information) to the process collection.
+    The collections are built first and inserted in bulk (see func.add_all).
+    """
+    elements = _as_index(elements)
+    func.add_all(smc_process, [build_collection(el, trusted)
+                               for state_type in STATE_TYPES
+                               for el in get_elements_by_type(elements, state_type)])
 
-            smc_process.add_referable(smc_state)
 
 # -------------------------------
 # Add process operator information to process collection
 # -------------------------------
-def add_process_operator_info(elements, smc_process):
+def add_process_operator_info(elements, smc_process, trusted=False):
     """
     Adds process operator information to the process collection.
     """
-    for op in get_elements_by_type(elements, "ProcessOperator"):
-        assigned_to = op.get("isAssignedTo", [])
-        assigned_to_str = ",".join(assigned_to) if assigned_to else None
-        characteristics = op.get("characteristics", [])
-        if characteristics:
-            ch = characteristics[0]
-            cat = ch.get("category", {})
-            desc = ch.get("descriptiveElement", {})
-            rel = ch.get("relationalElement", {})
-            validity = desc.get("validityLimits", [{}])[0]
-        else:
-            ch = {}
-            cat = {}
-            desc = {}
-            rel = {}
-            validity = {}
-
-        smc_op = func.create_process_operator_collection(
-            id_short_smc=op["name"].strip(),
-            unique_ident_ident=op["id"],
-            long_name_ident=op["identification"].get("longName", ""),
-            short_name_ident=op["identification"].get("shortName", "").strip(),
-            version_ident=op["identification"].get("versionNumber", ""),
-            revision_ident=op["identification"].get("revisionNumber", ""),
-
-            unique_ident=cat.get("uniqueIdent", ""),
-            long_name=cat.get("longName", ""),
-            short_name=cat.get("shortName", ""),
-            version=cat.get("versionNumber", ""),
-            revision=cat.get("revisionNumber", ""),
-
-            prop_view=rel.get("view", ""),
-            prop_model=rel.get("model", ""),
-            prop_regulation=rel.get("regulationsForRelationalGeneration", ""),
-
-            value_determination_process=desc.get("valueDeterminationProcess", ""),
-            representivity=desc.get("representivity", ""),
-
-            value_actual_value=float(desc.get("actualValues", {}).get("value", 0)),
-            unit_actual_value=desc.get("actualValues", {}).get("unit", ""),
-            value_setpoint=float(desc.get("setpointValue", {}).get("value", 0)),
-            unit_setpoint=desc.get("setpointValue", {}).get("unit", ""),
-
-            limit_type=validity.get("limitType", ""),
-            from_date=parse_datetime(validity.get("from")),
-            to_date=parse_datetime(validity.get("to")),
-            assignment=assigned_to_str
-        )
-        smc_process.add_referable(smc_op)
+    elements = _as_index(elements)
+    func.add_all(smc_process, [build_collection(op, trusted)
+                               for op in get_elements_by_type(elements, "ProcessOperator")])
 
 
 # -------------------------------
 # Add technical resource information to process collection
 # -------------------------------
-def add_technical_resource_info(elements, smc_process):
+def add_technical_resource_info(elements, smc_process, trusted=False):
     """
     Adds technical resource information to the process collection.
     """
-    for tr in get_elements_by_type(elements, "TechnicalResource"):
-        assigned_to = tr.get("isAssignedTo", [])
-        assigned_to_str = ",".join(assigned_to) if assigned_to else None
-        characteristics = tr.get("characteristics", [])
-        if characteristics:
-            ch = characteristics[0]
-            cat = ch.get("category", {})
-            desc = ch.get("descriptiveElement", {})
-            rel = ch.get("relationalElement", {})
-            validity = desc.get("validityLimits", [{}])[0]
-        else:
-            ch = {}
-            cat = {}
-            desc = {}
-            rel = {}
-            validity = {}
-
-        smc_tr = func.create_technical_resource_collection(
-            id_short_smc=tr["name"],
-            unique_ident_ident=tr["id"],
-            long_name_ident=tr["identification"].get("longName", ""),
-            short_name_ident=tr["identification"].get("shortName", ""),
-            version_ident=tr["identification"].get("versionNumber", ""),
-            revision_ident=tr["identification"].get("revisionNumber", ""),
-
-            unique_ident=cat.get("uniqueIdent", ""),
-            long_name=cat.get("longName", ""),
-            short_name=cat.get("shortName", ""),
-            version=cat.get("versionNumber", ""),
-            revision=cat.get("revisionNumber", ""),
-
-            prop_view=rel.get("view", ""),
-            prop_model=rel.get("model", ""),
-            prop_regulation=rel.get("regulationsForRelationalGeneration", ""),
-
-            value_determination_process=desc.get("valueDeterminationProcess", ""),
-            representivity=desc.get("representivity", ""),
-
-            value_actual_value=float(desc.get("actualValues", {}).get("value", 0)),
-            unit_actual_value=desc.get("actualValues", {}).get("unit", ""),
-            value_setpoint=float(desc.get("setpointValue", {}).get("value", 0)),
-            unit_setpoint=desc.get("setpointValue", {}).get("unit", ""),
-
-            limit_type=validity.get("limitType", ""),
-            from_date=parse_datetime(validity.get("from")),
-            to_date=parse_datetime(validity.get("to")),
-            assignment=assigned_to_str
-        )
-        smc_process.add_referable(smc_tr)
+    elements = _as_index(elements)
+    func.add_all(smc_process, [build_collection(tr, trusted)
+                               for tr in get_elements_by_type(elements, "TechnicalResource")])
 
 
 # -------------------------------
-# Add flow connections between process elements
+# Resolve flow or usage endpoints to element names
 # -------------------------------
-def add_flows(elements, sml_flows):
+def resolve_relations(elements, t):
     """
-    Adds flow connections between process elements to the flows list.
+    Yields (source name, target name) for each relation element of type t
+    ("Flow" or "Usage") whose endpoints can both be resolved.
     """
-    for flow in get_elements_by_type(elements, "Flow"):
+    elements = _as_index(elements)
+    for relation in get_elements_by_type(elements, t):
         # Find source and target element names by their IDs
-        src = next((el["name"] for el in elements if el["id"] == flow["sourceRef"]), None)
-        tgt = next((el["name"] for el in elements if el["id"] == flow["targetRef"]), None)
+        src = elements.name_of(relation.source)
+        tgt = elements.name_of(relation.target)
         if src and tgt:
-            flow_col = func.add_flow("FPD", src, tgt)
-            sml_flows.add_referable(flow_col)
-            
-            
+            yield src, tgt
+
 # -------------------------------
-# Add usage connections between process elements
+# Add flow connections between process elements
 # -------------------------------
-def add_usages(elements, sml_usages):
+def add_flows(elements, sml_flows, trusted=False):
     """
-    Adds usage connections between process elements to the usages list.
+    Adds flow connections between process elements to the flows list.
+    With trusted they are stamped from func.flow_template without the basyx checks.
     """
-    for usage in get_elements_by_type(elements, "Usage"):
-        # Find source and target element names by their IDs
-        src = next((el["name"] for el in elements if el["id"] == usage["sourceRef"]), None)
-        tgt = next((el["name"] for el in elements if el["id"] == usage["targetRef"]), None)
-        if src and tgt:
-            usage_col = func.add_usage("FPD", src, tgt)
-            sml_usages.add_referable(usage_col)
+    add_flow = func.flow_template.stamp if trusted else func.add_flow
+    func.add_all(sml_flows, [add_flow("FPD", src, tgt) for src, tgt in resolve_relations(elements, "Flow")])
+
 
 # -------------------------------
-# Parse a datetime string or timestamp to a datetime object
+# Add usage connections between process elements
 # -------------------------------
-def parse_datetime(value):
-    """
-    Parses a datetime string or timestamp to a datetime object.
-    Returns None if parsing fails.
+def add_usages(elements, sml_usages, trusted=False):
     """
-    try:
-        if isinstance(value, str):
-            return datetime.fromisoformat(value)
-        elif isinstance(value, int) or isinstance(value, float):
-            # Optionally interpret int/float as Unix timestamp
-            return datetime.fromtimestamp(value)
-    except Exception:
-        return None
-    return None
\ No newline at end of file
+    Adds usage connections between process elements to the usages list.
+    With trusted they are stamped from func.usage_template without the basyx checks.
+    """
+    add_usage = func.usage_template.stamp if trusted else func.add_usage
+    func.add_all(sml_usages, [add_usage("FPD", src, tgt) for src, tgt in resolve_relations(elements, "Usage")])
+
+# -------------------------------
+# Add all elements from a stream of FPD elements
+# -------------------------------
+def add_element_stream(elements, smc_process, sml_flows, sml_usages, trusted=False):
+    """
+    Adds states, process operators, technical resources, flows and usages from
+    an iterator of FPD elements (e.g. an FPD_Stream.FPDStream).
+    Each element is decoded and mapped as soon as it is read and then released; only the
+    built collections, the id to name map and the flow/usage endpoint ids are
+    kept. The result is identical to calling the add_* functions in turn.
+    With trusted the basyx checks are skipped (see build_collection).
+    """
+    names = {}
+    built = {t: [] for t in FPD_Mapping.BUILDERS}
+    flows = []
+    usages = []
+    for el in elements:
+        el = FPD_Model.decode(el)
+        t = el.type
+        names.setdefault(el.id, el.name)
+        if t in built:
+            built[t].append(build_collection(el, trusted))
+        elif t == "Flow":
+            flows.append((el.source, el.target))
+        elif t == "Usage":
+            usages.append((el.source, el.target))
+
+    # Keep the order of the non-streaming path (the order of FPD_Mapping.MAPPINGS)
+    func.add_all(smc_process, [smc for collections in built.values() for smc in collections])
+    built.clear()
+
+    for endpoints, sml, add in ((flows, sml_flows, func.flow_template.stamp if trusted else func.add_flow),
+                                (usages, sml_usages, func.usage_template.stamp if trusted else func.add_usage)):
+        collections = []
+        for source_ref, target_ref in endpoints:
+            src = names.get(source_ref)
+            tgt = names.get(target_ref)
+            if src and tgt:
+                collections.append(add("FPD", src, tgt))
+        func.add_all(sml, collections)
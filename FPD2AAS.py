@@ -1,80 +1,549 @@
 # FPD to AAS Conversion Script
 # ---------------------------------------------
 # Automated/JSON-driven version below
+# Usage: python FPD2AAS.py [-o OUTPUT_DIR] [-j JOBS] [--stream] [--direct] [--json]
+#                          [--cache DIR [--cache-size MB]] [--metrics FILE [--metrics-format F]]
+#                          [--profile] [--trace-memory] [--columnar] [--graph]
+#                          [--split MODE [--split-size N]] [--validate] [--trusted]
+#                          [--select-id ID] [--select-type TYPE] [--assigned-to ID [--assigned-depth N]]
+#                          INPUT [INPUT ...]
+# Each INPUT is an FPD JSON file, a glob pattern or a directory of *.json files.
+# With a selection only those elements are converted, read through the offset
+# index saved next to each input (see FPD_Index).
 # ---------------------------------------------
 
+import argparse
+import glob
 import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from basyx.aas import model
 from basyx.aas.adapter import aasx
 import FPD2AAS_Functions as func  # Custom module for AAS functions
 import FPD                      # Custom module for FPD data extraction
+import FPD_Stream               # Streaming reader for large FPD files
+import FPD2AAS_Emit             # Direct XML/JSON emitter
+import FPD2AAS_Cache            # Per-element cache for incremental conversion
+import FPD2AAS_Metrics          # Stage timings, counters and profiling
+import FPD_Split                # Output split into several submodels
+import FPD_Validate             # Single-pass input validation
+import FPD_Index                # Offset index for partial conversion
 
 # -------------------------------
-# Define file paths for input/output
+# Build AAS and Submodel from an FPD JSON file
 # -------------------------------
-path_json = r"C:\Users\Rezaee\Desktop\Files\RUB\Paper\5 - ONCON 2025\code\FPD.json"
-path_aasx = r"C:\Users\Rezaee\Desktop\Files\RUB\Paper\5 - ONCON 2025\code\AAS.aasx"
+def build_aas(path_json, stream_input=False, metrics=None, file_store=None, columnar=True, graph=False,
+              validate=False, trusted=False, select=None):
+    """
+    Builds the Asset Administration Shell and the FPD submodel for an FPD JSON file.
+    With stream_input the elements are read and mapped one at a time.
+    A FPD2AAS_Metrics.Metrics object, if given, receives the stage timings and counts.
+    With a file_store, the columnar table of all characteristics (unless columnar
+    is False) and with graph the index of flows and usages are stored in it and
+    referenced from the submodel (see FPD_Columnar and FPD_Graph).
+    With validate the input is checked first and a FPD_Validate.ValidationError
+    lists all problems; valid input is then built without the per-element basyx
+    checks, as with trusted (for input that is known to be valid).
+    With a FPD_Index.Selection only the selected elements and the flows and
+    usages between them are read and built (stream_input is then ignored).
+    """
+    metrics = metrics if metrics is not None else FPD2AAS_Metrics.Metrics()
+    table, graph = _supplements(file_store, columnar, graph)
+    stream_input = stream_input and select is None
+    if validate and stream_input:
+        _validate(path_json, None, None, stream_input, metrics)
+    trusted = trusted or validate
 
-# -------------------------------
-# Load FPD data from JSON file
-# -------------------------------
-with open(path_json, 'r', encoding='utf-8') as f:
-    fpd_data = json.load(f)
+    # -------------------------------
+    # Create AAS and Submodel
+    # -------------------------------
+    aas = func.create_fpd_aas('FPD_AAS')              # Create Asset Administration Shell
+    submodel = func.create_fpd_submodel('FPD')        # Create main Submodel
+    smc_process = func.create_process_collection('process')
+    sml_flows = func.create_flows_list()              # Create flows list
+    sml_usages = func.create_usages_list()              # Create usages list
 
-# -------------------------------
-# Extract project, process, and elements from FPD data
-# -------------------------------
-project, process, elements = FPD.extract_data(fpd_data)
+    if stream_input:
+        # -------------------------------
+        # Stream elements from the JSON file and map them one at a time
+        # -------------------------------
+        with metrics.stage("load"):
+            stream = FPD_Stream.FPDStream(path_json)
+        with metrics.stage("add_project_info"):
+            smc_project_information = FPD.add_project_info(stream.project)
+        elements = metrics.counted(stream)
+        if table is not None:
+            elements = table.collect(elements)
+        if graph is not None:
+            elements = graph.collect(elements)
+        with metrics.stage("add_element_stream"):
+            FPD.add_element_stream(elements, smc_process, sml_flows, sml_usages, trusted)
+    else:
+        # -------------------------------
+        # Load FPD data from JSON file
+        # -------------------------------
+        if select is None:
+            with metrics.stage("load"):
+                with open(path_json, 'r', encoding='utf-8') as f:
+                    fpd_data = json.load(f)
+            known = ()
+        else:
+            fpd_data, known = read_selection(path_json, select, metrics)
+        if validate:
+            _validate(path_json, fpd_data[0], fpd_data[1]["elementDataInformation"], stream_input, metrics, known)
 
-# -------------------------------
-# Create AAS and Submodel
-# -------------------------------
-aas = func.create_fpd_aas('FPD_AAS')              # Create Asset Administration Shell
-submodel = func.create_fpd_submodel('FPD')        # Create main Submodel
+        # -------------------------------
+        # Extract project, process, and elements from FPD data
+        # -------------------------------
+        for el in fpd_data[1]["elementDataInformation"]:
+            metrics.count_element(el)
+            if table is not None:
+                table.add(el)
+            if graph is not None:
+                graph.add(el)
+        with metrics.stage("extract_data"):
+            project, process, elements = FPD.extract_data(fpd_data)
+        del fpd_data                # The builders only need the decoded elements
+
+        # -------------------------------
+        # Add project information to submodel
+        # -------------------------------
+        with metrics.stage("add_project_info"):
+            smc_project_information = FPD.add_project_info(project)
+
+        # -------------------------------
+        # Add state, operator, and resource info to the process collection
+        # -------------------------------
+        with metrics.stage("add_state_info"):
+            FPD.add_state_info(elements, smc_process, trusted)             # Add state info to process
+        with metrics.stage("add_process_operator_info"):
+            FPD.add_process_operator_info(elements, smc_process, trusted)  # Add operator info to process
+        with metrics.stage("add_technical_resource_info"):
+            FPD.add_technical_resource_info(elements, smc_process, trusted) # Add technical resource info
+
+        # -------------------------------
+        # Add flows and usages between process elements
+        # -------------------------------
+        with metrics.stage("add_flows"):
+            FPD.add_flows(elements, sml_flows, trusted)                # Add flows to the list
+        with metrics.stage("add_usages"):
+            FPD.add_usages(elements, sml_usages, trusted)                # Add usages to the list
+
+    metrics.count_relations("Flow", len(sml_flows.value))
+    metrics.count_relations("Usage", len(sml_usages.value))
+
+    # -------------------------------
+    # Add all elements to submodel and link to AAS
+    # -------------------------------
+    submodel.submodel_element.add(smc_project_information)
+    submodel.submodel_element.add(smc_process)
+    submodel.submodel_element.add(sml_flows)
+    submodel.submodel_element.add(sml_usages)
+    _add_supplements(submodel, file_store, table, graph, metrics)
+    aas.submodel.add(model.ModelReference.from_referable(submodel))
+    return aas, submodel
+
+def _validate(path_json, project, elements, stream_input, metrics, known=()):
+    """
+    Checks the input with FPD_Validate and raises its ValidationError listing
+    every problem. A streamed input is read once more for the check.
+    References may name the ids in known (the unselected elements of a partial conversion).
+    """
+    with metrics.stage("validate"):
+        if stream_input:
+            report = FPD_Validate.validate_file(path_json, stream_input=True)
+        else:
+            report = FPD_Validate.validate(project, elements, known)
+    report.raise_for_problems()
+
+def _supplements(file_store, columnar, graph):
+    """
+    Returns the collectors of the supplementary files: (CharacteristicsTable
+    or None, GraphBuilder or None). Both need a file_store.
+    """
+    table = builder = None
+    if file_store is not None:
+        if columnar:
+            import FPD_Columnar  # Optional: needs numpy
+            table = FPD_Columnar.CharacteristicsTable()
+        if graph:
+            import FPD_Graph  # Optional: needs numpy
+            builder = FPD_Graph.GraphBuilder()
+    return table, builder
+
+def _add_supplements(submodel, file_store, table, graph, metrics):
+    """
+    Stores the collected table and graph in file_store and references them from the submodel.
+    """
+    if table is not None:
+        with metrics.stage("columnar"):
+            table.add_to(submodel, file_store)
+        metrics.count("characteristics", len(table))
+    if graph is not None:
+        with metrics.stage("graph"):
+            graph.add_to(submodel, file_store)
+        metrics.count("graph_relations", len(graph))
 
 # -------------------------------
-# Add project information to submodel
+# Build AAS and several Submodels from an FPD JSON file
 # -------------------------------
-smc_project_information = FPD.add_project_info(project)
+def build_split_aas(path_json, mode="size", size=FPD_Split.DEFAULT_PART_SIZE, stream_input=False,
+                    metrics=None, file_store=None, columnar=True, graph=False, validate=False, trusted=False,
+                    select=None):
+    """
+    Builds the Asset Administration Shell with the process split over several
+    FPD submodels and an index submodel (see FPD_Split).
+    Returns the AAS and its submodels, the index submodel first. All elements
+    are indexed before splitting, also with stream_input.
+    The columnar table and the graph (see build_aas) are referenced from the index submodel.
+    validate, trusted and select work as in build_aas.
+    """
+    metrics = metrics if metrics is not None else FPD2AAS_Metrics.Metrics()
+    table, graph = _supplements(file_store, columnar, graph)
+    stream_input = stream_input and select is None
+
+    project, raw, known = _read(path_json, stream_input, select, metrics)
+    if validate:
+        _validate(path_json, project, raw, stream_input, metrics, known)
+    raw = metrics.counted(raw)
+    if table is not None:
+        raw = table.collect(raw)
+    if graph is not None:
+        raw = graph.collect(raw)
+    with metrics.stage("extract_data"):
+        elements = FPD.ElementIndex(raw)
+    del raw
+
+    with metrics.stage("split"):
+        parts, owner = FPD_Split.split_elements(elements, mode, size)
+    with metrics.stage("build_parts"):
+        submodels, counts = FPD_Split.build_parts(parts, owner, elements, trusted or validate)
+    for t, n in counts.items():
+        metrics.count_relations(t, n)
+    metrics.count("submodels", len(submodels))
+
+    aas = func.create_fpd_aas('FPD_AAS')
+    index = FPD_Split.create_index_submodel(project, mode, parts, submodels)
+    _add_supplements(index, file_store, table, graph, metrics)
+    submodels.insert(0, index)
+    for submodel in submodels:
+        aas.submodel.add(model.ModelReference.from_referable(submodel))
+    return aas, submodels
 
 # -------------------------------
-# Create process collection and add state, operator, and resource info
+# Save the AAS and Submodel to AASX file
 # -------------------------------
-smc_process = func.create_process_collection('process')
-FPD.add_state_info(elements, smc_process)             # Add state info to process
-FPD.add_process_operator_info(elements, smc_process)  # Add operator info to process
-FPD.add_technical_resource_info(elements, smc_process) # Add technical resource info
+def write_aasx(aas, submodel, path_aasx, write_json=False, metrics=None, file_store=None):
+    """
+    Writes the AAS and its submodel (or list of submodels) to an AASX package
+    (as XML, or JSON with write_json).
+    Files referenced by File elements of the submodel are taken from file_store.
+    """
+    metrics = metrics if metrics is not None else FPD2AAS_Metrics.Metrics()
+    submodels = list(submodel) if isinstance(submodel, (list, tuple)) else [submodel]
+    object_store = model.DictObjectStore(submodels + [aas])        # Create object store
+    if file_store is None:
+        file_store = aasx.DictSupplementaryFileContainer()         # Create empty file store
+
+    with metrics.stage("write_aasx"):
+        with aasx.AASXWriter(path_aasx) as writer:
+            writer.write_aas(
+                aas_ids=aas.id,
+                object_store=object_store,
+                file_store=file_store,
+                write_json=write_json
+            )
 
 # -------------------------------
-# Add flows between process elements
+# Read project and elements for the direct emitter
 # -------------------------------
-sml_flows = func.create_flows_list()              # Create flows list
-FPD.add_flows(elements, sml_flows)                # Add flows to the list
+def read_fpd(path_json, stream_input=False):
+    """
+    Returns the project and the JSON elements of an FPD JSON file.
+    With stream_input the elements are an FPDStream that is read on demand.
+    """
+    if stream_input:
+        stream = FPD_Stream.FPDStream(path_json)
+        return stream.project, stream
+    with open(path_json, 'r', encoding='utf-8') as f:
+        fpd_data = json.load(f)
+    return fpd_data[0], fpd_data[1]["elementDataInformation"]
+
+def read_selection(path_json, select, metrics=None):
+    """
+    Returns the selected part of an FPD JSON file as a document of the same
+    form (see FPD_Index.Selection) and the set of the ids of all its elements.
+    Only the selected elements are decoded; the offset index is read from
+    next to the file, or built and saved there first.
+    """
+    metrics = metrics if metrics is not None else FPD2AAS_Metrics.Metrics()
+    with metrics.stage("index"):
+        index = FPD_Index.open_index(path_json)
+    with index:
+        with metrics.stage("load"):
+            fpd_data = index.document(select)
+        metrics.count("elements_skipped", len(index) - len(fpd_data[1]["elementDataInformation"]))
+        return fpd_data, set(index.ids)
+
+def _read(path_json, stream_input, select, metrics):
+    """
+    Returns the project, the JSON elements and the ids of unselected elements
+    (see read_fpd and read_selection).
+    """
+    if select is None:
+        with metrics.stage("load"):
+            project, elements = read_fpd(path_json, stream_input)
+        return project, elements, ()
+    fpd_data, known = read_selection(path_json, select, metrics)
+    return fpd_data[0], fpd_data[1]["elementDataInformation"], known
 
 # -------------------------------
-# Add usages between process elements
+# Convert a single FPD JSON file to AASX
 # -------------------------------
-sml_usages = func.create_usages_list()              # Create usages list
-FPD.add_usages(elements, sml_usages)                # Add usages to the list
+def convert_file(path_json, path_aasx, stream_input=False, direct=False, write_json=False,
+                 cache_dir=None, cache_size=FPD2AAS_Cache.DEFAULT_MAX_BYTES,
+                 metrics=None, profile=False, trace_memory=False, columnar=False,
+                 element_jobs=None, shard_size=FPD2AAS_Emit.DEFAULT_SHARD_SIZE,
+                 split=None, split_size=FPD_Split.DEFAULT_PART_SIZE, graph=False,
+                 validate=False, trusted=False, select=None):
+    """
+    Converts one FPD JSON file into an AASX file.
+    With direct the AAS part is emitted straight from the FPD data instead of
+    building and serializing the basyx object graph; the output is the same.
+    A cache_dir enables the per-element cache (and implies direct), so that
+    only changed elements are emitted again.
+    With element_jobs > 1 the elements are rendered in shards of shard_size on
+    that many worker processes (implies direct); the output is the same.
+    Stage timings and counters go to metrics. With profile or trace_memory,
+    cProfile or tracemalloc reports are written next to path_aasx.
+    With columnar, all characteristic values are also stored as a NumPy table
+    in the package (needs numpy). With graph, the CSR index of the flows and
+    usages is stored as well (see FPD_Graph, needs numpy).
+    With split (one of FPD_Split.MODES) the process is split over several
+    submodels plus an index submodel; this builds the basyx object graph and
+    cannot be combined with direct, cache_dir or element_jobs.
+    With validate the input is checked first (see FPD_Validate) and a
+    ValidationError lists all its problems; valid input, and with trusted input
+    that is known to be valid, is built without the per-element basyx checks.
+    The direct emitter keeps its own (cheap) checks.
+    With a FPD_Index.Selection only the selected elements and the flows and
+    usages between them are converted, in every mode; they are read through
+    the offset index next to path_json instead of streaming.
+    """
+    metrics = metrics if metrics is not None else FPD2AAS_Metrics.Metrics()
+    stream_input = stream_input and select is None
+    parallel = element_jobs is not None and element_jobs > 1
+    if split is not None and (direct or cache_dir is not None or parallel):
+        raise ValueError("split output cannot be combined with direct, cache or element jobs")
+    with FPD2AAS_Metrics.profiled(path_aasx, cpu=profile, memory=trace_memory):
+        if split is not None:
+            file_store = aasx.DictSupplementaryFileContainer() if columnar or graph else None
+            aas, submodels = build_split_aas(path_json, split, split_size, stream_input, metrics, file_store,
+                                             columnar, graph, validate, trusted, select)
+            write_aasx(aas, submodels, path_aasx, write_json, metrics, file_store)
+        elif cache_dir is None and not direct and not parallel:
+            file_store = aasx.DictSupplementaryFileContainer() if columnar or graph else None
+            aas, submodel = build_aas(path_json, stream_input, metrics, file_store, columnar, graph,
+                                      validate, trusted, select)
+            write_aasx(aas, submodel, path_aasx, write_json, metrics, file_store)
+        else:
+            project, elements, known = _read(path_json, stream_input, select, metrics)
+            if validate:
+                _validate(path_json, project, elements, stream_input, metrics, known)
+            if cache_dir is None:
+                FPD2AAS_Emit.write_aasx_direct(project, elements, path_aasx, write_json,
+                                               metrics=metrics, columnar=columnar,
+                                               jobs=element_jobs, shard_size=shard_size, graph=graph)
+            else:
+                with FPD2AAS_Cache.ElementCache(cache_dir, cache_size) as cache:
+                    FPD2AAS_Emit.write_aasx_direct(project, elements, path_aasx, write_json, cache,
+                                                   metrics, columnar, element_jobs, shard_size, graph)
+    metrics.count("files_converted")
+    metrics.count("bytes_written", os.path.getsize(path_aasx))
+    return path_aasx
 
 # -------------------------------
-# Add all elements to submodel and link to AAS
+# Batch conversion helpers
 # -------------------------------
-submodel.submodel_element.add(smc_project_information)
-submodel.submodel_element.add(smc_process)
-submodel.submodel_element.add(sml_flows)
-submodel.submodel_element.add(sml_usages)
-aas.submodel.add(model.ModelReference.from_referable(submodel))
+def expand_inputs(patterns):
+    """
+    Expands files, glob patterns and directories into a list of FPD JSON paths.
+    Directories contribute the *.json files directly inside them.
+    Duplicates are removed while keeping the order of first appearance.
+    """
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, '*.json')))
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+        for path in matches:
+            key = os.path.abspath(path)
+            if key not in seen:
+                seen.add(key)
+                paths.append(path)
+    return paths
+
+def output_path(path_json, output_dir):
+    """
+    Returns the AASX path for an FPD JSON file inside the output directory.
+    """
+    stem = os.path.splitext(os.path.basename(path_json))[0]
+    return os.path.join(output_dir, stem + '.aasx')
+
+def _convert_job(path_json, path_aasx, options):
+    """
+    Runs one conversion and returns (path_json, path_aasx, error, seconds, metrics).
+    Errors and metrics are returned as plain data so that they can cross process boundaries.
+    """
+    start = time.perf_counter()
+    metrics = FPD2AAS_Metrics.Metrics()
+    try:
+        convert_file(path_json, path_aasx, metrics=metrics, **options)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        metrics.count("files_failed")
+    return path_json, path_aasx, error, time.perf_counter() - start, metrics.as_dict()
+
+def convert_batch(paths, output_dir, jobs=None, report=print, metrics=None, **options):
+    """
+    Converts many FPD JSON files into output_dir, spreading the work over a
+    process pool with `jobs` workers (default: number of CPU cores).
+    Further keyword options are passed on to convert_file.
+    Calls report with one status line per file and returns the list of
+    (path_json, error) pairs for the files that failed. The metrics of all
+    files are added up in metrics, if given.
+    """
+    metrics = metrics if metrics is not None else FPD2AAS_Metrics.Metrics()
+    jobs = jobs or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+
+    failures = []
+    tasks = []
+    targets = {}
+    for path_json in paths:
+        path_aasx = output_path(path_json, output_dir)
+        if path_aasx in targets:
+            error = f"output {path_aasx} already used by {targets[path_aasx]}"
+            failures.append((path_json, error))
+            metrics.count("files_failed")
+            report(f"FAIL {path_json}: {error}")
+            continue
+        targets[path_aasx] = path_json
+        tasks.append((path_json, path_aasx, options))
+
+    if jobs == 1 or len(tasks) <= 1:
+        for task in tasks:
+            _report_result(_convert_job(*task), failures, report, metrics)
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+            futures = [pool.submit(_convert_job, *task) for task in tasks]
+            for future, task in zip(futures, tasks):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker itself died (e.g. out of memory)
+                    result = (task[0], task[1], f"{type(e).__name__}: {e}", 0.0, {"counters": {"files_failed": 1}})
+                _report_result(result, failures, report, metrics)
+    return failures
+
+def _report_result(result, failures, report, metrics):
+    """
+    Reports the status of one conversion, adds up its metrics and records it if it failed.
+    """
+    path_json, path_aasx, error, seconds, job_metrics = result
+    metrics.merge(job_metrics)
+    if error is None:
+        report(f"OK   {path_json} -> {path_aasx} ({seconds:.2f}s)")
+    else:
+        failures.append((path_json, error))
+        report(f"FAIL {path_json}: {error}")
 
 # -------------------------------
-# Save the AAS and Submodel to AASX file
+# Command line entry point
 # -------------------------------
-object_store = model.DictObjectStore([submodel, aas])          # Create object store
-file_store = aasx.DictSupplementaryFileContainer()             # Create empty file store
-
-with aasx.AASXWriter(path_aasx) as writer:
-    writer.write_aas(
-        aas_ids=aas.id, 
-        object_store=object_store, 
-        file_store=file_store
-    )
\ No newline at end of file
+def main(argv=None):
+    """
+    Command line entry point. Returns 0 if every file was converted and 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Convert FPD JSON files into AASX packages.")
+    parser.add_argument('inputs', nargs='+',
+                        help="FPD JSON files, glob patterns or directories")
+    parser.add_argument('-o', '--output-dir', default='.',
+                        help="directory for the AASX files (default: current directory)")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="number of worker processes (default: number of CPU cores)")
+    parser.add_argument('--stream', action='store_true',
+                        help="read the FPD files element by element to bound memory")
+    parser.add_argument('--direct', action='store_true',
+                        help="emit the AAS part directly instead of building the basyx object graph")
+    parser.add_argument('--json', action='store_true',
+                        help="write the AAS part as JSON instead of XML")
+    parser.add_argument('--cache', metavar='DIR', default=None,
+                        help="reuse unchanged elements from a per-element cache in DIR (implies --direct)")
+    parser.add_argument('--cache-size', metavar='MB', type=int, default=FPD2AAS_Cache.DEFAULT_MAX_BYTES >> 20,
+                        help="evict cache entries beyond this size (default: %(default)s MB)")
+    parser.add_argument('--element-jobs', metavar='N', type=int, default=None,
+                        help="render the elements of each file on N worker processes (implies --direct)")
+    parser.add_argument('--shard-size', metavar='N', type=int, default=FPD2AAS_Emit.DEFAULT_SHARD_SIZE,
+                        help="elements per shard with --element-jobs (default: %(default)s)")
+    parser.add_argument('--split', choices=FPD_Split.MODES, default=None,
+                        help="split the process over several submodels per SystemLimit, per process operator "
+                             "or by size, with an index submodel")
+    parser.add_argument('--split-size', metavar='N', type=int, default=FPD_Split.DEFAULT_PART_SIZE,
+                        help="elements per submodel with --split size (default: %(default)s)")
+    parser.add_argument('--columnar', action='store_true',
+                        help="also store all characteristic values as a NumPy table in the package (needs numpy)")
+    parser.add_argument('--graph', action='store_true',
+                        help="also store a CSR index of the flows and usages in the package (needs numpy)")
+    parser.add_argument('--validate', action='store_true',
+                        help="check each input first and report all its problems at once; valid input "
+                             "is then built without the per-element checks")
+    parser.add_argument('--trusted', action='store_true',
+                        help="build without the per-element checks, for input that is known to be valid")
+    parser.add_argument('--select-id', metavar='ID', action='append', default=[],
+                        help="convert only this element (repeatable); flows and usages between the selected "
+                             "elements are kept")
+    parser.add_argument('--select-type', metavar='TYPE', action='append', default=[],
+                        help="convert only the elements of this $type, e.g. TechnicalResource (repeatable)")
+    parser.add_argument('--assigned-to', metavar='ID', action='append', default=[],
+                        help="convert only this element, the elements assigned to it and those it is "
+                             "assigned to (repeatable)")
+    parser.add_argument('--assigned-depth', metavar='N', type=int, default=1,
+                        help="isAssignedTo steps followed from --assigned-to (0: all; default: %(default)s)")
+    parser.add_argument('--metrics', metavar='FILE', default=None,
+                        help="write stage timings and counters of all files to FILE ('-' for stdout)")
+    parser.add_argument('--metrics-format', choices=('json', 'prometheus'), default='json',
+                        help="format of --metrics (default: %(default)s)")
+    parser.add_argument('--profile', action='store_true',
+                        help="write cProfile reports (.prof, .profile.txt) next to each output file")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="write a tracemalloc report (.tracemalloc.txt) next to each output file")
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs)
+    select = None
+    if args.select_id or args.select_type or args.assigned_to:
+        select = FPD_Index.Selection(args.select_id, args.select_type, args.assigned_to, args.assigned_depth or None)
+    metrics = FPD2AAS_Metrics.Metrics()
+    failures = convert_batch(paths, args.output_dir, args.jobs, metrics=metrics, stream_input=args.stream,
+                             direct=args.direct, write_json=args.json,
+                             cache_dir=args.cache, cache_size=args.cache_size << 20,
+                             profile=args.profile, trace_memory=args.trace_memory,
+                             columnar=args.columnar, element_jobs=args.element_jobs,
+                             shard_size=args.shard_size, split=args.split, split_size=args.split_size,
+                             graph=args.graph, validate=args.validate, trusted=args.trusted, select=select)
+    print(f"{len(paths) - len(failures)} of {len(paths)} files converted, {len(failures)} failed")
+    if args.metrics == '-':
+        print(metrics.format(args.metrics_format))
+    elif args.metrics:
+        with open(args.metrics, 'w', encoding='utf-8') as f:
+            f.write(metrics.format(args.metrics_format))
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
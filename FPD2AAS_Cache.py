@@ -0,0 +1,136 @@
+# Element Cache for Incremental Conversion
+# ---------------------------------------------
+# On-disk cache of the emitted AAS text of each FPD element, keyed by a
+# content hash of the element. Re-running a conversion only emits the
+# elements that changed; everything else is taken from the cache.
+# ---------------------------------------------
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# -------------------------------
+# Bump when the mapping changes in a way the skeleton hash does not capture
+# -------------------------------
+CACHE_VERSION = 1
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# -------------------------------
+# Content hash of an element
+# -------------------------------
+def element_key(namespace, el):
+    """
+    Returns the cache key of an FPD element within a namespace (the emitter it
+    is rendered with). The element is hashed in canonical JSON form, so key
+    order and whitespace in the input file do not matter.
+    """
+    h = hashlib.sha256(namespace.encode("utf-8"))
+    h.update(json.dumps(el, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()
+
+def relation_key(namespace, source, target):
+    """
+    Returns the cache key of a flow or usage between two resolved element names.
+    """
+    h = hashlib.sha256(namespace.encode("utf-8"))
+    h.update(b"\0" + source.encode("utf-8") + b"\0" + target.encode("utf-8"))
+    return h.hexdigest()
+
+# -------------------------------
+# SQLite-backed cache with size-based eviction
+# -------------------------------
+class ElementCache:
+    """
+    Persistent map from element keys to emitted text. Entries are evicted
+    least-recently-used first once the stored text exceeds max_bytes.
+    Several processes may share one cache directory.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "elements.sqlite")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._used = []
+        self._pending = []
+        self._db = sqlite3.connect(self.path, timeout=60)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+        self._db.commit()
+
+    def get(self, key):
+        """
+        Returns the cached text for key, or None.
+        """
+        row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used.append(key)
+        return row[0]
+
+    def put(self, key, value):
+        """
+        Stores text for key. Entries are written on flush().
+        """
+        self._pending.append((key, value, len(value.encode("utf-8"))))
+
+    def flush(self):
+        """
+        Writes pending entries and access times, then evicts entries over the size limit.
+        """
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, used) VALUES (?, ?, ?, ?)",
+                ((key, value, size, now) for key, value, size in self._pending),
+            )
+            self._db.executemany("UPDATE entries SET used = ? WHERE key = ?", ((now, key) for key in self._used))
+        self._pending.clear()
+        self._used.clear()
+        self.evict()
+
+    def size(self):
+        """
+        Returns the number of bytes of text stored in the cache.
+        """
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self):
+        """
+        Drops the least recently used entries until the cache fits into max_bytes.
+        """
+        excess = self.size() - self.max_bytes
+        if excess <= 0:
+            return
+        rows = self._db.execute("SELECT key, size FROM entries ORDER BY used")
+        victims = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= size
+        rows.close()
+        with self._db:
+            self._db.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def close(self):
+        """
+        Flushes pending entries and closes the database.
+        """
+        self.flush()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,703 @@
+# Direct AAS Emitter
+# ---------------------------------------------
+# Writes the AAS environment (XML or JSON) for an FPD model straight from the
+# parsed FPD dicts, without building the basyx object graph per element.
+# The text skeletons are produced once by the basyx serializers from sample
+# objects, so the emitted documents match the AASXWriter output.
+# ---------------------------------------------
+
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from lxml import etree
+import pyecma376_2
+from basyx.aas import model
+from basyx.aas.adapter import aasx
+from basyx.aas.adapter.json import json_serialization
+from basyx.aas.adapter.xml import xml_serialization
+import FPD2AAS_Functions as func
+import FPD2AAS_Cache
+import FPD_Model
+import FPD_Mapping
+import FPD2AAS_Metrics
+import FPD
+
+XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8'?>\n"
+
+_NS_AAS = xml_serialization.NS_AAS
+_XMLNS = ' xmlns:aas="{}"'.format(_NS_AAS[1:-1])
+
+# Elements per shard when rendering on a process pool
+DEFAULT_SHARD_SIZE = 2000
+
+# Characters a Spool keeps in memory before it moves to a temporary file
+SPOOL_MAX_SIZE = 4 << 20
+
+# Sample values used to build populated skeletons, one per value type in use
+_SAMPLE_VALUES = {
+    model.datatypes.String: "x",
+    model.datatypes.Double: 0.0,
+    model.datatypes.DateTime: datetime(2000, 1, 1),
+}
+
+############################################################################################################
+# Compiled text skeletons with value slots
+############################################################################################################
+
+def _marker(i):
+    """Return the placeholder text of slot i (private-use characters never occur in the skeleton)."""
+    return "\ue000%d\ue001" % i
+
+_XML_PATTERN = re.compile("<aas:value>\ue000(?P<opt>\\d+)\ue001</aas:value>|\ue000(?P<req>\\d+)\ue001")
+# json.dumps escapes the private-use characters, so the markers appear as \ue000...\ue001 escapes
+_JSON_PATTERN = re.compile(', "value": "\\\\ue000(?P<opt>\\d+)\\\\ue001"|"\\\\ue000(?P<req>\\d+)\\\\ue001"')
+
+class _Skeleton:
+    """
+    Serialized text with numbered slots. A slot marking a whole value element (XML) or "value"
+    member (JSON) is dropped when its value is None; any other slot is always filled.
+    """
+
+    def __init__(self, text, write_json=False):
+        self.write_json = write_json
+        self.parts = []
+        self.slots = []
+        pos = 0
+        for match in (_JSON_PATTERN if write_json else _XML_PATTERN).finditer(text):
+            self.parts.append(text[pos:match.start()])
+            if match.group("opt") is not None:
+                self.slots.append((int(match.group("opt")), True))
+            else:
+                self.slots.append((int(match.group("req")), False))
+            pos = match.end()
+        self.parts.append(text[pos:])
+        # Identifies the rendered output, e.g. for cache keys
+        self.fingerprint = hashlib.sha256(repr((self.parts, self.slots)).encode("utf-8")).hexdigest()
+
+    def render(self, values, text, out):
+        """
+        Append the skeleton with the slot values to the list `out`. `text` turns a value
+        into its serialized form (escaped XML text or a JSON literal).
+        """
+        parts = self.parts
+        out.append(parts[0])
+        for n, (i, is_value) in enumerate(self.slots, 1):
+            value = values[i]
+            if not is_value:
+                out.append(text(value))
+            elif value is None:
+                pass
+            elif self.write_json:
+                out.append(', "value": ')
+                out.append(text(value))
+            elif value == "":
+                out.append("<aas:value/>")
+            else:
+                out.append("<aas:value>")
+                out.append(text(value))
+                out.append("</aas:value>")
+            out.append(parts[n])
+
+    def write_to(self, values, write):
+        """
+        Write the skeleton with `write`. Each slot value is None or a function that writes the
+        serialized slot content with `write`, so large contents never have to be joined in memory.
+        """
+        parts = self.parts
+        write(parts[0])
+        for n, (i, is_value) in enumerate(self.slots, 1):
+            value = values[i]
+            if value is not None:
+                if is_value:
+                    write(', "value": ' if self.write_json else "<aas:value>")
+                value(write)
+                if is_value and not self.write_json:
+                    write("</aas:value>")
+            write(parts[n])
+
+############################################################################################################
+# Value formatting
+############################################################################################################
+
+def _xml_text(text):
+    """Escape text content the way lxml does."""
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace("\r", "&#13;")
+
+def _xsd(value, value_type):
+    """Return the lexical XSD representation of a Property value, or None."""
+    if value is None:
+        return None
+    return model.datatypes.xsd_repr(model.datatypes.trivial_cast(value, value_type))
+
+############################################################################################################
+# Element emitters
+############################################################################################################
+
+def _strip_xmlns(text):
+    """Drop the namespace declaration lxml adds to a standalone element."""
+    return text.replace(_XMLNS, "", 1)
+
+def _element_skeleton(element, write_json):
+    """Compile a serialized (and marked) submodel element into a skeleton."""
+    if write_json:
+        return _Skeleton(json.dumps(element), write_json=True)
+    # Attach to a parent carrying the aas prefix so lxml does not invent one
+    etree.Element(_NS_AAS + "value", nsmap={"aas": _NS_AAS[1:-1]}).append(element)
+    return _Skeleton(_strip_xmlns(etree.tostring(element, encoding="unicode")))
+
+def _mark_json_properties(data, counter):
+    """Replace the Property values of a serialized collection by slot markers (depth-first)."""
+    if data["modelType"] == "Property":
+        data["value"] = _marker(next(counter))
+    elif data["modelType"] == "SubmodelElementCollection":
+        for child in data.get("value", []):
+            _mark_json_properties(child, counter)
+
+# End of a serialized collection, after its last child
+_XML_COLLECTION_END = "</aas:value></aas:submodelElementCollection>"
+_JSON_COLLECTION_END = "]}"
+
+class ElementEmitter:
+    """
+    Emits the XML or JSON text of collections built by a func.CollectionTemplate.
+    Slot 0 is the collection's id_short, slots 1.. are the template's Properties.
+    Further children (e.g. extra characteristics) can be appended after the last one.
+    """
+
+    def __init__(self, template, write_json=False):
+        self.template = template
+        self.write_json = write_json
+        self.text = json.dumps if write_json else _xml_text
+        sample = template.stamp("sample", **{
+            field: _SAMPLE_VALUES[value_type]
+            for field, value_type in zip(template.fields, template.value_types)
+        })
+        if write_json:
+            element = json.loads(json.dumps(sample, cls=json_serialization.AASToJsonEncoder))
+            element["idShort"] = _marker(0)
+            _mark_json_properties(element, iter(range(1, len(template.fields) + 1)))
+        else:
+            element = xml_serialization.submodel_element_to_xml(sample)
+            element.find(_NS_AAS + "idShort").text = _marker(0)
+            for i, prop in enumerate(element.iter(_NS_AAS + "property"), 1):
+                prop.find(_NS_AAS + "value").text = _marker(i)
+        self.skeleton = _element_skeleton(element, write_json)
+        self.cache_namespace = f"{FPD2AAS_Cache.CACHE_VERSION}:{self.skeleton.fingerprint}"
+        self.collection_end = _JSON_COLLECTION_END if write_json else _XML_COLLECTION_END
+        assert self.skeleton.parts[-1].endswith(self.collection_end)
+
+    def emit(self, values, out, children=()):
+        """
+        Append the text of one collection to `out`. `values` are the keyword values of the
+        matching create_*_collection function, including id_short_smc. `children` are the
+        emitted texts of further child elements, added after the template's own children.
+        """
+        self.emit_values(values["id_short_smc"], [values.get(field) for field in self.template.fields],
+                         out, children)
+
+    def emit_values(self, id_short, values, out, children=()):
+        """
+        Like emit, with the Property values given as a sequence in the order of the template's fields.
+        """
+        model.Referable.validate_id_short(id_short)
+        slots = [id_short]
+        slots.extend(_xsd(value, value_type) for value, value_type in zip(values, self.template.value_types))
+        self.skeleton.render(slots, self.text, out)
+        if children:
+            end = self.collection_end
+            out[-1] = out[-1][:-len(end)]
+            for child in children:
+                if self.write_json:
+                    out.append(", ")
+                out.append(child)
+            out.append(end)
+
+class RelationEmitter:
+    """
+    Emits the XML or JSON text of flow or usage collections built by func.add_flow/add_usage.
+    Slots 0 and 1 are the id_shorts of the two referenced process elements.
+    """
+
+    def __init__(self, factory, write_json=False):
+        self.text = json.dumps if write_json else _xml_text
+        sample = factory("FPD", _marker(0), _marker(1))
+        if write_json:
+            element = json.loads(json.dumps(sample, cls=json_serialization.AASToJsonEncoder))
+        else:
+            element = xml_serialization.submodel_element_to_xml(sample)
+        self.skeleton = _element_skeleton(element, write_json)
+        self.cache_namespace = f"{FPD2AAS_Cache.CACHE_VERSION}:{self.skeleton.fingerprint}"
+
+    def emit(self, source, target, out):
+        """Append the text of one relation between the given id_shorts to `out`."""
+        self.skeleton.render((source, target), self.text, out)
+
+############################################################################################################
+# Environment skeleton
+############################################################################################################
+
+# Container slots of the environment skeleton
+_CONTAINER_SLOTS = {'process': 0, 'flows': 1, 'usages': 2}
+
+def _environment_skeleton(project, write_json=False, extra_elements=()):
+    """
+    Serialize the AAS, the FPD submodel and the project information once, with the values of
+    the process collection and the flows/usages lists replaced by container slots.
+    `extra_elements` are added to the submodel after the usages list.
+    """
+    aas = func.create_fpd_aas('FPD_AAS')
+    submodel = func.create_fpd_submodel('FPD')
+    smc_process = func.create_process_collection('process')
+    smc_process.add_referable(model.Property('sample', model.datatypes.String))
+    sml_flows = func.create_flows_list()
+    sml_flows.add_referable(func.add_flow())
+    sml_usages = func.create_usages_list()
+    sml_usages.add_referable(func.add_usage())
+    submodel.submodel_element.add(FPD.add_project_info(project))
+    submodel.submodel_element.add(smc_process)
+    submodel.submodel_element.add(sml_flows)
+    submodel.submodel_element.add(sml_usages)
+    for element in extra_elements:
+        submodel.submodel_element.add(element)
+    aas.submodel.add(model.ModelReference.from_referable(submodel))
+    store = model.DictIdentifiableStore([aas, submodel])
+
+    if write_json:
+        buffer = io.StringIO()
+        json_serialization.write_aas_json_file(buffer, store)
+        data = json.loads(buffer.getvalue())
+        for element in data["submodels"][0]["submodelElements"]:
+            if element["idShort"] in _CONTAINER_SLOTS:
+                element["value"] = _marker(_CONTAINER_SLOTS[element["idShort"]])
+        return _Skeleton(json.dumps(data), write_json=True)
+
+    root = xml_serialization.object_store_to_xml_element(store)
+    submodel_elements = root.find(f"{_NS_AAS}submodels/{_NS_AAS}submodel/{_NS_AAS}submodelElements")
+    for element in submodel_elements:
+        id_short = element.findtext(_NS_AAS + "idShort")
+        if id_short in _CONTAINER_SLOTS:
+            value = element.find(_NS_AAS + "value")
+            for child in list(value):
+                value.remove(child)
+            value.text = _marker(_CONTAINER_SLOTS[id_short])
+    return _Skeleton(etree.tostring(root, encoding="unicode"))
+
+############################################################################################################
+# Rendering process collection entries
+############################################################################################################
+
+class ElementRenderer:
+    """
+    Renders the text of the process collection entry of one FPD JSON element with the
+    builders compiled from FPD_Mapping, using one ElementEmitter per distinct template.
+    """
+
+    def __init__(self, write_json=False):
+        emitters = {}
+        for builder in FPD_Mapping.BUILDERS.values():
+            for compiled in [builder.root] + [c for _, c in builder.repeats]:
+                if compiled.template not in emitters:
+                    emitters[compiled.template] = ElementEmitter(compiled.template, write_json)
+        self.emitters = emitters
+        # Cached element texts depend on the element skeleton and the skeletons of repeated children
+        self.namespaces = {
+            t: ":".join([emitters[builder.root.template].cache_namespace]
+                        + [emitters[c.template].skeleton.fingerprint for _, c in builder.repeats])
+            for t, builder in FPD_Mapping.BUILDERS.items()
+        }
+
+    def render(self, el, t):
+        """Return (id_short, text) of a JSON element of type t."""
+        builder = FPD_Mapping.BUILDERS[t]
+        item = FPD_Model.decode(el)
+        id_short, values = builder.values(item)
+        children = []
+        for compiled, child_id_short, child_values in builder.repeated(item):
+            chunk = []
+            self.emitters[compiled.template].emit_values(child_id_short, child_values, chunk)
+            children.append("".join(chunk))
+        chunk = []
+        self.emitters[builder.root.template].emit_values(id_short, values, chunk, children)
+        return id_short, "".join(chunk)
+
+class _ShardConstraintViolation(Exception):
+    """
+    An AASConstraintViolation raised in a worker process. AASConstraintViolation takes other
+    arguments than it stores in args, so it cannot be unpickled; this one carries its constraint
+    id and final message to the parent, which raises the original error again.
+    """
+
+    def __init__(self, constraint_id, message):
+        super().__init__(constraint_id, message)
+        self.constraint_id = constraint_id
+        self.message = message
+
+    def violation(self):
+        """Recreate the AASConstraintViolation with its final message."""
+        error = model.AASConstraintViolation(self.constraint_id, "")
+        error.message = self.message
+        error.args = (self.message,)
+        return error
+
+# Renderers of the worker processes, one per output format
+_shard_renderers = {}
+
+def _render_shard(shard, write_json):
+    """Render a shard of (JSON element, type) pairs in a worker process."""
+    renderer = _shard_renderers.get(write_json)
+    if renderer is None:
+        renderer = _shard_renderers[write_json] = ElementRenderer(write_json)
+    try:
+        return [renderer.render(el, t) for el, t in shard]
+    except model.AASConstraintViolation as e:
+        raise _ShardConstraintViolation(e.constraint_id, e.message) from None
+
+class ShardPool:
+    """
+    Renders elements on a process pool in shards of `shard_size` elements.
+    Each element comes with a mutable entry [id_short, text, ...] that is filled in
+    when its shard is done, so the caller keeps the element order by the order
+    of its entries. At most two shards per worker are in flight at a time, which
+    bounds the memory of streamed input. `done` is called with each filled entry.
+    """
+
+    def __init__(self, write_json=False, jobs=None, shard_size=DEFAULT_SHARD_SIZE, done=None):
+        self.write_json = write_json
+        self.jobs = jobs or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self.done = done
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs)
+        self.shard = []
+        self.entries = []
+        self.pending = deque()
+        self.shards = 0
+
+    def add(self, el, t, entry):
+        self.shard.append((el, t))
+        self.entries.append(entry)
+        if len(self.shard) >= self.shard_size:
+            self._submit()
+
+    def _submit(self):
+        if self.shard:
+            self.pending.append((self.pool.submit(_render_shard, self.shard, self.write_json), self.entries))
+            self.shard = []
+            self.entries = []
+            self.shards += 1
+        while len(self.pending) > 2 * self.jobs:
+            self._collect()
+
+    def _collect(self):
+        future, entries = self.pending.popleft()
+        try:
+            results = future.result()
+        except _ShardConstraintViolation as e:
+            raise e.violation() from None
+        for entry, (id_short, text) in zip(entries, results):
+            entry[0] = id_short
+            entry[1] = text
+            if self.done is not None:
+                self.done(entry)
+
+    def finish(self):
+        """Render the remaining elements and wait for all shards."""
+        self._submit()
+        while self.pending:
+            self._collect()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+############################################################################################################
+# Emitting a complete environment
+############################################################################################################
+
+class Spool:
+    """
+    Emitted items of one container in a temporary file that stays in memory up to
+    SPOOL_MAX_SIZE characters, so containers of any size are written with bounded memory.
+    """
+
+    def __init__(self, separator=""):
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode="w+", encoding="utf-8")
+        self.separator = separator
+        self.count = 0
+
+    def add(self, text):
+        if self.count and self.separator:
+            self.file.write(self.separator)
+        self.file.write(text)
+        self.count += 1
+
+    def copy_to(self, write):
+        """Write the spooled text with `write`."""
+        self.file.seek(0)
+        while True:
+            chunk = self.file.read(1 << 16)
+            if not chunk:
+                break
+            write(chunk)
+
+    def close(self):
+        self.file.close()
+
+def _container(spools, write_json):
+    """
+    Return the slot value for _Skeleton.write_to that writes the items of the given
+    spools as one container, or None if there are no items.
+    """
+    spools = [spool for spool in spools if spool.count]
+    if not spools:
+        return None
+
+    def write_container(write):
+        if write_json:
+            write("[")
+        for n, spool in enumerate(spools):
+            if n and write_json:
+                write(", ")
+            spool.copy_to(write)
+        if write_json:
+            write("]")
+    return write_container
+
+def write_environment(project, elements, write, write_json=False, cache=None, metrics=None, table=None,
+                      jobs=None, shard_size=DEFAULT_SHARD_SIZE, graph=None):
+    """
+    Write the AAS environment for an FPD model with `write` (e.g. the write method of a text file).
+    `elements` may be a list of FPD JSON elements or an FPD_Stream.FPDStream; they are read
+    in a single pass. The result matches what FPD2AAS.write_aasx writes for the same input.
+    The emitted process entries and the flow and usage endpoints are kept in Spools until
+    the input is read, so with a streamed input the memory use does not grow with the model
+    apart from the id -> name map needed to resolve flows and usages.
+    With a FPD2AAS_Cache.ElementCache, unchanged elements and relations are taken from the
+    cache and only new or modified ones are emitted.
+    With jobs > 1 the process collection entries are rendered in shards of shard_size
+    elements on a pool of `jobs` worker processes; the output is the same.
+    A FPD2AAS_Metrics.Metrics object, if given, receives the element and relation counts.
+    A FPD_Columnar.CharacteristicsTable, if given, is filled with every element's
+    characteristics and referenced from the submodel by a File element; so is a
+    FPD_Graph.GraphBuilder with the elements and relations.
+    """
+    renderer = ElementRenderer(write_json)
+    spools = []
+
+    def spool(separator=", " if write_json else ""):
+        spools.append(Spool(separator))
+        return spools[-1]
+
+    # Per type, the spool of emitted entries and the entries [id_short, text, cache key, type] not yet
+    # spooled, which wait for their shard (or for an earlier entry of the same type)
+    built = {t: spool() for t in FPD_Mapping.BUILDERS}
+    waiting = {t: deque() for t in FPD_Mapping.BUILDERS}
+    names = {}
+    id_shorts = set()
+    relations = {"Flow": spool(""), "Usage": spool("")}
+
+    def flush(t):
+        entries = waiting[t]
+        while entries and entries[0][1] is not None:
+            id_short, text = entries.popleft()[:2]
+            # Same constraint basyx enforces when adding to the process collection
+            if id_short in id_shorts:
+                raise model.AASConstraintViolation(
+                    22, f"Object with id_short '{id_short}' is already present in the process collection"
+                )
+            id_shorts.add(id_short)
+            built[t].add(text)
+
+    def done(entry):
+        if cache is not None:
+            cache.put(entry[2], entry[0] + "\n" + entry[1])
+        flush(entry[3])
+
+    shards = None
+    if jobs is not None and jobs > 1:
+        shards = ShardPool(write_json, jobs, shard_size, done)
+    if metrics is not None:
+        elements = metrics.counted(elements)
+    if table is not None:
+        elements = table.collect(elements)
+    if graph is not None:
+        elements = graph.collect(elements)
+    try:
+        for el in elements:
+            t = el["$type"].rpartition(":")[2]
+            names.setdefault(el.get("id"), el.get("name"))
+            if t not in built:
+                if t in relations:
+                    relations[t].add(json.dumps((el["sourceRef"], el["targetRef"])) + "\n")
+                continue
+
+            key = None
+            cached = None
+            if cache is not None:
+                key = FPD2AAS_Cache.element_key(renderer.namespaces[t], el)
+                cached = cache.get(key)
+            if cached is not None:
+                id_short, _, text = cached.partition("\n")
+                waiting[t].append([id_short, text, None, t])
+                flush(t)
+            elif shards is not None:
+                entry = [None, None, key, t]
+                waiting[t].append(entry)
+                shards.add(el, t, entry)
+            else:
+                id_short, text = renderer.render(el, t)
+                waiting[t].append([id_short, text, key, t])
+                done(waiting[t][-1])
+        if shards is not None:
+            shards.finish()
+            if metrics is not None:
+                metrics.count("shards", shards.shards)
+
+        flows = spool()
+        usages = spool()
+        _emit_relations(relations["Flow"], names, RelationEmitter(func.add_flow, write_json), flows, cache)
+        _emit_relations(relations["Usage"], names, RelationEmitter(func.add_usage, write_json), usages, cache)
+        if cache is not None:
+            cache.flush()
+        if metrics is not None:
+            metrics.count_relations("Flow", flows.count)
+            metrics.count_relations("Usage", usages.count)
+            if cache is not None:
+                metrics.count("cache_hits", cache.hits)
+                metrics.count("cache_misses", cache.misses)
+
+        extra_elements = ()
+        if table is not None:
+            import FPD_Columnar  # Optional: needs numpy
+            extra_elements += (FPD_Columnar.table_file_element(),)
+        if graph is not None:
+            import FPD_Graph  # Optional: needs numpy
+            extra_elements += (FPD_Graph.graph_file_element(),)
+        if not write_json:
+            write(XML_DECLARATION)
+        # The process collection holds all types, in the order of FPD_Mapping.MAPPINGS
+        containers = [_container(built.values(), write_json), _container([flows], write_json),
+                      _container([usages], write_json)]
+        _environment_skeleton(project, write_json, extra_elements).write_to(containers, write)
+    finally:
+        if shards is not None:
+            shards.close()
+        for item in spools:
+            item.close()
+
+def emit_environment(project, elements, write_json=False, cache=None, metrics=None, table=None,
+                     jobs=None, shard_size=DEFAULT_SHARD_SIZE, graph=None):
+    """
+    Return the AAS environment for an FPD model as a list of text chunks (see write_environment).
+    """
+    out = []
+    write_environment(project, elements, out.append, write_json, cache, metrics, table, jobs, shard_size, graph)
+    return out
+
+def _emit_relations(relations, names, emitter, spool, cache=None):
+    """
+    Resolve the relation endpoints of a Spool of JSON lines to names and add the emitted (or
+    cached) text of the resolvable ones to `spool`.
+    """
+    relations.file.seek(0)
+    for line in relations.file:
+        source_ref, target_ref = json.loads(line)
+        src = names.get(source_ref)
+        tgt = names.get(target_ref)
+        if src and tgt:
+            text = None
+            if cache is not None:
+                key = FPD2AAS_Cache.relation_key(emitter.cache_namespace, src, tgt)
+                text = cache.get(key)
+            if text is None:
+                chunk = []
+                emitter.emit(src, tgt, chunk)
+                text = "".join(chunk)
+                if cache is not None:
+                    cache.put(key, text)
+            spool.add(text)
+
+############################################################################################################
+# Writing the AASX package
+############################################################################################################
+
+def write_aasx_direct(project, elements, path_aasx, write_json=False, cache=None, metrics=None,
+                      columnar=False, jobs=None, shard_size=DEFAULT_SHARD_SIZE, graph=False):
+    """
+    Write an AASX package with the directly emitted environment as its aas-spec part.
+    The package layout is the same as the one produced by aasx.AASXWriter.write_aas.
+    With metrics, the "emit" and "write_aasx" stages are timed. With columnar, the
+    FPD_Columnar table of all characteristics is added as a supplementary file, and
+    with graph the FPD_Graph index of the flows and usages.
+    The environment is streamed into the package while it is written (see write_environment).
+    jobs and shard_size are passed on to write_environment.
+    """
+    metrics = metrics if metrics is not None else FPD2AAS_Metrics.Metrics()
+    table = None
+    if columnar:
+        import FPD_Columnar  # Optional: needs numpy
+        table = FPD_Columnar.CharacteristicsTable()
+    builder = None
+    if graph:
+        import FPD_Graph  # Optional: needs numpy
+        builder = FPD_Graph.GraphBuilder()
+    part_name = "/aasx/data.{}".format("json" if write_json else "xml")
+    # Written with the OPC package writer that aasx.AASXWriter is built on, in the same order of parts
+    writer = pyecma376_2.ZipPackageWriter(path_aasx)
+    try:
+        writer.open_part(aasx.AASXWriter.AASX_ORIGIN_PART_NAME, "text/plain").close()
+        # The environment is streamed into the package part while it is emitted
+        with metrics.stage("emit"):
+            with writer.open_part(part_name, "application/json" if write_json else "application/xml") as p:
+                text = io.TextIOWrapper(p, encoding="utf-8")
+                write_environment(project, elements, text.write, write_json, cache, metrics, table,
+                                  jobs, shard_size, builder)
+                text.flush()
+                text.detach()
+        files = []
+        if table is not None:
+            with metrics.stage("columnar"):
+                files.append((FPD_Columnar.TABLE_PATH, FPD_Columnar.TABLE_CONTENT_TYPE, table.to_npz()))
+            metrics.count("characteristics", len(table))
+        if builder is not None:
+            with metrics.stage("graph"):
+                files.append((FPD_Graph.GRAPH_PATH, FPD_Graph.GRAPH_CONTENT_TYPE, builder.to_npz()))
+            metrics.count("graph_relations", len(builder))
+        with metrics.stage("write_aasx"):
+            _write_files(writer, part_name, files)
+    finally:
+        writer.close()
+
+def _write_files(writer, part_name, files=()):
+    """
+    Finish a package written by write_aasx_direct with a pyecma376_2.ZipPackageWriter: add the
+    supplementary files given as (part name, content type, bytes) and the relationships that
+    aasx.AASXWriter writes for a single aas-spec part.
+    """
+    for file_name, content_type, data in files:
+        with writer.open_part(file_name, content_type) as p:
+            p.write(data)
+    # Same aas-suppl relationships as AASXWriter.write_all_aas_objects
+    writer.write_relationships(
+        [pyecma376_2.OPCRelationship(f"r{i}", aasx.RELATIONSHIP_TYPE_AAS_SUPL, file_name,
+                                     pyecma376_2.OPCTargetMode.INTERNAL)
+         for i, (file_name, _, _) in enumerate(files)],
+        part_name)
+    # Same aas-spec and package relationships as AASXWriter.close
+    writer.write_relationships(
+        [pyecma376_2.OPCRelationship("r0", aasx.RELATIONSHIP_TYPE_AAS_SPEC, part_name,
+                                     pyecma376_2.OPCTargetMode.INTERNAL)],
+        aasx.AASXWriter.AASX_ORIGIN_PART_NAME)
+    writer.write_relationships(
+        [pyecma376_2.OPCRelationship("r1", aasx.RELATIONSHIP_TYPE_AASX_ORIGIN, aasx.AASXWriter.AASX_ORIGIN_PART_NAME,
+                                     pyecma376_2.OPCTargetMode.INTERNAL)])
@@ -1,7 +1,42 @@
 # Import necessary classes from the BaSyx AAS Python SDK
+import uuid
+from functools import lru_cache
 from basyx.aas import model
 from basyx.aas.adapter import aasx  # Required if you later want to read/write AASX files
 
+############################################################################################################
+# basyx Internals used by the Fast Paths
+############################################################################################################
+
+# The prototype templates build elements by copying the attributes of a prototype instead of running the
+# basyx constructors. This relies on the internal layout of basyx-python-sdk 2.2.0 (pinned in
+# requirements.txt); it is checked once at import, and with any other layout the public API is used.
+BASYX_VERSION = "2.2.0"
+
+def _basyx_internals_supported():
+    """
+    Return True if the basyx objects have the internal attributes the fast paths read and write.
+    """
+    try:
+        prop = model.Property(id_short='p', value_type=model.datatypes.String)
+        smc = model.SubmodelElementCollection(id_short='c', value=(prop,))
+        namespace = smc.value
+        backend, case_sensitive = namespace._backend['id_short']
+        return (
+            type(namespace) is model.NamespaceSet
+            and backend == {'p': prop} and case_sensitive is True
+            and any(namespace_set is namespace for namespace_set in smc.namespace_element_sets)
+            and namespace._item_add_hook is None and namespace._item_id_set_hook is None
+            and prop._id_short == 'p' and prop._value is None
+            and type(prop._supplemental_semantic_id) is model.ConstrainedList
+            and prop._supplemental_semantic_id._list == []
+            and isinstance(prop.__dict__.get('embedded_data_specifications'), list)
+        )
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return False
+
+BASYX_INTERNALS = _basyx_internals_supported()
+
 ############################################################################################################
 # ID Management Functions for AAS and Submodel
 ############################################################################################################
@@ -83,52 +118,193 @@ def create_project_information_collection(name_project='project name', target_na
 # SubmodelElementCollection for Process
 ############################################################################################################
 
-def create_process_collection(id_short_process='process'):
+def create_process_collection(id_short_process='process', value=()):
     """
     Create a SubmodelElementCollection named 'process' for FPD.
+    The pre-built collections in `value` are inserted in bulk (see add_all).
     """
     smc_process = model.SubmodelElementCollection(
         id_short=id_short_process,
         category='PARAMETER'
     )
+    add_all(smc_process, value)
     return smc_process
 
+############################################################################################################
+# Bulk Insertion into Collections and Lists
+############################################################################################################
+
+# Prefix of the id_shorts basyx generates for the items of a SubmodelElementList (they are not serialized)
+LIST_ID_SHORT_PREFIX = "generated_submodel_list_hack_"
+
+def add_all(parent, elements):
+    """
+    Add pre-built SubmodelElements to a SubmodelElementCollection or SubmodelElementList in one step.
+    Instead of the per-element namespace checks and bookkeeping of add_referable, the id_shorts of
+    all elements are checked for uniqueness at once by building the backend dict, and list items
+    are type-checked and get their generated id_shorts in a single loop. Raises the same
+    AASConstraintViolations as add_referable; nothing is added if one is raised.
+    Falls back to add_referable when the pinned basyx internals are not available (see
+    BASYX_INTERNALS), when the namespace has other hooks than basyx installs for these parents,
+    and for lists with a semantic_id_list_element or of Properties or Ranges.
+    """
+    elements = list(elements)
+    if not elements:
+        return
+    if not _bulk_add_supported(parent):
+        for element in elements:
+            parent.add_referable(element)
+        return
+    namespace = parent.value
+    is_list = isinstance(parent, model.SubmodelElementList)
+
+    for element in elements:
+        if element.parent is not None:
+            raise ValueError("Object has already a parent; it cannot belong to two namespaces.")
+    if is_list:
+        item_type = parent.type_value_list_element
+        semantic_id = next((item.semantic_id for item in namespace if item.semantic_id is not None), None)
+        for element in elements:
+            if type(element) is not item_type:
+                raise model.AASConstraintViolation(
+                    108, "All first level elements must be of the type specified in "
+                         f"type_value_list_element={item_type.__name__}, got {element!r}")
+            if element.semantic_id is not None:
+                if semantic_id is None:
+                    semantic_id = element.semantic_id
+                elif element.semantic_id != semantic_id:
+                    raise model.AASConstraintViolation(
+                        114, f"Element to be added {element!r} has semantic_id {element.semantic_id!r}, "
+                             f"while already contained elements have semantic_id {semantic_id!r}, "
+                             "which aren't equal.")
+        # One uuid per call instead of one per item keeps the generated id_shorts unique
+        stem = f"{LIST_ID_SHORT_PREFIX}{uuid.uuid1(clock_seq=parent._uuid_seq).hex}_"
+        parent._uuid_seq += 1
+        for i, element in enumerate(elements):
+            if element.id_short is None:
+                element._id_short = f"{stem}{i}"
+
+    # The other namespaces of the parent (qualifiers, extensions) must not hold the keys either
+    for other in parent.namespace_element_sets:
+        if other is namespace:
+            continue
+        for key_attr_name, (backend, case_sensitive) in other._backend.items():
+            for element in elements:
+                if hasattr(element, key_attr_name):
+                    key = other._get_attribute(element, key_attr_name, case_sensitive)
+                    namespace._check_attr_is_not_none(element, key_attr_name, key)
+                    namespace._check_value_is_not_in_backend(element, key_attr_name, key, backend, other)
+
+    updates = []
+    for key_attr_name, (backend, case_sensitive) in namespace._backend.items():
+        keys = [namespace._get_attribute(element, key_attr_name, case_sensitive) for element in elements]
+        added = dict(zip(keys, elements))
+        if len(added) != len(elements) or not backend.keys().isdisjoint(added):
+            seen = set(backend)
+            for key, element in zip(keys, elements):
+                if key is None:
+                    namespace._check_attr_is_not_none(element, key_attr_name, key)
+                namespace._check_value_is_not_in_backend(element, key_attr_name, key, seen, namespace)
+                seen.add(key)
+        if None in added:
+            namespace._check_attr_is_not_none(added[None], key_attr_name, None)
+        updates.append((backend, added))
+
+    for backend, added in updates:
+        backend.update(added)
+    for element in elements:
+        element.parent = parent
+    if isinstance(namespace, model.OrderedNamespaceSet):
+        namespace._order.extend(elements)
+
+def _bulk_add_supported(parent):
+    """
+    Returns whether add_all may fill the namespace of parent directly: the basyx
+    internals match the pinned version, the namespace runs only the hooks basyx
+    installs for this kind of parent, and list items need no per-item value_type
+    or semantic_id_list_element check.
+    """
+    if not BASYX_INTERNALS:
+        return False
+    namespace = parent.value
+    if type(namespace) not in (model.NamespaceSet, model.OrderedNamespaceSet):
+        return False
+    if isinstance(parent, model.SubmodelElementList):
+        return (parent.semantic_id_list_element is None
+                and parent.type_value_list_element not in (model.Property, model.Range)
+                and namespace._item_add_hook == parent._check_constraints
+                and namespace._item_id_set_hook == parent._generate_id_short)
+    return (isinstance(parent, model.SubmodelElementCollection)
+            and namespace._item_add_hook is None and namespace._item_id_set_hook is None)
+
+############################################################################################################
+# Interned Keys and References to Process Elements
+############################################################################################################
+
+# Keys and References are immutable in basyx, so equal ones can be shared between all flows and usages.
+# The caches are bounded so that long-running processes converting many models do not grow without limit.
+REFERENCE_CACHE_SIZE = 1 << 16
+
+@lru_cache(maxsize=64)
+def _submodel_key(id_short_submodel='FPD'):
+    """Return the shared SUBMODEL Key of the given submodel."""
+    return model.Key(type_=model.KeyTypes.SUBMODEL, value=get_id_management_submodel(id_short_submodel))
+
+@lru_cache(maxsize=64)
+def _collection_key(id_short):
+    """Return a shared SUBMODEL_ELEMENT_COLLECTION Key for a fixed id_short (e.g. 'process')."""
+    return model.Key(type_=model.KeyTypes.SUBMODEL_ELEMENT_COLLECTION, value=id_short)
+
+@lru_cache(maxsize=REFERENCE_CACHE_SIZE)
+def process_element_reference(id_short_submodel='FPD', id_short='state'):
+    """
+    Return the ModelReference to a collection in the process collection of the given submodel.
+    One Reference is shared per target, so every flow or usage pointing to it reuses it.
+    """
+    return model.ModelReference((
+        _submodel_key(id_short_submodel),
+        _collection_key('process'),
+        model.Key(type_=model.KeyTypes.SUBMODEL_ELEMENT_COLLECTION, value=id_short),
+    ), model.SubmodelElementCollection)
+
+def clear_reference_cache():
+    """Drop all interned Keys and References."""
+    process_element_reference.cache_clear()
+    _collection_key.cache_clear()
+    _submodel_key.cache_clear()
+
 ############################################################################################################
 # SubmodelElementList for Flows and Flow Collection
 ############################################################################################################
 
-def create_flows_list():
+def create_flows_list(value=()):
     """
     Create a SubmodelElementList for flows.
+    The pre-built flow collections in `value` are inserted in bulk (see add_all).
     """
     sml_flows = model.SubmodelElementList(
         id_short='flows',
         type_value_list_element=model.SubmodelElementCollection
     )
+    add_all(sml_flows, value)
     return sml_flows
 
-def add_flow(id_short_submodel='FPD', incoming_id_short='state_incoming', outcoming_id_short='state_outcoming'):
+def add_flow(id_short_submodel='FPD', incoming_id_short='state_incoming', outcoming_id_short='state_outcoming',
+             outcoming_submodel=None):
     """
     Create a flow SubmodelElementCollection with incoming and outgoing references.
+    With outcoming_submodel the outgoing reference points into that submodel instead.
     """
     # Reference to incoming state
     ref_incoming = model.ReferenceElement(
         id_short='incoming',
-        value=model.ModelReference((
-            model.Key(type_=model.KeyTypes.SUBMODEL, value=get_id_management_submodel(id_short_submodel)),
-            model.Key(type_=model.KeyTypes.SUBMODEL_ELEMENT_COLLECTION, value='process'),
-            model.Key(type_=model.KeyTypes.SUBMODEL_ELEMENT_COLLECTION, value=incoming_id_short),
-        ), model.SubmodelElementCollection),
+        value=process_element_reference(id_short_submodel, incoming_id_short),
         category='PARAMETER'
     )
     # Reference to outgoing state
     ref_outcoming = model.ReferenceElement(
         id_short='outcoming',
-        value=model.ModelReference((
-            model.Key(type_=model.KeyTypes.SUBMODEL, value=get_id_management_submodel(id_short_submodel)),
-            model.Key(type_=model.KeyTypes.SUBMODEL_ELEMENT_COLLECTION, value='process'),
-            model.Key(type_=model.KeyTypes.SUBMODEL_ELEMENT_COLLECTION, value=outcoming_id_short),
-        ), model.SubmodelElementCollection),
+        value=process_element_reference(outcoming_submodel or id_short_submodel, outcoming_id_short),
         category='PARAMETER'
     )
     # Flow collection
@@ -143,38 +319,34 @@ def add_flow(id_short_submodel='FPD', incoming_id_short='state_incoming', outcom
 # SubmodelElementList for Usages and Usage Collection
 ############################################################################################################
 
-def create_usages_list():
+def create_usages_list(value=()):
     """
     Create a SubmodelElementList for usages.
+    The pre-built usage collections in `value` are inserted in bulk (see add_all).
     """
     sml_usages = model.SubmodelElementList(
         id_short='usages',
         type_value_list_element=model.SubmodelElementCollection
     )
+    add_all(sml_usages, value)
     return sml_usages
 
-def add_usage(id_short_submodel='FPD', source_id_short='source', target_id_short='target'):
+def add_usage(id_short_submodel='FPD', source_id_short='source', target_id_short='target',
+              target_submodel=None):
     """
     Create a flow SubmodelElementCollection with incoming and outgoing references.
+    With target_submodel the target reference points into that submodel instead.
     """
     # Reference to source
     ref_source = model.ReferenceElement(
         id_short='source',
-        value=model.ModelReference((
-            model.Key(type_=model.KeyTypes.SUBMODEL, value=get_id_management_submodel(id_short_submodel)),
-            model.Key(type_=model.KeyTypes.SUBMODEL_ELEMENT_COLLECTION, value='process'),
-            model.Key(type_=model.KeyTypes.SUBMODEL_ELEMENT_COLLECTION, value=source_id_short),
-        ), model.SubmodelElementCollection),
+        value=process_element_reference(id_short_submodel, source_id_short),
         category='PARAMETER'
     )
     # Reference to target
     ref_target = model.ReferenceElement(
         id_short='target',
-        value=model.ModelReference((
-            model.Key(type_=model.KeyTypes.SUBMODEL, value=get_id_management_submodel(id_short_submodel)),
-            model.Key(type_=model.KeyTypes.SUBMODEL_ELEMENT_COLLECTION, value='process'),
-            model.Key(type_=model.KeyTypes.SUBMODEL_ELEMENT_COLLECTION, value=target_id_short),
-        ), model.SubmodelElementCollection),
+        value=process_element_reference(target_submodel or id_short_submodel, target_id_short),
         category='PARAMETER'
     )
     # Usage collection
@@ -577,4 +749,179 @@ def create_technical_resource_collection(
         category='PARAMETER',
         value=(smc_identification, smc_characteristics, prop_assignment)
     )
-    return smc_technical_resource
\ No newline at end of file
+    return smc_technical_resource
+
+############################################################################################################
+# Prototype Templates for State, Process Operator and Technical Resource Collections
+############################################################################################################
+
+# Keyword names of the create_*_collection functions in the depth-first order of the Properties they fill
+IDENTIFICATION_FIELDS = (
+    'unique_ident_ident', 'long_name_ident', 'short_name_ident', 'version_ident', 'revision_ident',
+)
+CHARACTERISTICS_FIELDS = (
+    'unique_ident', 'long_name', 'short_name', 'version', 'revision',
+    'value_determination_process', 'representivity',
+    'value_setpoint', 'unit_setpoint',
+    'limit_type', 'from_date', 'to_date',
+    'value_actual_value', 'unit_actual_value',
+    'prop_view', 'prop_model', 'prop_regulation',
+)
+STATE_FIELDS = ('state_type',) + IDENTIFICATION_FIELDS + CHARACTERISTICS_FIELDS + ('assignment',)
+PROCESS_OPERATOR_FIELDS = IDENTIFICATION_FIELDS + CHARACTERISTICS_FIELDS + ('assignment',)
+TECHNICAL_RESOURCE_FIELDS = PROCESS_OPERATOR_FIELDS
+
+def _compile_prototype(proto):
+    """
+    Compile a SubmodelElement skeleton into a nested plan that can be stamped out without running
+    the basyx constructors. Each plan is (class, plain attributes, namespace sets, child plans).
+    """
+    children = list(proto.value) if isinstance(proto, model.SubmodelElementCollection) else []
+    attrs = {}
+    namespace_sets = []
+    for name, value in proto.__dict__.items():
+        if isinstance(value, model.NamespaceSet):
+            continue
+        if name not in ('parent', 'namespace_element_sets'):
+            attrs[name] = value
+    for proto_set in proto.namespace_element_sets:
+        attr_name = next(name for name, value in proto.__dict__.items() if value is proto_set)
+        set_attrs = {k: v for k, v in proto_set.__dict__.items() if k not in ('parent', '_backend')}
+        backend = [
+            (name, case_sensitive, list(backend_dict) if backend_dict else None)
+            for name, (backend_dict, case_sensitive) in proto_set._backend.items()
+        ]
+        namespace_sets.append((attr_name, set_attrs, backend))
+    supplemental = proto.supplemental_semantic_id
+    list_attrs = {k: v for k, v in supplemental.__dict__.items() if k != '_list'}
+    list_items = tuple(supplemental)
+    return (type(proto), attrs, list_attrs, list_items, namespace_sets, [_compile_prototype(c) for c in children])
+
+def _clone(element, leaves):
+    """
+    Build a copy of a prototype element with the public basyx constructors; the fallback of _stamp
+    when BASYX_INTERNALS is False. Cloned Properties are appended to `leaves` in depth-first order.
+    """
+    common = dict(id_short=element.id_short, display_name=element.display_name, category=element.category,
+                  description=element.description, semantic_id=element.semantic_id)
+    if type(element) is model.Property:
+        clone = model.Property(value_type=element.value_type, value=element.value, **common)
+        leaves.append(clone)
+        return clone
+    if type(element) is model.ReferenceElement:
+        return model.ReferenceElement(value=element.value, **common)
+    if type(element) is model.SubmodelElementCollection:
+        return model.SubmodelElementCollection(value=[_clone(child, leaves) for child in element.value], **common)
+    raise TypeError(f"Cannot clone {element!r} with the public basyx API")
+
+def _stamp(plan, parent, leaves):
+    """
+    Create a new element from a compiled plan. Cloned Properties are appended to `leaves` in
+    depth-first order.
+    """
+    cls, attrs, list_attrs, list_items, namespace_sets, child_plans = plan
+    element = object.__new__(cls)
+    element_attrs = element.__dict__
+    element_attrs.update(attrs)
+    element_attrs['parent'] = parent
+    supplemental = object.__new__(model.ConstrainedList)
+    supplemental.__dict__.update(list_attrs)
+    supplemental._list = list(list_items)
+    element_attrs['_supplemental_semantic_id'] = supplemental
+    element_attrs['embedded_data_specifications'] = attrs['embedded_data_specifications'].copy()
+    if child_plans:
+        children = [_stamp(child_plan, element, leaves) for child_plan in child_plans]
+    else:
+        children = ()
+        if cls is model.Property:
+            leaves.append(element)
+    sets = []
+    for attr_name, set_attrs, backend in namespace_sets:
+        ns = object.__new__(model.NamespaceSet)
+        ns.__dict__.update(set_attrs)
+        ns.parent = element
+        ns._backend = {
+            name: (dict(zip(keys, children)) if keys else {}, case_sensitive)
+            for name, case_sensitive, keys in backend
+        }
+        element_attrs[attr_name] = ns
+        sets.append(ns)
+    element_attrs['namespace_element_sets'] = sets
+    return element
+
+class CollectionTemplate:
+    """
+    Prototype of a SubmodelElementCollection that is built and validated once and then stamped
+    out with only the Property values filled in. `fields` names the Properties of the prototype
+    in depth-first order, using the keyword names of the matching create_*_collection function.
+    """
+
+    def __init__(self, prototype, fields):
+        self.prototype = prototype
+        self.fields = fields
+        self._plan = _compile_prototype(prototype) if BASYX_INTERNALS else None
+        leaves = []
+        self._new(leaves)
+        if len(leaves) != len(fields):
+            raise ValueError(f"Template {prototype.id_short} has {len(leaves)} Properties but {len(fields)} fields")
+        self.value_types = tuple(prop.value_type for prop in leaves)
+
+    def _new(self, leaves):
+        if self._plan is None or not BASYX_INTERNALS:
+            return _clone(self.prototype, leaves)
+        return _stamp(self._plan, None, leaves)
+
+    def stamp(self, id_short_smc, **values):
+        """
+        Return a new collection with the given id_short and Property values.
+        Fields that are missing or None keep the prototype's empty value.
+        """
+        return self.stamp_values(id_short_smc, [values.get(field) for field in self.fields])
+
+    def stamp_values(self, id_short_smc, values, trusted=False):
+        """
+        Like stamp, with the Property values given as a sequence in the order of `fields`.
+        With trusted the id_short and the values are set without the basyx checks and casts;
+        only for input that passed FPD_Validate (the values then already have their XSD types).
+        """
+        leaves = []
+        smc = self._new(leaves)
+        if trusted and BASYX_INTERNALS:
+            smc._id_short = id_short_smc
+            for prop, value in zip(leaves, values):
+                if value is not None:
+                    prop._value = value
+            return smc
+        smc.id_short = id_short_smc
+        for prop, value in zip(leaves, values):
+            if value is not None:
+                prop.value = value
+        return smc
+
+class RelationTemplate:
+    """
+    Prototype of a flow or usage collection built once by `factory` (add_flow or add_usage) and
+    stamped out with only its two references replaced. The references are not checked by basyx;
+    only for endpoints whose names passed FPD_Validate.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._plan = _compile_prototype(factory()) if BASYX_INTERNALS else None
+
+    def stamp(self, id_short_submodel, source_id_short, target_id_short, target_submodel=None):
+        """Same arguments and result as the factory."""
+        if self._plan is None or not BASYX_INTERNALS:
+            return self.factory(id_short_submodel, source_id_short, target_id_short, target_submodel)
+        smc = _stamp(self._plan, None, [])
+        ref_source, ref_target = smc.value
+        ref_source.value = process_element_reference(id_short_submodel, source_id_short)
+        ref_target.value = process_element_reference(target_submodel or id_short_submodel, target_id_short)
+        return smc
+
+state_template = CollectionTemplate(create_state_collection(), STATE_FIELDS)
+process_operator_template = CollectionTemplate(create_process_operator_collection(), PROCESS_OPERATOR_FIELDS)
+technical_resource_template = CollectionTemplate(create_technical_resource_collection(), TECHNICAL_RESOURCE_FIELDS)
+characteristics_template = CollectionTemplate(create_characteristics_collection(), CHARACTERISTICS_FIELDS)
+flow_template = RelationTemplate(add_flow)
+usage_template = RelationTemplate(add_usage)
@@ -0,0 +1,170 @@
+# Conversion Metrics and Profiling
+# ---------------------------------------------
+# Per-stage timings and counters of a conversion, written as JSON or in the
+# Prometheus text exposition format, plus opt-in cProfile/tracemalloc reports.
+# ---------------------------------------------
+
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+PROMETHEUS_PREFIX = "fpd2aas"
+
+# -------------------------------
+# Stage timings and counters
+# -------------------------------
+class Metrics:
+    """
+    Collects the wall time of each conversion stage, the number of elements
+    read per FPD type and further counters (flows and usages added or dropped
+    because an endpoint could not be resolved, bytes written, cache hits).
+    A Metrics object is plain data, so it can be merged across files and sent
+    between processes as a dict.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.elements = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the enclosed block and adds the time to stage `name`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, n=1):
+        """
+        Adds n to the counter `name`.
+        """
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def count_element(self, el):
+        """
+        Counts one FPD element under its $type suffix (e.g. "Product").
+        """
+        t = el["$type"].rpartition(":")[2]
+        self.elements[t] = self.elements.get(t, 0) + 1
+
+    def counted(self, elements):
+        """
+        Yields the given elements while counting them per type.
+        """
+        for el in elements:
+            self.count_element(el)
+            yield el
+
+    def count_relations(self, t, added):
+        """
+        Records how many relations of type t ("Flow" or "Usage") were added and
+        how many of the elements read were dropped.
+        """
+        key = t.lower() + "s"
+        self.count(key + "_added", added)
+        self.count(key + "_dropped", self.elements.get(t, 0) - added)
+
+    def merge(self, other):
+        """
+        Adds the stages and counters of another Metrics object (or its dict).
+        """
+        other = other if isinstance(other, Metrics) else Metrics.from_dict(other)
+        for target, source in ((self.stages, other.stages), (self.elements, other.elements),
+                               (self.counters, other.counters)):
+            for key, value in source.items():
+                target[key] = target.get(key, 0) + value
+        return self
+
+    def as_dict(self):
+        return {"stages": dict(self.stages), "elements": dict(self.elements), "counters": dict(self.counters)}
+
+    @classmethod
+    def from_dict(cls, data):
+        metrics = cls()
+        metrics.stages.update(data.get("stages", {}))
+        metrics.elements.update(data.get("elements", {}))
+        metrics.counters.update(data.get("counters", {}))
+        return metrics
+
+    def to_json(self):
+        """
+        Returns the metrics as a JSON document.
+        """
+        return json.dumps(self.as_dict(), indent=2)
+
+    def to_prometheus(self, prefix=PROMETHEUS_PREFIX):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        lines = [
+            f"# HELP {prefix}_stage_seconds Wall time spent in each conversion stage.",
+            f"# TYPE {prefix}_stage_seconds counter",
+        ]
+        lines += [f'{prefix}_stage_seconds{{stage="{k}"}} {v:.6f}' for k, v in self.stages.items()]
+        lines += [
+            f"# HELP {prefix}_elements_total FPD elements read, by type.",
+            f"# TYPE {prefix}_elements_total counter",
+        ]
+        lines += [f'{prefix}_elements_total{{type="{k}"}} {v}' for k, v in self.elements.items()]
+        for key, value in self.counters.items():
+            lines.append(f"# TYPE {prefix}_{key}_total counter")
+            lines.append(f"{prefix}_{key}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def format(self, fmt):
+        """
+        Returns the metrics as "json" or "prometheus" text.
+        """
+        if fmt == "json":
+            return self.to_json()
+        if fmt == "prometheus":
+            return self.to_prometheus()
+        raise ValueError(f"Unknown metrics format: {fmt}")
+
+# -------------------------------
+# Opt-in profiling of a conversion
+# -------------------------------
+@contextmanager
+def profiled(path_output, cpu=False, memory=False, top=40):
+    """
+    Profiles the enclosed block and writes the reports next to path_output:
+    with cpu, path_output.prof (pstats data) and path_output.profile.txt;
+    with memory, path_output.tracemalloc.txt with the peak traced memory and
+    the largest allocation sites still alive at the end of the block.
+    Does nothing when neither is requested.
+    """
+    profiler = cProfile.Profile() if cpu else None
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if memory:
+        tracemalloc.reset_peak()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(path_output + ".prof")
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(top)
+            with open(path_output + ".profile.txt", "w", encoding="utf-8") as f:
+                f.write(text.getvalue())
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            with open(path_output + ".tracemalloc.txt", "w", encoding="utf-8") as f:
+                f.write(f"peak: {peak / 2**20:.1f} MiB\ncurrent: {current / 2**20:.1f} MiB\n\n")
+                for stat in snapshot.statistics("lineno")[:top]:
+                    f.write(f"{stat}\n")
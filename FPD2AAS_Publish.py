@@ -0,0 +1,341 @@
+# FPD to AAS Repository Publisher
+# ---------------------------------------------
+# Uploads the FPD_AAS shell and its FPD submodels to an AAS repository over
+# the HTTP/REST API of AAS Part 2 (PUT /submodels/{id}, PUT /shells/{id},
+# with POST when the server does not have them yet). Each submodel goes up
+# whole in one request; with --split the process is spread over several
+# submodels (see FPD_Split), which are uploaded at the same time. The
+# requests share a pool of keep-alive connections, at most --connections
+# run at a time, and failed requests (connection errors, 429 and 5xx) are
+# retried with exponential backoff. The shell is uploaded once all its
+# submodels are. The next file is built while the previous ones upload; at
+# most --window files are uploading at a time.
+# Usage: python FPD2AAS_Publish.py --server URL [--connections N] [--retries N] [--window N]
+#                                  [--header "NAME: VALUE"] [--split MODE [--split-size N]]
+#                                  [--stream] [--validate] INPUT [INPUT ...]
+#   python FPD2AAS_Publish.py --server http://localhost:8081/api/v3.0 FPD.json
+# ---------------------------------------------
+
+import argparse
+import base64
+import http.client
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
+from basyx.aas.adapter.json import json_serialization
+import FPD2AAS
+import FPD2AAS_Metrics
+import FPD_Split
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_WINDOW = 2
+
+# Answers worth another attempt; anything else is final
+RETRY_STATUS = (408, 429, 500, 502, 503, 504)
+
+class PublishError(Exception):
+    """
+    Raised when the repository rejects a request or cannot be reached after all retries.
+    """
+
+    def __init__(self, method, path, status, message):
+        super().__init__(f"{method} {path}: {status or 'no answer'} {message}".rstrip())
+        self.status = status
+
+def encode_id(identifier):
+    """
+    Returns an identifier in the base64url form (without padding) used in Part 2 API paths.
+    """
+    return base64.urlsafe_b64encode(identifier.encode("utf-8")).decode("ascii").rstrip("=")
+
+def to_json(obj):
+    """
+    Returns the AAS JSON serialization of a shell or submodel as bytes.
+    """
+    return json.dumps(obj, cls=json_serialization.AASToJsonEncoder).encode("utf-8")
+
+# -------------------------------
+# Keep-alive connections
+# -------------------------------
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to one server, handed out one per request
+    and put back after its answer has been read. At most `size` are kept open
+    while idle.
+    """
+
+    def __init__(self, url, size=DEFAULT_CONNECTIONS, timeout=DEFAULT_TIMEOUT):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported repository URL {url!r}")
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self.size = size
+        self.timeout = timeout
+        self.opened = 0
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Sends one request and returns (status, response headers, body).
+        A connection that fails is closed and not reused; the error is raised.
+        """
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self.connection_class(self.host, self.port, timeout=self.timeout)
+            with self._lock:
+                self.opened += 1
+        try:
+            connection.request(method, self.base_path + path, body, headers or {})
+            response = connection.getresponse()
+            data = response.read()
+        except Exception:
+            connection.close()
+            raise
+        if response.will_close or self._idle.qsize() >= self.size:
+            connection.close()
+        else:
+            self._idle.put(connection)
+        return response.status, response.headers, data
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+# -------------------------------
+# Publisher
+# -------------------------------
+class Publisher:
+    """
+    Uploads shells and submodels to an AAS repository at `url` (the API root,
+    e.g. http://host:8081/api/v3.0) on `connections` worker threads sharing a
+    ConnectionPool. Requests that fail with a connection error or one of
+    RETRY_STATUS are retried up to `retries` times, waiting backoff, 2 *
+    backoff, ... seconds (or the server's Retry-After).
+    """
+
+    def __init__(self, url, connections=DEFAULT_CONNECTIONS, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 timeout=DEFAULT_TIMEOUT, headers=None, metrics=None):
+        self.pool = ConnectionPool(url, connections, timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.metrics = metrics if metrics is not None else FPD2AAS_Metrics.Metrics()
+        self._executor = ThreadPoolExecutor(max_workers=connections, thread_name_prefix="publish")
+        self._lock = threading.Lock()
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.metrics.count(name, n)
+
+    def _send(self, method, path, body):
+        """
+        Sends a request, retrying as described in the class docstring, and
+        returns (status, body) of the last answer.
+        """
+        for attempt in range(self.retries + 1):
+            delay = self.backoff * 2 ** attempt
+            self._count("http_requests")
+            try:
+                status, headers, data = self.pool.request(method, path, body, self.headers)
+            except (OSError, http.client.HTTPException) as e:
+                if attempt == self.retries:
+                    raise PublishError(method, path, None, f"{type(e).__name__}: {e}") from e
+            else:
+                if status not in RETRY_STATUS or attempt == self.retries:
+                    return status, data
+                try:
+                    delay = max(delay, float(headers.get("Retry-After", 0)))
+                except ValueError:
+                    pass
+            self._count("http_retries")
+            time.sleep(delay)
+
+    def put(self, kind, identifier, body):
+        """
+        Creates or replaces the shell or submodel (kind "shells" or "submodels")
+        with the given id: PUT, and POST if the server does not have it yet.
+        """
+        method, path = "PUT", f"/{kind}/{encode_id(identifier)}"
+        status, data = self._send(method, path, body)
+        if status == 404:
+            method, path = "POST", f"/{kind}"
+            status, data = self._send(method, path, body)
+            if status == 409:
+                # Created by an earlier attempt whose answer was lost
+                method, path = "PUT", f"/{kind}/{encode_id(identifier)}"
+                status, data = self._send(method, path, body)
+        if not 200 <= status < 300:
+            raise PublishError(method, path, status, data.decode("utf-8", "replace")[:200])
+        self._count(f"{kind}_published")
+        self._count("bytes_sent", len(body))
+
+    def submit(self, aas, submodels):
+        """
+        Starts uploading the submodels (one or a list) and then the shell.
+        Returns a Future that is done once the shell is uploaded, or that
+        holds the PublishError of the first failed upload.
+        The bodies are serialized here, so the objects may be changed or
+        dropped once submit returns.
+        """
+        submodels = list(submodels) if isinstance(submodels, (list, tuple)) else [submodels]
+        shell = (aas.id, to_json(aas))
+        bodies = [(submodel.id, to_json(submodel)) for submodel in submodels]
+        done = Future()
+        remaining = [len(bodies)]
+
+        def submodel_done(future):
+            error = future.exception()
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+                if error is not None and not done.done():
+                    done.set_exception(error)
+                    return
+            if last and not done.done():
+                self._executor.submit(self.put, "shells", *shell).add_done_callback(shell_done)
+
+        def shell_done(future):
+            if future.exception() is not None:
+                done.set_exception(future.exception())
+            else:
+                done.set_result(aas.id)
+
+        for identifier, body in bodies:
+            self._executor.submit(self.put, "submodels", identifier, body).add_done_callback(submodel_done)
+        if not bodies:
+            self._executor.submit(self.put, "shells", *shell).add_done_callback(shell_done)
+        return done
+
+    def publish(self, aas, submodels):
+        """
+        Uploads the submodels and then the shell, and waits for them (see submit).
+        """
+        return self.submit(aas, submodels).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# -------------------------------
+# Build and publish FPD JSON files
+# -------------------------------
+def publish_files(paths, publisher, split=None, split_size=FPD_Split.DEFAULT_PART_SIZE, report=print,
+                  metrics=None, window=DEFAULT_WINDOW, **options):
+    """
+    Builds the AAS of each FPD JSON file (see FPD2AAS.build_aas, or
+    build_split_aas with split) and uploads it with the publisher. The next
+    file is built while the previous ones are uploaded; once `window` files
+    are uploading, the oldest is waited for first, so that no more than
+    `window` serialized files are held however fast the files are built.
+    Further keyword options are passed on to the build function.
+    Calls report with one status line per file and returns the list of
+    (path_json, error) pairs for the files that failed. The build metrics of
+    all files are added up in metrics, if given.
+    """
+    metrics = metrics if metrics is not None else FPD2AAS_Metrics.Metrics()
+    failures = []
+    pending = deque()
+
+    def wait_oldest():
+        path_json, start, future = pending.popleft()
+        try:
+            aas_id = future.result()
+            report(f"OK   {path_json} -> {aas_id} ({time.perf_counter() - start:.2f}s)")
+        except Exception as e:
+            failures.append((path_json, f"{type(e).__name__}: {e}"))
+            report(f"FAIL {path_json}: {failures[-1][1]}")
+
+    for path_json in paths:
+        while len(pending) >= max(window, 1):
+            wait_oldest()
+        start = time.perf_counter()
+        try:
+            if split is None:
+                aas, submodels = FPD2AAS.build_aas(path_json, metrics=metrics, **options)
+            else:
+                aas, submodels = FPD2AAS.build_split_aas(path_json, split, split_size, metrics=metrics,
+                                                         **options)
+            pending.append((path_json, start, publisher.submit(aas, submodels)))
+        except Exception as e:
+            failures.append((path_json, f"{type(e).__name__}: {e}"))
+            report(f"FAIL {path_json}: {failures[-1][1]}")
+    while pending:
+        wait_oldest()
+    return failures
+
+# -------------------------------
+# Command line entry point
+# -------------------------------
+def main(argv=None):
+    """
+    Command line entry point. Returns 0 if every file was published and 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Upload the AAS of FPD JSON files to an AAS repository.")
+    parser.add_argument('inputs', nargs='+',
+                        help="FPD JSON files, glob patterns or directories")
+    parser.add_argument('--server', required=True,
+                        help="root URL of the repository API, e.g. http://localhost:8081/api/v3.0")
+    parser.add_argument('--connections', metavar='N', type=int, default=DEFAULT_CONNECTIONS,
+                        help="keep-alive connections and uploads at a time (default: %(default)s)")
+    parser.add_argument('--retries', metavar='N', type=int, default=DEFAULT_RETRIES,
+                        help="retries of a failed request (default: %(default)s)")
+    parser.add_argument('--window', metavar='N', type=int, default=DEFAULT_WINDOW,
+                        help="files uploading at a time while the next one is built (default: %(default)s)")
+    parser.add_argument('--timeout', metavar='SECONDS', type=float, default=DEFAULT_TIMEOUT,
+                        help="socket timeout per request (default: %(default)s)")
+    parser.add_argument('--header', metavar='"NAME: VALUE"', action='append', default=[],
+                        help="extra request header, e.g. for authorization (repeatable)")
+    parser.add_argument('--split', choices=FPD_Split.MODES, default=None,
+                        help="upload the process as several submodels, at the same time (see FPD2AAS.py)")
+    parser.add_argument('--split-size', metavar='N', type=int, default=FPD_Split.DEFAULT_PART_SIZE,
+                        help="elements per submodel with --split size (default: %(default)s)")
+    parser.add_argument('--stream', action='store_true',
+                        help="read the FPD files element by element to bound memory")
+    parser.add_argument('--validate', action='store_true',
+                        help="check each input first and report all its problems at once")
+    parser.add_argument('--metrics', metavar='FILE', default=None,
+                        help="write stage timings and request counters to FILE ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    headers = {}
+    for header in args.header:
+        name, _, value = header.partition(":")
+        headers[name.strip()] = value.strip()
+    paths = FPD2AAS.expand_inputs(args.inputs)
+    metrics = FPD2AAS_Metrics.Metrics()
+    with Publisher(args.server, args.connections, args.retries, timeout=args.timeout, headers=headers) as publisher:
+        failures = publish_files(paths, publisher, args.split, args.split_size, metrics=metrics,
+                                 window=args.window, stream_input=args.stream, columnar=False, validate=args.validate)
+    metrics.merge(publisher.metrics.as_dict())
+    print(f"{len(paths) - len(failures)} of {len(paths)} files published, {len(failures)} failed")
+    if args.metrics == '-':
+        print(metrics.to_json())
+    elif args.metrics:
+        with open(args.metrics, 'w', encoding='utf-8') as f:
+            f.write(metrics.to_json())
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,386 @@
+# FPD to AAS Conversion Service
+# ---------------------------------------------
+# Resident asyncio HTTP service: POST an FPD JSON document to /convert and
+# get the AASX package back. The mapping runs on a pool of worker processes
+# that have imported basyx and built the templates before the first request.
+# Usage: python FPD2AAS_Service.py [--host HOST] [--port PORT] [--workers N]
+#                                  [--queue N] [--max-body MB] [--timeout SECONDS]
+#
+#   curl --data-binary @FPD.json -o FPD.aasx http://127.0.0.1:8080/convert
+#   curl --data-binary @FPD.json -o FPD.aasx "http://127.0.0.1:8080/convert?direct=1&json=1"
+#   curl http://127.0.0.1:8080/health
+#   curl http://127.0.0.1:8080/metrics
+# ---------------------------------------------
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import FPD2AAS_Metrics
+
+AASX_CONTENT_TYPE = "application/asset-administration-shell-package"
+
+DEFAULT_MAX_BODY = 64 * 1024 * 1024
+DEFAULT_TIMEOUT = 300.0
+HEADER_TIMEOUT = 30.0
+MAX_HEADER_BYTES = 64 * 1024
+
+# Download names other than these characters are replaced by the default, so that
+# the name given in the query cannot break the Content-Disposition header
+DOWNLOAD_NAME = re.compile(r"[A-Za-z0-9._-]+")
+DEFAULT_DOWNLOAD_NAME = "FPD"
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    408: "Request Timeout", 411: "Length Required", 413: "Payload Too Large",
+    422: "Unprocessable Entity", 431: "Request Header Fields Too Large",
+    500: "Internal Server Error", 501: "Not Implemented", 503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+# -------------------------------
+# Worker processes
+# -------------------------------
+def _warm_worker():
+    """
+    Pool initializer: imports the converter (basyx, templates, emitter
+    skeletons) and runs one tiny conversion so that the first real request
+    does not pay for any of it.
+    """
+    global FPD2AAS
+    import FPD2AAS
+    import FPD_Generate
+    with tempfile.TemporaryDirectory() as work_dir:
+        path_json = os.path.join(work_dir, "warmup.json")
+        FPD_Generate.generate(10).write(path_json)
+        FPD2AAS.convert_file(path_json, os.path.join(work_dir, "warmup.aasx"))
+        FPD2AAS.convert_file(path_json, os.path.join(work_dir, "warmup.aasx"), direct=True)
+
+def _ping():
+    return os.getpid()
+
+def _convert_bytes(body, options):
+    """
+    Converts an FPD JSON document given as bytes and returns (aasx bytes, metrics dict).
+    """
+    metrics = FPD2AAS_Metrics.Metrics()
+    with tempfile.TemporaryDirectory() as work_dir:
+        path_json = os.path.join(work_dir, "input.json")
+        path_aasx = os.path.join(work_dir, "output.aasx")
+        with open(path_json, "wb") as f:
+            f.write(body)
+        FPD2AAS.convert_file(path_json, path_aasx, metrics=metrics, **options)
+        with open(path_aasx, "rb") as f:
+            return f.read(), metrics.as_dict()
+
+async def _discard(reader, length, chunk_size=1 << 16):
+    """
+    Reads and drops up to length bytes from the connection.
+    """
+    while length > 0:
+        chunk = await reader.read(min(length, chunk_size))
+        if not chunk:
+            return
+        length -= len(chunk)
+
+# -------------------------------
+# HTTP errors
+# -------------------------------
+class HTTPError(Exception):
+    """
+    An error answered with the given status code and message.
+    """
+
+    def __init__(self, status, message="", headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message or REASONS.get(status, "")
+        self.headers = headers or {}
+
+# -------------------------------
+# Service
+# -------------------------------
+class ConversionService:
+    """
+    HTTP front end over a pool of warm conversion workers.
+    At most `workers` conversions run at a time and at most `queue` more wait
+    for a worker; further requests are rejected with 503 and a Retry-After
+    header instead of piling up. Bodies larger than max_body are rejected
+    with 413, and conversions running longer than timeout with 504. A
+    conversion answered with 504 cannot be stopped; it keeps its worker and
+    counts against the limit until it has finished.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8080, workers=None, queue=None,
+                 max_body=DEFAULT_MAX_BODY, timeout=DEFAULT_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.queue = self.workers * 2 if queue is None else queue
+        self.max_body = max_body
+        self.timeout = timeout
+        self.metrics = FPD2AAS_Metrics.Metrics()
+        self.started = None
+        self._pool = None
+        self._server = None
+        self._slots = None
+        self._in_flight = 0
+        self._running = 0
+
+    async def start(self):
+        """
+        Starts and warms the worker pool, then starts listening.
+        With port 0 a free port is chosen; self.port holds the actual port.
+        """
+        loop = asyncio.get_running_loop()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        # Make every worker start (and warm up) before accepting requests
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _ping) for _ in range(self.workers)))
+        self._slots = asyncio.Semaphore(self.workers)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.started = time.time()
+
+    async def close(self):
+        """
+        Stops listening and shuts the worker pool down.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Serving on http://{self.host}:{self.port} with {self.workers} workers")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    # -------------------------------
+    # Connection handling
+    # -------------------------------
+    async def _handle_connection(self, reader, writer):
+        """
+        Serves requests on one connection until the client closes it or asks
+        to close it (HTTP/1.1 keep-alive is supported).
+        """
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader, writer), HEADER_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if request is None:
+                    break
+                method, target, headers, body, keep_alive = request
+                status, content_type, payload, extra = await self._dispatch(method, target, headers, body)
+                await self._send(writer, status, content_type, payload, extra, keep_alive)
+        except HTTPError as e:
+            self.metrics.count(f"http_{e.status}")
+            await self._send(writer, e.status, "text/plain; charset=utf-8", (e.message + "\n").encode(), e.headers, False)
+            await asyncio.wait_for(_discard(reader, getattr(e, "discard", 0)), HEADER_TIMEOUT)
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader, writer):
+        """
+        Reads one request. Returns None when the connection was closed before a
+        request line, or (method, target, headers, body, keep_alive).
+        """
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if not e.partial.strip():
+                return None
+            raise HTTPError(400, "Incomplete request header")
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431)
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HTTPError(411, "Chunked bodies are not supported; send Content-Length")
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        expect_continue = headers.get("expect", "").lower() == "100-continue"
+        if length > self.max_body:
+            error = HTTPError(413, f"Body exceeds {self.max_body} bytes")
+            # A client that did not wait for 100 Continue is already sending the
+            # body; it has to be read and dropped or the client sees a reset
+            error.discard = 0 if expect_continue else length
+            raise error
+        if expect_continue and length:
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+        body = await asyncio.wait_for(reader.readexactly(length), self.timeout) if length else b""
+        return method, target, headers, body, keep_alive
+
+    async def _send(self, writer, status, content_type, payload, headers, keep_alive):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                 f"Content-Type: {content_type}",
+                 f"Content-Length: {len(payload)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+    # -------------------------------
+    # Routes
+    # -------------------------------
+    async def _dispatch(self, method, target, headers, body):
+        """
+        Routes a request and returns (status, content type, payload, extra headers).
+        """
+        url = urlsplit(target)
+        self.metrics.count("http_requests")
+        try:
+            if url.path == "/convert":
+                if method != "POST":
+                    raise HTTPError(405, "Use POST", {"Allow": "POST"})
+                options = self._options(parse_qs(url.query))
+                payload = await self._convert(body, options)
+                return 200, AASX_CONTENT_TYPE, payload, {
+                    "Content-Disposition": f'attachment; filename="{self._download_name(url.query)}.aasx"'}
+            if method != "GET":
+                raise HTTPError(405, "Use GET", {"Allow": "GET"})
+            if url.path == "/health":
+                return 200, "application/json", json.dumps(self.health()).encode(), {}
+            if url.path == "/metrics":
+                return 200, "text/plain; version=0.0.4", self.prometheus().encode(), {}
+            raise HTTPError(404)
+        except HTTPError as e:
+            self.metrics.count(f"http_{e.status}")
+            return e.status, "text/plain; charset=utf-8", (e.message + "\n").encode(), e.headers
+
+    @staticmethod
+    def _download_name(query):
+        """
+        Returns the name query parameter if it is a plain file name, or the default.
+        """
+        name = parse_qs(query).get("name", [DEFAULT_DOWNLOAD_NAME])[0]
+        return name if DOWNLOAD_NAME.fullmatch(name) else DEFAULT_DOWNLOAD_NAME
+
+    @staticmethod
+    def _options(query):
+        """
+        Maps query parameters (direct, json, stream) to convert_file options.
+        """
+        flag = lambda key: query.get(key, ["0"])[0].lower() in ("1", "true", "yes")
+        return {"direct": flag("direct"), "write_json": flag("json"), "stream_input": flag("stream")}
+
+    async def _convert(self, body, options):
+        """
+        Runs one conversion on the pool, applying the queue limit and timeout.
+        The worker slot and the place in the queue are given back when the job
+        has finished on the pool, not when the request is answered.
+        """
+        if not body:
+            raise HTTPError(400, "Empty body; POST an FPD JSON document")
+        if self._in_flight >= self.workers + self.queue:
+            self.metrics.count("requests_rejected")
+            raise HTTPError(503, "All workers busy, try again later", {"Retry-After": "1"})
+        self._in_flight += 1
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            self._in_flight -= 1
+            raise
+        self._running += 1
+        future = asyncio.get_running_loop().run_in_executor(self._pool, _convert_bytes, body, options)
+        future.add_done_callback(self._job_finished)
+        try:
+            # Shielded, so that a timeout leaves the job running and its slot taken
+            payload, job_metrics = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.metrics.count("conversions_timed_out")
+            raise HTTPError(504, f"Conversion took longer than {self.timeout:g}s")
+        except Exception as e:
+            self.metrics.count("conversions_failed")
+            raise HTTPError(422, f"{type(e).__name__}: {e}")
+        self.metrics.merge(job_metrics)
+        return payload
+
+    def _job_finished(self, future):
+        """
+        Done callback of a pool job: frees its worker slot and its place in the queue.
+        """
+        self._running -= 1
+        self._in_flight -= 1
+        self._slots.release()
+        if not future.cancelled():
+            future.exception()      # Retrieved, so that a timed-out job's error is not logged as unhandled
+
+    def health(self):
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "running": self._running,
+            "queued": self._in_flight - self._running,
+            "queue_limit": self.queue,
+            "uptime_seconds": round(time.time() - self.started, 3) if self.started else 0,
+        }
+
+    def prometheus(self):
+        """
+        Returns the service gauges and the added-up conversion metrics in Prometheus text format.
+        """
+        prefix = FPD2AAS_Metrics.PROMETHEUS_PREFIX
+        health = self.health()
+        lines = []
+        for key in ("workers", "running", "queued", "queue_limit"):
+            lines.append(f"# TYPE {prefix}_service_{key} gauge")
+            lines.append(f"{prefix}_service_{key} {health[key]}")
+        return "\n".join(lines) + "\n" + self.metrics.to_prometheus(prefix)
+
+# -------------------------------
+# Command line entry point
+# -------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve FPD to AAS conversions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: number of CPU cores)")
+    parser.add_argument("--queue", type=int, default=None,
+                        help="requests allowed to wait for a worker (default: 2 per worker)")
+    parser.add_argument("--max-body", metavar="MB", type=int, default=DEFAULT_MAX_BODY >> 20,
+                        help="largest accepted FPD document (default: %(default)s MB)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="seconds before a conversion is answered with 504 (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    service = ConversionService(args.host, args.port, args.workers, args.queue,
+                                args.max_body << 20, args.timeout)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+# FPD to AAS Watch Mode
+# ---------------------------------------------
+# Long-running conversion of a folder of FPD exports: the inputs are scanned
+# every --interval seconds and each file whose content changed is converted
+# again once it has not been written to for --debounce seconds. A change is
+# a new size or modification time whose SHA-256 also differs from the one of
+# the last conversion, so touching or re-saving an unchanged export does not
+# convert it again. At most --jobs conversions run at a time.
+# The size, modification time and hash of each converted file are kept in a
+# state file in the output directory, so a restart only converts the files
+# that changed while the watcher was not running.
+# Usage: python FPD2AAS_Watch.py [-o OUTPUT_DIR] [-j JOBS] [--interval SECONDS] [--debounce SECONDS]
+#                                [--state FILE] [--once] [--stream] [--direct] [--json]
+#                                [--cache DIR] [--validate] INPUT [INPUT ...]
+# Each INPUT is an FPD JSON file, a glob pattern or a directory of *.json files
+# (as for FPD2AAS.py); new files matching them are picked up on the next scan.
+# ---------------------------------------------
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import FPD2AAS
+import FPD2AAS_Cache
+import FPD2AAS_Metrics
+
+STATE_NAME = ".fpd2aas-watch.json"
+STATE_VERSION = 1
+
+DEFAULT_INTERVAL = 1.0
+DEFAULT_DEBOUNCE = 2.0
+HASH_CHUNK_SIZE = 1 << 20
+
+def file_digest(path):
+    """
+    Returns the SHA-256 of a file's content as a hex string.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _stat(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+# -------------------------------
+# Watcher
+# -------------------------------
+class Watcher:
+    """
+    Converts the FPD JSON files matched by `inputs` into output_dir and keeps
+    them converted. Each call of scan looks at every input once; run repeats
+    it every `interval` seconds. `options` are passed on to
+    FPD2AAS.convert_file; when they differ from those in the state file every
+    file is converted again.
+    """
+
+    def __init__(self, inputs, output_dir, jobs=None, interval=DEFAULT_INTERVAL, debounce=DEFAULT_DEBOUNCE,
+                 state_path=None, report=print, metrics=None, **options):
+        self.inputs = inputs
+        self.output_dir = output_dir
+        self.jobs = jobs or os.cpu_count() or 1
+        self.interval = interval
+        self.debounce = debounce
+        self.state_path = state_path or os.path.join(output_dir, STATE_NAME)
+        self.report = report
+        self.metrics = metrics if metrics is not None else FPD2AAS_Metrics.Metrics()
+        self.options = options
+        self.files = {}          # input path -> {"stat", "sha256", "output", "error"} of its last conversion
+        self._seen = {}          # input path -> (stat, time it was first seen) while it is settling
+        self._queue = []         # (path, stat, digest) ready to be converted, in scan order
+        self._running = {}       # future -> (path, stat, digest)
+        self._pool = None
+        self._dirty = False
+        os.makedirs(output_dir, exist_ok=True)
+        self.load_state()
+
+    # -------------------------------
+    # Persistent state
+    # -------------------------------
+    def _fingerprint(self):
+        return json.dumps(self.options, sort_keys=True, default=str)
+
+    def load_state(self):
+        """
+        Reads the state file, if there is one written with the same options.
+        """
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("version") != STATE_VERSION:
+            return
+        if state.get("options") != self._fingerprint():
+            self.report("Conversion options changed since the last run; converting every file again")
+            return
+        self.files = state.get("files", {})
+
+    def save_state(self):
+        """
+        Writes the state file if anything was converted since it was last written.
+        """
+        if not self._dirty:
+            return
+        state = {"version": STATE_VERSION, "options": self._fingerprint(), "files": self.files}
+        # Written under a temporary name so that a crash never leaves a partial state file
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.state_path)
+        self._dirty = False
+
+    # -------------------------------
+    # Change detection
+    # -------------------------------
+    def _up_to_date(self, path, stat):
+        record = self.files.get(path)
+        if record is None or record["stat"] != stat:
+            return False
+        return record.get("error") is not None or os.path.exists(record["output"])
+
+    def scan(self, now=None):
+        """
+        Looks at every input once and queues the files whose content changed
+        and that have settled. Returns the number of files queued.
+        """
+        now = time.monotonic() if now is None else now
+        paths = [os.path.abspath(path) for path in FPD2AAS.expand_inputs(self.inputs) if os.path.isfile(path)]
+        present = set(paths)
+        for path in list(self.files):
+            if path not in present:
+                del self.files[path]
+                self._dirty = True
+                self.metrics.count("files_removed")
+                self.report(f"GONE {path}")
+        for path in list(self._seen):
+            if path not in present:
+                del self._seen[path]
+
+        busy = {entry[0] for entry in self._running.values()} | {entry[0] for entry in self._queue}
+        queued = 0
+        for path in paths:
+            if path in busy:
+                continue            # Looked at again once its conversion has finished
+            try:
+                stat = _stat(path)
+            except OSError:
+                continue            # Deleted or replaced since the directory was listed
+            if self._up_to_date(path, stat):
+                self._seen.pop(path, None)
+                continue
+            seen = self._seen.get(path)
+            if seen is None or seen[0] != stat:
+                self._seen[path] = (stat, now)
+                if self.debounce > 0:
+                    continue
+            elif now - seen[1] < self.debounce:
+                continue
+            # Settled: compare the content with the last conversion
+            del self._seen[path]
+            try:
+                digest = file_digest(path)
+            except OSError:
+                continue
+            record = self.files.get(path)
+            if record is not None and record["sha256"] == digest and self._up_to_date(path, record["stat"]):
+                record["stat"] = stat
+                self._dirty = True
+                self.metrics.count("files_unchanged")
+                continue
+            self._queue.append((path, stat, digest))
+            queued += 1
+        return queued
+
+    # -------------------------------
+    # Conversion on the worker pool
+    # -------------------------------
+    def _submit(self):
+        """
+        Starts queued conversions while fewer than `jobs` are running.
+        Two inputs with the same output name are not converted at the same time.
+        """
+        targets = {FPD2AAS.output_path(entry[0], self.output_dir) for entry in self._running.values()}
+        waiting = []
+        for entry in self._queue:
+            path_aasx = FPD2AAS.output_path(entry[0], self.output_dir)
+            if len(self._running) >= self.jobs or path_aasx in targets:
+                waiting.append(entry)
+                continue
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.jobs)
+            targets.add(path_aasx)
+            future = self._pool.submit(FPD2AAS._convert_job, entry[0], path_aasx, self.options)
+            self._running[future] = entry
+        self._queue = waiting
+
+    def _collect(self, timeout):
+        """
+        Waits up to timeout seconds for running conversions and records the finished ones.
+        """
+        if not self._running:
+            if timeout:
+                time.sleep(timeout)
+            return
+        done, _ = wait(self._running, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            path, stat, digest = self._running.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker itself died (e.g. out of memory)
+                result = (path, FPD2AAS.output_path(path, self.output_dir), f"{type(e).__name__}: {e}", 0.0,
+                          {"counters": {"files_failed": 1}})
+            _, path_aasx, error, seconds, job_metrics = result
+            self.metrics.merge(job_metrics)
+            self.files[path] = {"stat": stat, "sha256": digest, "output": os.path.abspath(path_aasx), "error": error}
+            self._dirty = True
+            if error is None:
+                self.report(f"OK   {path} -> {path_aasx} ({seconds:.2f}s)")
+            else:
+                self.report(f"FAIL {path}: {error}")
+        self.save_state()
+
+    def step(self, timeout=None):
+        """
+        Scans the inputs, starts conversions and waits up to timeout seconds
+        (default: interval) for running ones.
+        """
+        self.scan()
+        self._submit()
+        self.save_state()
+        self._collect(self.interval if timeout is None else timeout)
+
+    def run_once(self):
+        """
+        Converts every changed input now, without waiting for it to settle,
+        and returns the number of files that failed.
+        """
+        debounce, self.debounce = self.debounce, 0
+        try:
+            self.scan()
+        finally:
+            self.debounce = debounce
+        paths = {entry[0] for entry in self._queue}
+        while self._queue or self._running:
+            self._submit()
+            self._collect(None)
+        self.save_state()
+        return sum(1 for path in paths if self.files.get(path, {}).get("error") is not None)
+
+    def run(self):
+        """
+        Scans and converts until interrupted.
+        """
+        try:
+            while True:
+                self.step()
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Waits for running conversions, records them and shuts the worker pool down.
+        """
+        while self._running:
+            self._collect(None)
+        self.save_state()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+# -------------------------------
+# Command line entry point
+# -------------------------------
+def main(argv=None):
+    """
+    Command line entry point. With --once returns 0 if every changed file was
+    converted and 1 otherwise; without it runs until interrupted.
+    """
+    parser = argparse.ArgumentParser(description="Keep the AASX packages of a folder of FPD exports up to date.")
+    parser.add_argument('inputs', nargs='+',
+                        help="FPD JSON files, glob patterns or directories to watch")
+    parser.add_argument('-o', '--output-dir', default='.',
+                        help="directory for the AASX files and the watch state (default: current directory)")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="conversions running at a time (default: number of CPU cores)")
+    parser.add_argument('--interval', metavar='SECONDS', type=float, default=DEFAULT_INTERVAL,
+                        help="time between two scans of the inputs (default: %(default)s)")
+    parser.add_argument('--debounce', metavar='SECONDS', type=float, default=DEFAULT_DEBOUNCE,
+                        help="convert a file once it has not changed for this long (default: %(default)s)")
+    parser.add_argument('--state', metavar='FILE', default=None,
+                        help=f"state file (default: {STATE_NAME} in the output directory)")
+    parser.add_argument('--once', action='store_true',
+                        help="convert the files that changed since the last run and exit")
+    parser.add_argument('--stream', action='store_true',
+                        help="read the FPD files element by element to bound memory")
+    parser.add_argument('--direct', action='store_true',
+                        help="emit the AAS part directly instead of building the basyx object graph")
+    parser.add_argument('--json', action='store_true',
+                        help="write the AAS part as JSON instead of XML")
+    parser.add_argument('--cache', metavar='DIR', default=None,
+                        help="reuse unchanged elements from a per-element cache in DIR (implies --direct)")
+    parser.add_argument('--cache-size', metavar='MB', type=int, default=FPD2AAS_Cache.DEFAULT_MAX_BYTES >> 20,
+                        help="evict cache entries beyond this size (default: %(default)s MB)")
+    parser.add_argument('--validate', action='store_true',
+                        help="check each input first and report all its problems at once")
+    args = parser.parse_args(argv)
+
+    watcher = Watcher(args.inputs, args.output_dir, args.jobs, args.interval, args.debounce, args.state,
+                      stream_input=args.stream, direct=args.direct, write_json=args.json,
+                      cache_dir=args.cache, cache_size=args.cache_size << 20, validate=args.validate)
+    if args.once:
+        try:
+            failed = watcher.run_once()
+        finally:
+            watcher.close()
+        return 1 if failed else 0
+    print(f"Watching {', '.join(args.inputs)} -> {args.output_dir} (Ctrl+C to stop)")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,991 @@
+# FPD to AAS Benchmark
+# ---------------------------------------------
+# Times each stage of the conversion on synthetic FPD documents of growing
+# size and records wall time and peak memory. Results can be saved as a
+# baseline and later runs compared against it to catch regressions.
+# Usage: python FPD_Benchmark.py [--sizes 10,1000,100000] [--repeat N] [--no-memory]
+#                                [--work-dir DIR] [--output RESULTS.json]
+#                                [--save-baseline FILE] [--baseline FILE [--tolerance 0.25]]
+#        python FPD_Benchmark.py --relations N
+#        python FPD_Benchmark.py --model N
+#        python FPD_Benchmark.py --mapping N
+#        python FPD_Benchmark.py --import N
+#        python FPD_Benchmark.py --graph N
+#        python FPD_Benchmark.py --validate N
+#        python FPD_Benchmark.py --insert N
+#        python FPD_Benchmark.py --index N
+#        python FPD_Benchmark.py --delta N
+#        python FPD_Benchmark.py --publish N
+#        python FPD_Benchmark.py --merge N [--projects P]
+# ---------------------------------------------
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from basyx.aas import model
+from basyx.aas.adapter import aasx
+import FPD2AAS_Functions as func
+import FPD
+import FPD2AAS
+import FPD2AAS_Emit
+import FPD_Generate
+import FPD_Model
+import FPD_Mapping
+import FPD_Import
+import FPD_Index
+import FPD_Delta
+import FPD2AAS_Publish
+import FPD2AAS_Metrics
+import FPD_Merge
+import FPD_Validate
+from tests.standin import Repository
+
+DEFAULT_SIZES = (10, 1000, 10000)
+
+# -------------------------------
+# Stages in pipeline order
+# -------------------------------
+STAGES = (
+    "load",
+    "extract_data",
+    "add_project_info",
+    "add_state_info",
+    "add_process_operator_info",
+    "add_technical_resource_info",
+    "add_flows",
+    "add_usages",
+    "write_aasx",
+    "direct_emit",
+)
+
+# Stages faster than this are not compared for time; their timings are mostly noise
+MIN_COMPARED_SECONDS = 0.005
+
+# -------------------------------
+# Stage measurement
+# -------------------------------
+class _Recorder:
+    """
+    Records the wall time of each stage and, when tracemalloc is running,
+    the peak of traced memory during the stage.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, stage, fn, *args):
+        gc.collect()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = fn(*args)
+        seconds = time.perf_counter() - start
+        entry = {"seconds": seconds}
+        if tracing:
+            entry["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        self.stages[stage] = entry
+        return result
+
+def run_stages(path_json, path_aasx):
+    """
+    Converts path_json once, stage by stage, the same way FPD2AAS.build_aas and
+    FPD2AAS.write_aasx do, followed by the direct emitter.
+    Returns a dict mapping each stage to {"seconds": ..., ["peak_bytes": ...]}.
+    """
+    rec = _Recorder()
+
+    def load():
+        with open(path_json, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def write(aas, submodel, smc_project_information, smc_process, sml_flows, sml_usages):
+        submodel.submodel_element.add(smc_project_information)
+        submodel.submodel_element.add(smc_process)
+        submodel.submodel_element.add(sml_flows)
+        submodel.submodel_element.add(sml_usages)
+        aas.submodel.add(model.ModelReference.from_referable(submodel))
+        FPD2AAS.write_aasx(aas, submodel, path_aasx)
+
+    fpd_data = rec.run("load", load)
+    project, process, elements = rec.run("extract_data", FPD.extract_data, fpd_data)
+    aas = func.create_fpd_aas('FPD_AAS')
+    submodel = func.create_fpd_submodel('FPD')
+    smc_process = func.create_process_collection('process')
+    sml_flows = func.create_flows_list()
+    sml_usages = func.create_usages_list()
+    smc_project_information = rec.run("add_project_info", FPD.add_project_info, project)
+    rec.run("add_state_info", FPD.add_state_info, elements, smc_process)
+    rec.run("add_process_operator_info", FPD.add_process_operator_info, elements, smc_process)
+    rec.run("add_technical_resource_info", FPD.add_technical_resource_info, elements, smc_process)
+    rec.run("add_flows", FPD.add_flows, elements, sml_flows)
+    rec.run("add_usages", FPD.add_usages, elements, sml_usages)
+    rec.run("write_aasx", write, aas, submodel, smc_project_information, smc_process, sml_flows, sml_usages)
+
+    del fpd_data, elements, aas, submodel, smc_process, sml_flows, sml_usages
+    rec.run("direct_emit", lambda: FPD2AAS_Emit.write_aasx_direct(*FPD2AAS.read_fpd(path_json), path_aasx))
+    return rec.stages
+
+# -------------------------------
+# Benchmark over several sizes
+# -------------------------------
+def input_path(work_dir, size, seed):
+    """
+    Returns the path of the synthetic input of the given size, generating it if needed.
+    """
+    path = os.path.join(work_dir, f"fpd_{size}_seed{seed}.json")
+    if not os.path.exists(path):
+        FPD_Generate.generate(size, seed).write(path)
+    return path
+
+def benchmark(sizes=DEFAULT_SIZES, repeat=3, memory=True, work_dir=None, seed=0, report=print):
+    """
+    Runs the stages on synthetic documents of each size. Times are the best of
+    `repeat` runs; with memory, one extra run under tracemalloc records the
+    peak memory of each stage. Returns the results as a JSON-compatible dict.
+    """
+    work_dir = work_dir or os.path.join(tempfile.gettempdir(), "fpd2aas-bench")
+    os.makedirs(work_dir, exist_ok=True)
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "sizes": {},
+    }
+    for size in sizes:
+        path_json = input_path(work_dir, size, seed)
+        path_aasx = os.path.join(work_dir, f"fpd_{size}.aasx")
+        stages = {}
+        for _ in range(repeat):
+            for stage, entry in run_stages(path_json, path_aasx).items():
+                best = stages.setdefault(stage, {"seconds": entry["seconds"]})
+                best["seconds"] = min(best["seconds"], entry["seconds"])
+        if memory:
+            tracemalloc.start()
+            try:
+                for stage, entry in run_stages(path_json, path_aasx).items():
+                    stages[stage]["peak_bytes"] = entry["peak_bytes"]
+            finally:
+                tracemalloc.stop()
+        results["sizes"][str(size)] = {
+            "input_bytes": os.path.getsize(path_json),
+            "stages": stages,
+        }
+        report(format_size(size, results["sizes"][str(size)]))
+    return results
+
+def format_size(size, result):
+    """
+    Formats the results of one size as a table.
+    """
+    lines = [f"{size} elements ({result['input_bytes'] / 1e6:.1f} MB input)"]
+    for stage in STAGES:
+        entry = result["stages"].get(stage)
+        if entry is None:
+            continue
+        line = f"  {stage:<28} {entry['seconds'] * 1000:>10.1f} ms"
+        if "peak_bytes" in entry:
+            line += f" {entry['peak_bytes'] / 2**20:>10.1f} MiB peak"
+        lines.append(line)
+    return "\n".join(lines)
+
+# -------------------------------
+# Memory of flows and usages with and without interned references
+# -------------------------------
+def _measure(fn):
+    """
+    Runs fn under tracemalloc and returns (result, seconds, bytes still allocated).
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+        current = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, seconds, current
+
+def _plain_reference(id_short_submodel, id_short):
+    """A new ModelReference with its own Keys, as every endpoint had before interning."""
+    return model.ModelReference((
+        model.Key(type_=model.KeyTypes.SUBMODEL, value=func.get_id_management_submodel(id_short_submodel)),
+        model.Key(type_=model.KeyTypes.SUBMODEL_ELEMENT_COLLECTION, value='process'),
+        model.Key(type_=model.KeyTypes.SUBMODEL_ELEMENT_COLLECTION, value=id_short),
+    ), model.SubmodelElementCollection)
+
+def _plain_flow(id_short_submodel, incoming_id_short, outcoming_id_short):
+    """The flow collection of func.add_flow, built with plain References."""
+    return model.SubmodelElementCollection(id_short=None, category='PARAMETER', value=(
+        model.ReferenceElement(id_short='incoming', category='PARAMETER',
+                               value=_plain_reference(id_short_submodel, incoming_id_short)),
+        model.ReferenceElement(id_short='outcoming', category='PARAMETER',
+                               value=_plain_reference(id_short_submodel, outcoming_id_short)),
+    ))
+
+def relation_memory(relations=100000, states=1000, repeat=3, report=print):
+    """
+    Builds `relations` flows between `states` distinct process elements with
+    plain References per endpoint and with func.add_flow, which shares the
+    interned Keys and References of func.process_element_reference. Reports
+    the memory held by the flows (under tracemalloc) and the best build time
+    of `repeat` untraced rounds of each, and returns them as a dict.
+    """
+    names = [f"State_{i}" for i in range(states)]
+    builds = {label: (lambda flow=flow: [flow("FPD", names[i % states], names[(i * 7 + 1) % states])
+                                         for i in range(relations)])
+              for label, flow in (("plain", _plain_flow), ("interned", func.add_flow))}
+    results = {}
+    for label, build in builds.items():
+        func.clear_reference_cache()
+        flows, _, current = _measure(build)
+        del flows
+        results[label] = {"seconds": None, "bytes": current}
+    for n in range(repeat):
+        for label, build in (list(builds.items()) if n % 2 == 0 else list(builds.items())[::-1]):
+            func.clear_reference_cache()
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                flows = build()
+                seconds = time.perf_counter() - start
+            finally:
+                gc.enable()
+            del flows
+            best = results[label]["seconds"]
+            results[label]["seconds"] = seconds if best is None else min(best, seconds)
+    func.clear_reference_cache()
+    for label, result in results.items():
+        report(f"  {label:<10} {result['seconds'] * 1000:>10.1f} ms {result['bytes'] / 2**20:>10.1f} MiB")
+    saved = 1 - results["interned"]["bytes"] / results["plain"]["bytes"]
+    faster = results["plain"]["seconds"] / results["interned"]["seconds"]
+    report(f"  {relations} flows over {states} states: {saved:.0%} less memory, {faster:.2f}x the speed with interning")
+    return results
+
+# -------------------------------
+# Memory and mapping time of the JSON elements and the decoded model
+# -------------------------------
+def model_memory(size=100000, seed=0, report=print):
+    """
+    Holds the elements of a synthetic document of `size` elements once as JSON
+    dicts and once decoded into FPD_Model objects, and maps every state to
+    its collection values from each. The JSON elements are mapped through a
+    decode per call, as the builders did before reading the model.
+    Reports the memory held and the mapping time and returns them as a dict.
+    """
+    doc = FPD_Generate.generate(size, seed).document()
+    text = json.dumps(doc[1]["elementDataInformation"])
+    del doc
+
+    def states(elements, t):
+        return [el for el in elements if (el["$type"].rpartition(":")[2] if isinstance(el, dict) else el.type) == t]
+
+    results = {}
+    for label, load in (("json", lambda: json.loads(text)),
+                        ("model", lambda: [FPD_Model.decode(el) for el in json.loads(text)])):
+        elements, _, current = _measure(load)
+        products = states(elements, "Product")
+        start = time.perf_counter()
+        values = FPD_Mapping.BUILDERS["Product"].values
+        for el in products:
+            values(FPD_Model.decode(el))
+        seconds = time.perf_counter() - start
+        del elements, products
+        results[label] = {"seconds": seconds, "bytes": current}
+        report(f"  {label:<10} {seconds * 1000:>10.1f} ms {current / 2**20:>10.1f} MiB")
+    saved = 1 - results["model"]["bytes"] / results["json"]["bytes"]
+    report(f"  {size} elements: {saved:.0%} less memory held by the decoded model")
+    return results
+
+# -------------------------------
+# Compiled mapping table against the hand-written builders
+# -------------------------------
+def _characteristic_values(ch):
+    """Hand-written mapping of a characteristic to the create_characteristics_collection keywords."""
+    category = ch.category
+    return dict(
+        unique_ident=category.unique_ident, long_name=category.long_name, short_name=category.short_name,
+        version=category.version, revision=category.revision,
+        prop_view=ch.view, prop_model=ch.model, prop_regulation=ch.regulation,
+        value_determination_process=ch.value_determination_process, representivity=ch.representivity,
+        value_actual_value=ch.actual.value, unit_actual_value=ch.actual.unit,
+        value_setpoint=ch.setpoint.value, unit_setpoint=ch.setpoint.unit,
+        limit_type=ch.limit_type, from_date=ch.valid_from, to_date=ch.valid_to
+    )
+
+def handwritten_build(el):
+    """
+    Builds the collection of a decoded element the way FPD did before the
+    mapping table: one keyword mapper per type stamped into func's templates.
+    """
+    ident = el.identification
+    characteristics = el.characteristics
+    values = dict(
+        unique_ident_ident=el.id, long_name_ident=ident.long_name, short_name_ident=ident.short_name,
+        version_ident=ident.version, revision_ident=ident.revision,
+        assignment=",".join(el.assigned_to) if el.assigned_to else None
+    )
+    if el.type in FPD.STATE_TYPES:
+        template = func.state_template
+        values.update(id_short_smc=el.name, state_type=el.type)
+        if characteristics:
+            values.update(_characteristic_values(characteristics[0]))
+    else:
+        template = func.process_operator_template if el.type == "ProcessOperator" else func.technical_resource_template
+        values.update(id_short_smc=el.name, **_characteristic_values(
+            characteristics[0] if characteristics else FPD_Model.EMPTY_CHARACTERISTIC))
+        if el.type == "ProcessOperator":
+            values.update(id_short_smc=el.name.strip(), short_name_ident=ident.short_name.strip())
+    smc = template.stamp(**values)
+    for i, ch in enumerate(characteristics[1:], 2):
+        smc.value.add(func.characteristics_template.stamp(f"characteristics_{i}", **_characteristic_values(ch)))
+    return smc
+
+def _property_values(smc):
+    """Returns the id_shorts and Property values of a collection, depth-first."""
+    result = [smc.id_short]
+    for child in smc.value:
+        if isinstance(child, model.SubmodelElementCollection):
+            result.extend(_property_values(child))
+        else:
+            result.append((child.id_short, child.value))
+    return result
+
+# Both builders spend most of their time stamping the same templates, so a single run is
+# dominated by noise; the best of this many rounds is compared
+MAPPING_ROUNDS = 20
+
+def mapping_speed(size=10000, seed=0, characteristics=1, repeat=MAPPING_ROUNDS, report=print):
+    """
+    Builds the collections of every state, operator and resource of a synthetic
+    document with the builders compiled from FPD_Mapping.MAPPINGS and with the
+    hand-written ones, checks that both give the same collections and reports
+    the best time of each per type over `repeat` rounds, alternating which
+    builder runs first. Returns the times as a dict.
+    """
+    doc = FPD_Generate.generate(size, seed, characteristics).document()
+    elements = FPD.ElementIndex(doc[1]["elementDataInformation"])
+    del doc
+    results = {}
+    for t, builder in FPD_Mapping.BUILDERS.items():
+        items = elements.of_type(t)
+        if not items:
+            continue
+        for el in items[:100]:
+            if _property_values(builder.build(el)) != _property_values(handwritten_build(el)):
+                raise AssertionError(f"Compiled and hand-written {t} collections differ for {el.id}")
+        builds = [("handwritten", handwritten_build), ("compiled", builder.build)]
+        times = {}
+        for n in range(repeat):
+            for label, build in (builds if n % 2 == 0 else builds[::-1]):
+                # The collections are cyclic; keep the collector from running inside the timed loop
+                gc.collect()
+                gc.disable()
+                try:
+                    start = time.perf_counter()
+                    for el in items:
+                        build(el)
+                    seconds = time.perf_counter() - start
+                finally:
+                    gc.enable()
+                times[label] = min(times.get(label, seconds), seconds)
+        results[t] = times
+        report(f"  {t:<20} {len(items):>8} elements  handwritten {times['handwritten'] * 1000:>9.1f} ms"
+               f"  compiled {times['compiled'] * 1000:>9.1f} ms"
+               f"  ({times['handwritten'] / times['compiled']:.2f}x)")
+    return results
+
+# -------------------------------
+# Reading packages back: FPD_Import against basyx
+# -------------------------------
+def _aas_part(path_aasx):
+    with zipfile.ZipFile(path_aasx) as package:
+        name = next(n for n in package.namelist() if n.startswith("aasx/data."))
+        return package.read(name)
+
+def round_trip(path_json, work_dir, write_json=False):
+    """
+    Converts an FPD JSON file, reads the package back with FPD_Import and
+    converts the result again. Returns True if both AAS parts are identical.
+    """
+    first = os.path.join(work_dir, "round_trip_1.aasx")
+    second = os.path.join(work_dir, "round_trip_2.aasx")
+    imported = os.path.join(work_dir, "round_trip.json")
+    FPD2AAS.convert_file(path_json, first, write_json=write_json, direct=True)
+    with open(imported, "w", encoding="utf-8") as f:
+        json.dump(FPD_Import.read_aasx(first), f)
+    FPD2AAS.convert_file(imported, second, write_json=write_json, direct=True)
+    return _aas_part(first) == _aas_part(second)
+
+def import_speed(size=10000, seed=0, work_dir=None, report=print):
+    """
+    Converts a synthetic document of `size` elements to XML and JSON packages
+    and times reading each back: fully with basyx, and with FPD_Import opening
+    the package, materializing one element and the whole FPD document.
+    Also checks the round trip. Returns the times and checks as a dict.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        path_json = os.path.join(tmp, "input.json")
+        FPD_Generate.generate(size, seed).write(path_json)
+        for label, write_json in (("xml", False), ("json", True)):
+            path_aasx = os.path.join(tmp, f"{label}.aasx")
+            FPD2AAS.convert_file(path_json, path_aasx, write_json=write_json, direct=True)
+            times = {}
+            start = time.perf_counter()
+            with aasx.AASXReader(path_aasx) as reader:
+                reader.read_into(model.DictObjectStore(), aasx.DictSupplementaryFileContainer())
+            times["basyx"] = time.perf_counter() - start
+            gc.collect()  # Free the basyx objects now rather than inside the next timing
+            start = time.perf_counter()
+            package = FPD_Import.FPDPackage(path_aasx)
+            times["open"] = time.perf_counter() - start
+            name = package.names()[len(package) // 2]
+            start = time.perf_counter()
+            package.element(name)
+            times["one_element"] = time.perf_counter() - start
+            start = time.perf_counter()
+            package.to_fpd()
+            times["to_fpd"] = time.perf_counter() - start
+            del package
+            times["round_trip"] = round_trip(path_json, tmp, write_json)
+            results[label] = times
+            report(f"  {label:<5} basyx {times['basyx'] * 1000:>9.1f} ms  open {times['open'] * 1000:>8.1f} ms"
+                   f"  one element {times['one_element'] * 1000:>6.2f} ms  to_fpd {times['to_fpd'] * 1000:>8.1f} ms"
+                   f"  ({times['basyx'] / (times['open'] + times['to_fpd']):.1f}x)"
+                   f"  round trip {'ok' if times['round_trip'] else 'DIFFERS'}")
+    return results
+
+# -------------------------------
+# Graph index queries against scanning the relations
+# -------------------------------
+def graph_speed(size=100000, seed=0, queries=1000, report=print):
+    """
+    Builds the FPD_Graph index of a synthetic document of `size` elements and
+    times its queries: the predecessors of `queries` elements (against scanning
+    every flow and usage per query, as readers of the AAS lists have to),
+    reachability from each of them, topological order and cycle detection.
+    Returns the times as a dict.
+    """
+    import FPD_Graph  # Optional: needs numpy
+    doc = FPD_Generate.generate(size, seed).document()
+    elements = doc[1]["elementDataInformation"]
+    del doc
+    relations = [el for el in elements if el["$type"] in ("fpb:Flow", "fpb:Usage")]
+    times = {}
+    start = time.perf_counter()
+    graph = FPD_Graph.RelationGraph.from_elements(elements)
+    times["build"] = time.perf_counter() - start
+    step = max(1, len(graph) // queries)
+    sample = graph.ids[::step][:queries]
+
+    start = time.perf_counter()
+    for element_id in sample[:max(1, queries // 100)]:
+        [el["sourceRef"] for el in relations if el["targetRef"] == element_id]
+    times["scan"] = (time.perf_counter() - start) * len(sample) / max(1, queries // 100)
+    start = time.perf_counter()
+    for element_id in sample:
+        graph.predecessors(element_id)
+    times["predecessors"] = time.perf_counter() - start
+    start = time.perf_counter()
+    for element_id in sample:
+        graph.reachable(element_id)
+    times["reachable"] = time.perf_counter() - start
+    start = time.perf_counter()
+    cycle = graph.find_cycle()
+    times["find_cycle"] = time.perf_counter() - start
+    if cycle is None:
+        start = time.perf_counter()
+        graph.topological_order()
+        times["topological_order"] = time.perf_counter() - start
+    report(f"  {len(graph)} elements, {graph.edge_count} relations, build {times['build'] * 1000:.1f} ms")
+    report(f"  predecessors of {len(sample)} elements: scan {times['scan'] * 1000:.1f} ms (estimated),"
+           f" index {times['predecessors'] * 1000:.1f} ms")
+    report(f"  reachable from {len(sample)} elements {times['reachable'] * 1000:.1f} ms,"
+           f" find_cycle {times['find_cycle'] * 1000:.1f} ms"
+           + (f", topological_order {times['topological_order'] * 1000:.1f} ms" if cycle is None else ", cyclic"))
+    return times
+
+# -------------------------------
+# Validation and the trusted build
+# -------------------------------
+def _build_process(elements, trusted):
+    smc_process = func.create_process_collection('process')
+    sml_flows = func.create_flows_list()
+    sml_usages = func.create_usages_list()
+    FPD.add_state_info(elements, smc_process, trusted)
+    FPD.add_process_operator_info(elements, smc_process, trusted)
+    FPD.add_technical_resource_info(elements, smc_process, trusted)
+    FPD.add_flows(elements, sml_flows, trusted)
+    FPD.add_usages(elements, sml_usages, trusted)
+    return smc_process, sml_flows, sml_usages
+
+def validate_speed(size=10000, seed=0, repeat=3, report=print):
+    """
+    Times FPD_Validate on a synthetic document of `size` elements and building
+    its process collection, flows and usages with and without the per-element basyx checks
+    (tests/test_validate.py checks that both builds are the same and that all problems are reported).
+    Returns the times as a dict.
+    """
+    doc = FPD_Generate.generate(size, seed).document()
+    times = {}
+    start = time.perf_counter()
+    problems = FPD_Validate.validate_document(doc)
+    times["validate"] = time.perf_counter() - start
+    elements = FPD.ElementIndex(doc[1]["elementDataInformation"])
+    for label, trusted in (("checked", False), ("trusted", True)):
+        best = None
+        for _ in range(repeat):
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                _build_process(elements, trusted)
+                seconds = time.perf_counter() - start
+            finally:
+                gc.enable()
+            best = seconds if best is None else min(best, seconds)
+        times[label] = best
+    report(f"  validate {size} elements {times['validate'] * 1000:.1f} ms  ({len(problems)} problems)")
+    report(f"  build process, flows and usages: checked {times['checked'] * 1000:.1f} ms"
+           f"  trusted {times['trusted'] * 1000:.1f} ms  ({times['checked'] / times['trusted']:.2f}x)")
+    return times
+
+# -------------------------------
+# Bulk insertion against add_referable per element
+# -------------------------------
+def _build_all(elements):
+    collections = [FPD.build_collection(el) for t in FPD_Mapping.BUILDERS for el in elements.of_type(t)]
+    flows = [func.add_flow("FPD", src, tgt) for src, tgt in FPD.resolve_relations(elements, "Flow")]
+    usages = [func.add_usage("FPD", src, tgt) for src, tgt in FPD.resolve_relations(elements, "Usage")]
+    return collections, flows, usages
+
+def _insert_each(collections, flows, usages):
+    smc_process = func.create_process_collection('process')
+    sml_flows = func.create_flows_list()
+    sml_usages = func.create_usages_list()
+    for smc in collections:
+        smc_process.add_referable(smc)
+    for smc in flows:
+        sml_flows.add_referable(smc)
+    for smc in usages:
+        sml_usages.add_referable(smc)
+    return smc_process, sml_flows, sml_usages
+
+def _insert_bulk(collections, flows, usages):
+    return (func.create_process_collection('process', collections),
+            func.create_flows_list(flows), func.create_usages_list(usages))
+
+def insertion_speed(size=100000, seed=0, repeat=3, report=print):
+    """
+    Times inserting the pre-built process entries, flows and usages of a
+    synthetic document of `size` elements into the process collection and the
+    flows and usages lists: one add_referable per element against the bulk
+    path of func.add_all. The elements are built again before every run; the
+    collector is paused while building and inserting. Checks that both give the same
+    collections; returns the times as a dict.
+    """
+    doc = FPD_Generate.generate(size, seed).document()
+    elements = FPD.ElementIndex(doc[1]["elementDataInformation"])
+    del doc
+    times = {}
+    contents = {}
+    for label, insert in (("add_referable", _insert_each), ("bulk", _insert_bulk)):
+        best = None
+        for _ in range(repeat):
+            gc.collect()
+            gc.disable()
+            try:
+                built = _build_all(elements)
+                start = time.perf_counter()
+                containers = insert(*built)
+                seconds = time.perf_counter() - start
+            finally:
+                gc.enable()
+            best = seconds if best is None else min(best, seconds)
+            del built
+        times[label] = best
+        contents[label] = [[smc.id_short if i == 0 else tuple(ref.value.key[-1].value for ref in smc.value)
+                            for smc in container.value] for i, container in enumerate(containers)]
+        counts = [len(container.value) for container in containers]
+        del containers
+    times["same"] = contents["add_referable"] == contents["bulk"]
+    report(f"  insert {counts[0]} process entries, {counts[1]} flows and {counts[2]} usages:"
+           f" add_referable {times['add_referable'] * 1000:.1f} ms  bulk {times['bulk'] * 1000:.1f} ms"
+           f"  ({times['add_referable'] / times['bulk']:.1f}x)  {'same' if times['same'] else 'DIFFERS'}")
+    return times
+
+# -------------------------------
+# Partial conversion through the offset index
+# -------------------------------
+def index_speed(size=100000, seed=0, work_dir=None, report=print):
+    """
+    Writes a synthetic document of `size` elements and times building, saving
+    and opening its FPD_Index, the full conversion and the conversion of one
+    process operator with the elements assigned to it. Checks that the
+    partial package equals converting a file that holds only that subset.
+    Returns the times and the check as a dict.
+    """
+    times = {}
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        path_json = os.path.join(tmp, "input.json")
+        FPD_Generate.generate(size, seed).write(path_json)
+        start = time.perf_counter()
+        index = FPD_Index.ElementOffsetIndex.build(path_json)
+        times["build"] = time.perf_counter() - start
+        start = time.perf_counter()
+        index.save()
+        times["save"] = time.perf_counter() - start
+        start = time.perf_counter()
+        FPD_Index.open_index(path_json).close()
+        times["open"] = time.perf_counter() - start
+        times["index_bytes"] = os.path.getsize(FPD_Index.index_path(path_json))
+        operator = next(element_id for element_id, code in zip(index.ids, index.codes)
+                        if index.types[code] == "ProcessOperator")
+        selection = FPD_Index.Selection(assigned_to=[operator])
+        subset = index.select(selection)
+        index.close()
+        with open(path_json, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        doc[1]["elementDataInformation"] = [doc[1]["elementDataInformation"][i] for i in subset]
+        path_subset = os.path.join(tmp, "subset.json")
+        with open(path_subset, "w", encoding="utf-8") as f:
+            json.dump(doc, f)
+        del doc
+
+        for label, select in (("full", None), ("partial", selection)):
+            gc.collect()
+            start = time.perf_counter()
+            FPD2AAS.convert_file(path_json, os.path.join(tmp, f"{label}.aasx"), select=select)
+            times[label] = time.perf_counter() - start
+        FPD2AAS.convert_file(path_subset, os.path.join(tmp, "subset.aasx"))
+        times["same"] = _aas_part(os.path.join(tmp, "partial.aasx")) == _aas_part(os.path.join(tmp, "subset.aasx"))
+    report(f"  index {size} elements: build {times['build'] * 1000:.1f} ms  save {times['save'] * 1000:.1f} ms"
+           f"  open {times['open'] * 1000:.1f} ms  ({times['index_bytes'] >> 10} KiB)")
+    report(f"  convert all {times['full'] * 1000:.1f} ms, one operator with {len(subset)} elements and relations"
+           f" {times['partial'] * 1000:.1f} ms  ({times['full'] / times['partial']:.1f}x)"
+           f"  {'same' if times['same'] else 'DIFFERS'}")
+    return times
+
+# -------------------------------
+# Delta against full re-conversion
+# -------------------------------
+def delta_speed(size=10000, seed=0, work_dir=None, report=print):
+    """
+    Changes one setpoint in a synthetic document of `size` elements and times
+    the FPD_Delta patch between both versions and applying it to the JSON
+    package of the old version, against converting the new version again.
+    Checks that both give the same AAS part. Returns the times, the patch
+    size and the check as a dict.
+    """
+    times = {}
+    old = FPD_Generate.generate(size, seed).document()
+    new = json.loads(json.dumps(old))
+    changed = next(el for el in new[1]["elementDataInformation"] if el.get("characteristics"))
+    changed["characteristics"][0]["descriptiveElement"]["setpointValue"]["value"] += 1
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        paths = {}
+        for label, doc in (("old", old), ("new", new)):
+            paths[label] = os.path.join(tmp, f"{label}.json")
+            with open(paths[label], "w", encoding="utf-8") as f:
+                json.dump(doc, f)
+        path_old = os.path.join(tmp, "old.aasx")
+        path_new = os.path.join(tmp, "new.aasx")
+        FPD2AAS.convert_file(paths["old"], path_old, direct=True, write_json=True)
+        gc.collect()
+        start = time.perf_counter()
+        FPD2AAS.convert_file(paths["new"], path_new, direct=True, write_json=True)
+        times["full"] = time.perf_counter() - start
+        start = time.perf_counter()
+        patch = FPD_Delta.diff(old, new)
+        times["diff"] = time.perf_counter() - start
+        start = time.perf_counter()
+        FPD_Delta.apply_aasx(path_old, patch, path_old)
+        times["apply"] = time.perf_counter() - start
+        times["operations"] = len(patch["operations"])
+        times["patch_bytes"] = len(json.dumps(patch, separators=(",", ":")))
+        times["package_bytes"] = os.path.getsize(path_new)
+        times["same"] = _aas_part(path_old) == _aas_part(path_new)
+    report(f"  delta {size} elements: diff {times['diff'] * 1000:.1f} ms  apply {times['apply'] * 1000:.1f} ms"
+           f"  full conversion {times['full'] * 1000:.1f} ms")
+    report(f"  {times['operations']} operations, {times['patch_bytes']} bytes against a package of"
+           f" {times['package_bytes'] >> 10} KiB  {'same' if times['same'] else 'DIFFERS'}")
+    return times
+
+# -------------------------------
+# Publishing to a local stand-in repository
+# -------------------------------
+def publish_speed(size=10000, seed=0, split_size=2000, connections=4, failures=3, work_dir=None, report=print):
+    """
+    Builds a synthetic document of `size` elements split into submodels of
+    `split_size` elements and publishes it twice to the stand-in
+    repository of tests/standin.py whose first `failures` requests fail: once to create, once to
+    replace. Checks that the repository holds exactly the serialized shell
+    and submodels, that each shell came after its submodels and that no more
+    than `connections` connections were opened. Returns the times, the
+    request and connection counts and the check as a dict.
+    """
+    times = {}
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        path_json = os.path.join(tmp, "input.json")
+        FPD_Generate.generate(size, seed).write(path_json)
+        aas, submodels = FPD2AAS.build_split_aas(path_json, "size", split_size, columnar=False)
+    expected = {"shells": {aas.id: json.loads(FPD2AAS_Publish.to_json(aas))},
+                "submodels": {sm.id: json.loads(FPD2AAS_Publish.to_json(sm)) for sm in submodels}}
+    server = Repository().start()
+    server.script = [(503, {})] * failures
+    try:
+        with FPD2AAS_Publish.Publisher(server.url, connections, backoff=0.01) as publisher:
+            for label in ("create", "replace"):
+                start = time.perf_counter()
+                publisher.publish(aas, submodels)
+                times[label] = time.perf_counter() - start
+                if label == "create":
+                    created = [kind for _, kind in server.log]
+            times["retries"] = publisher.metrics.counters.get("http_retries", 0)
+            times["opened"] = publisher.pool.opened
+    finally:
+        server.stop()
+    times["requests"] = len(server.log)
+    times["connections"] = server.connections
+    shells_last = created.index("shells") > len(created) - 1 - created[::-1].index("submodels")
+    times["same"] = server.stored == expected and shells_last and server.connections <= connections
+    report(f"  publish {size} elements as {len(submodels)} submodels: create {times['create'] * 1000:.1f} ms"
+           f"  replace {times['replace'] * 1000:.1f} ms")
+    report(f"  {times['requests']} requests ({times['retries']} retried) over {times['connections']} connections"
+           f"  {'same' if times['same'] else 'DIFFERS'}")
+    return times
+
+# -------------------------------
+# Merging several projects
+# -------------------------------
+def _merge_inputs(size, projects, seed):
+    """
+    Returns `projects` documents built from the same synthetic document, each
+    with its own project name and product setpoints, so that they share their
+    resources and information states but not their products.
+    """
+    base = FPD_Generate.generate(size, seed).document()
+    documents = []
+    for n in range(projects):
+        doc = json.loads(json.dumps(base))
+        doc[0]["name"] = f"Project {n + 1}"
+        for el in doc[1]["elementDataInformation"]:
+            if el["$type"].endswith(":Product") and el.get("characteristics"):
+                el["characteristics"][0]["descriptiveElement"]["setpointValue"]["value"] += n
+        documents.append(doc)
+    return documents
+
+def _submodel_json(submodel, id_short, resolve=None):
+    """
+    Returns the process, flows and usages of a submodel as parsed JSON, with
+    the references into `id_short` and FPD_Shared pointing to FPD and with
+    shared references replaced by the entries in `resolve` (idShort ->
+    collection), filled in with the project's ids (see FPD_Merge.resolve_shared).
+    """
+    ids = {}
+    if resolve is not None and submodel.submodel_element.contains_id("id_short", FPD_Merge.SHARED_IDS_ID_SHORT):
+        ids = {entry["idShort"]: entry for entry in json.loads(FPD2AAS_Publish.to_json(
+            submodel.get_referable(FPD_Merge.SHARED_IDS_ID_SHORT))).get("value", [])}
+    parts = []
+    for name in ("process", "flows", "usages"):
+        element = submodel.get_referable(name)
+        value = json.loads(FPD2AAS_Publish.to_json(element))
+        if resolve is not None and name == "process":
+            value["value"] = [FPD_Merge.resolve_shared(resolve[entry["idShort"]], ids[entry["idShort"]])
+                              if entry["modelType"] == "ReferenceElement" else entry
+                              for entry in value.get("value", [])]
+        parts.append(json.dumps(value))
+    text = "[" + ",".join(parts) + "]"
+    for merged in (id_short, FPD_Merge.SHARED_ID_SHORT):
+        text = text.replace(f'/{merged}_Submodel"', '/FPD_Submodel"')
+    return json.loads(text)
+
+def merge_speed(size=10000, projects=4, seed=0, work_dir=None, report=print):
+    """
+    Merges `projects` synthetic documents of `size` elements that share their
+    resources and information states into one package, against converting
+    each into a package of its own. Checks that every project resolves to the
+    process, flows and usages of its own conversion. Returns the times, the
+    package sizes and the check as a dict.
+    """
+    times = {"separate": 0.0, "separate_bytes": 0}
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        paths = []
+        for n, doc in enumerate(_merge_inputs(size, projects, seed), 1):
+            paths.append(os.path.join(tmp, f"project{n}.json"))
+            with open(paths[-1], "w", encoding="utf-8") as f:
+                json.dump(doc, f)
+        for path in paths:
+            gc.collect()
+            start = time.perf_counter()
+            FPD2AAS.convert_file(path, path + ".aasx", columnar=False)
+            times["separate"] += time.perf_counter() - start
+            times["separate_bytes"] += os.path.getsize(path + ".aasx")
+        path_merged = os.path.join(tmp, "merged.aasx")
+        gc.collect()
+        metrics = FPD2AAS_Metrics.Metrics()
+        start = time.perf_counter()
+        FPD_Merge.merge_files(paths, path_merged, metrics=metrics)
+        times["merged"] = time.perf_counter() - start
+        times["merged_bytes"] = os.path.getsize(path_merged)
+        times["shared"] = metrics.counters.get("shared_elements", 0)
+        times["references"] = metrics.counters.get("shared_references", 0)
+
+        _, submodels = FPD_Merge.build_merged_aas(paths)
+        shared = {entry["idShort"]: entry for entry in json.loads(FPD2AAS_Publish.to_json(
+            submodels[0].get_referable("process"))).get("value", [])}
+        same = True
+        for path, submodel in zip(paths, submodels[1:]):
+            _, own = FPD2AAS.build_aas(path, columnar=False)
+            same = same and _submodel_json(submodel, submodel.id_short, shared) == _submodel_json(own, "FPD")
+        times["same"] = same
+    report(f"  merge {projects} x {size} elements: merged {times['merged'] * 1000:.1f} ms"
+           f"  separate {times['separate'] * 1000:.1f} ms")
+    report(f"  {times['shared']} shared elements referenced {times['references']} times,"
+           f" {times['merged_bytes'] >> 10} KiB against {times['separate_bytes'] >> 10} KiB"
+           f"  {'same' if times['same'] else 'DIFFERS'}")
+    return times
+
+# -------------------------------
+# Baseline comparison
+# -------------------------------
+def compare(results, baseline, tolerance=0.25):
+    """
+    Compares results with a baseline of the same format.
+    Returns a list of regressions: stages that are more than `tolerance`
+    (a fraction) slower or use more than `tolerance` more peak memory.
+    Only sizes and stages present in both are compared.
+    """
+    regressions = []
+    for size, result in results["sizes"].items():
+        base = baseline.get("sizes", {}).get(size)
+        if base is None:
+            continue
+        for stage, entry in result["stages"].items():
+            base_entry = base["stages"].get(stage)
+            if base_entry is None:
+                continue
+            old, new = base_entry["seconds"], entry["seconds"]
+            if max(old, new) >= MIN_COMPARED_SECONDS and new > old * (1 + tolerance):
+                regressions.append(f"{size} {stage}: {old * 1000:.1f} ms -> {new * 1000:.1f} ms")
+            old, new = base_entry.get("peak_bytes"), entry.get("peak_bytes")
+            if old is not None and new is not None and new > old * (1 + tolerance):
+                regressions.append(f"{size} {stage}: {old / 2**20:.1f} MiB -> {new / 2**20:.1f} MiB peak")
+    return regressions
+
+# -------------------------------
+# Command line entry point
+# -------------------------------
+def main(argv=None):
+    """
+    Command line entry point. Returns 1 if a regression against the baseline was found.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the FPD to AAS conversion stages.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma separated element counts (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per size; the best time is kept (default: %(default)s)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the tracemalloc run that records peak memory")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic inputs")
+    parser.add_argument("--work-dir", default=None,
+                        help="directory for generated inputs and outputs (default: system temp)")
+    parser.add_argument("--output", default=None, help="write the results as JSON to this file")
+    parser.add_argument("--save-baseline", metavar="FILE", default=None,
+                        help="store the results as the baseline in FILE")
+    parser.add_argument("--baseline", metavar="FILE", default=None,
+                        help="compare the results against the baseline in FILE")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown or memory growth as a fraction (default: %(default)s)")
+    parser.add_argument("--relations", type=int, default=None, metavar="N",
+                        help="only compare the memory of N flows with and without interned references")
+    parser.add_argument("--model", type=int, default=None, metavar="N",
+                        help="only compare N elements held as JSON and as the decoded model")
+    parser.add_argument("--mapping", type=int, default=None, metavar="N",
+                        help="only compare the compiled and the hand-written builders on N elements"
+                             f" (best of at least {MAPPING_ROUNDS} rounds); exit code 1 if the compiled ones are slower")
+    parser.add_argument("--import", dest="import_size", type=int, default=None, metavar="N",
+                        help="only time reading packages of N elements back with basyx and with FPD_Import;"
+                             " exit code 1 if the round trip changes the AAS")
+    parser.add_argument("--graph", type=int, default=None, metavar="N",
+                        help="only time the FPD_Graph queries on N elements against scanning the relations")
+    parser.add_argument("--validate", type=int, default=None, metavar="N",
+                        help="only time FPD_Validate and the trusted build on N elements")
+    parser.add_argument("--insert", type=int, default=None, metavar="N",
+                        help="only time inserting N elements one by one and in bulk;"
+                             " exit code 1 if the results differ")
+    parser.add_argument("--index", type=int, default=None, metavar="N",
+                        help="only time the offset index and a partial conversion on N elements;"
+                             " exit code 1 if the partial package differs")
+    parser.add_argument("--delta", type=int, default=None, metavar="N",
+                        help="only time a delta between two versions of N elements against a full conversion;"
+                             " exit code 1 if applying it differs")
+    parser.add_argument("--publish", type=int, default=None, metavar="N",
+                        help="only time publishing N elements to a local stand-in repository;"
+                             " exit code 1 if it does not hold the same shell and submodels")
+    parser.add_argument("--merge", type=int, default=None, metavar="N",
+                        help="only time merging --projects documents of N elements into one package;"
+                             " exit code 1 if a project differs from its own conversion")
+    parser.add_argument("--projects", type=int, default=4,
+                        help="number of projects for --merge (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.relations:
+        relation_memory(args.relations, repeat=args.repeat)
+        return 0
+    if args.model:
+        model_memory(args.model, args.seed)
+        return 0
+    if args.mapping:
+        results = mapping_speed(args.mapping, args.seed, repeat=max(args.repeat, MAPPING_ROUNDS))
+        slower = [t for t, times in results.items() if times["compiled"] > times["handwritten"] * (1 + args.tolerance)]
+        for t in slower:
+            print(f"REGRESSION {t}: compiled builder slower than the hand-written one")
+        return 1 if slower else 0
+    if args.graph:
+        graph_speed(args.graph, args.seed)
+        return 0
+    if args.validate:
+        validate_speed(args.validate, args.seed, args.repeat)
+        return 0
+    if args.insert:
+        return 0 if insertion_speed(args.insert, args.seed, args.repeat)["same"] else 1
+    if args.index:
+        return 0 if index_speed(args.index, args.seed, args.work_dir)["same"] else 1
+    if args.delta:
+        return 0 if delta_speed(args.delta, args.seed, args.work_dir)["same"] else 1
+    if args.publish:
+        return 0 if publish_speed(args.publish, args.seed, work_dir=args.work_dir)["same"] else 1
+    if args.merge:
+        return 0 if merge_speed(args.merge, args.projects, args.seed, args.work_dir)["same"] else 1
+    if args.import_size:
+        results = import_speed(args.import_size, args.seed, args.work_dir)
+        return 0 if all(times["round_trip"] for times in results.values()) else 1
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results = benchmark(sizes, args.repeat, not args.no_memory, args.work_dir, args.seed)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
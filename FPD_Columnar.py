@@ -0,0 +1,209 @@
+# Columnar Characteristics Export
+# ---------------------------------------------
+# Collects the numeric values of every characteristic of every FPD element
+# into NumPy arrays and stores them as a .npz supplementary file in the AASX,
+# so analytics can bulk-load them without walking the nested collections.
+# Requires numpy (only imported when the columnar output is requested).
+# ---------------------------------------------
+
+import io
+import re
+from datetime import datetime, timezone
+import numpy as np
+from basyx.aas import model
+
+# -------------------------------
+# Location of the table inside the AASX package
+# -------------------------------
+TABLE_PATH = "/aasx/files/characteristics.npz"
+TABLE_CONTENT_TYPE = "application/zip"
+TABLE_ID_SHORT = "characteristicsTable"
+
+# -------------------------------
+# Table of all characteristics
+# -------------------------------
+class CharacteristicsTable:
+    """
+    Row-per-characteristic table over all FPD elements, filled one element at
+    a time and converted to NumPy arrays in one vectorized step at the end.
+
+    The .npz file holds these arrays:
+      element_id, element_type       one entry per element with characteristics
+      element                        int32 row -> index into element_id
+      characteristic_id              uniqueIdent of the characteristic's category
+      actual_value, setpoint_value   float64 (NaN where missing)
+      actual_unit, setpoint_unit     int32 codes into `units`
+      limit_characteristic           int32 validity limit -> characteristic row
+      limit_type                     int32 codes into `limit_types`
+      valid_from, valid_to           datetime64[us] in UTC (NaT where missing);
+                                     numbers are read as Unix timestamps
+    """
+
+    def __init__(self):
+        self.element_ids = []
+        self.element_types = []
+        self.row_element = []
+        self.characteristic_ids = []
+        self.actual_values = []
+        self.actual_units = []
+        self.setpoint_values = []
+        self.setpoint_units = []
+        self.limit_rows = []
+        self.limit_types = []
+        self.valid_from = []
+        self.valid_to = []
+
+    def add(self, el):
+        """
+        Adds the characteristics of one FPD element (elements without any are skipped).
+        """
+        characteristics = el.get("characteristics")
+        if not characteristics:
+            return
+        element = len(self.element_ids)
+        self.element_ids.append(el.get("id", ""))
+        self.element_types.append(el["$type"].rpartition(":")[2])
+        for ch in characteristics:
+            row = len(self.characteristic_ids)
+            desc = ch.get("descriptiveElement", {})
+            actual = desc.get("actualValues", {})
+            setpoint = desc.get("setpointValue", {})
+            self.row_element.append(element)
+            self.characteristic_ids.append(ch.get("category", {}).get("uniqueIdent", ""))
+            self.actual_values.append(actual.get("value"))
+            self.actual_units.append(actual.get("unit", ""))
+            self.setpoint_values.append(setpoint.get("value"))
+            self.setpoint_units.append(setpoint.get("unit", ""))
+            for limit in desc.get("validityLimits", []):
+                self.limit_rows.append(row)
+                self.limit_types.append(limit.get("limitType", ""))
+                self.valid_from.append(limit.get("from"))
+                self.valid_to.append(limit.get("to"))
+
+    def collect(self, elements):
+        """
+        Yields the given elements while adding them to the table.
+        """
+        for el in elements:
+            self.add(el)
+            yield el
+
+    def __len__(self):
+        return len(self.characteristic_ids)
+
+    def arrays(self):
+        """
+        Returns the table as a dict of NumPy arrays (see the class docstring).
+        """
+        units, unit_codes = np.unique(np.array(self.actual_units + self.setpoint_units, dtype=str),
+                                      return_inverse=True)
+        limit_types, limit_codes = np.unique(np.array(self.limit_types, dtype=str), return_inverse=True)
+        n = len(self)
+        return {
+            "element_id": np.array(self.element_ids, dtype=str),
+            "element_type": np.array(self.element_types, dtype=str),
+            "element": np.array(self.row_element, dtype=np.int32),
+            "characteristic_id": np.array(self.characteristic_ids, dtype=str),
+            "actual_value": _floats(self.actual_values),
+            "actual_unit": unit_codes[:n].astype(np.int32),
+            "setpoint_value": _floats(self.setpoint_values),
+            "setpoint_unit": unit_codes[n:].astype(np.int32),
+            "units": units,
+            "limit_characteristic": np.array(self.limit_rows, dtype=np.int32),
+            "limit_type": limit_codes.astype(np.int32),
+            "limit_types": limit_types,
+            "valid_from": _timestamps(self.valid_from),
+            "valid_to": _timestamps(self.valid_to),
+        }
+
+    def to_npz(self):
+        """
+        Returns the table as the bytes of a compressed .npz file.
+        """
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **self.arrays())
+        return buffer.getvalue()
+
+    def add_to(self, submodel, file_store):
+        """
+        Stores the table in file_store and adds a File element pointing to it to the submodel.
+        """
+        name = file_store.add_file(TABLE_PATH, io.BytesIO(self.to_npz()), TABLE_CONTENT_TYPE)
+        submodel.submodel_element.add(table_file_element(name))
+        return name
+
+def table_file_element(path=TABLE_PATH):
+    """
+    Returns the File element that references the table in the package.
+    """
+    return model.File(
+        id_short=TABLE_ID_SHORT,
+        content_type=TABLE_CONTENT_TYPE,
+        value=path,
+        category='PARAMETER'
+    )
+
+def load(file):
+    """
+    Loads a table written by CharacteristicsTable.to_npz (path or file object) as a dict of arrays.
+    """
+    with np.load(file) as data:
+        return {key: data[key] for key in data.files}
+
+# -------------------------------
+# Vectorized value conversion
+# -------------------------------
+_UTC_OFFSET = re.compile(r"(Z|[+-]\d\d:?\d\d)$")
+
+def _floats(values):
+    """
+    Converts numbers or numeric strings to float64 in one step; missing or
+    non-numeric values become NaN.
+    """
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([_float_or_nan(v) for v in values], dtype=np.float64)
+
+def _float_or_nan(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def _timestamps(values):
+    """
+    Converts Unix timestamps and ISO 8601 strings to datetime64[us] (UTC).
+    Numbers and strings are each converted in one step; values that cannot
+    be parsed become NaT.
+    """
+    result = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[us]")
+    if not values:
+        return result
+    numbers = np.array([isinstance(v, (int, float)) and not isinstance(v, bool) for v in values])
+    texts = np.array([isinstance(v, str) for v in values])
+    if numbers.any():
+        seconds = np.array([v for v, k in zip(values, numbers) if k], dtype=np.float64)
+        result[numbers] = (seconds * 1e6).round().astype(np.int64).astype("datetime64[us]")
+    if texts.any():
+        strings = [v for v, k in zip(values, texts) if k]
+        try:
+            if any(_UTC_OFFSET.search(v) for v in strings):
+                # NumPy does not handle offsets; convert those one at a time
+                raise ValueError
+            result[texts] = np.array(strings, dtype="datetime64[us]")
+        except ValueError:
+            result[texts] = [_parse_iso(v) for v in strings]
+    return result
+
+def _parse_iso(text):
+    """
+    Parses one ISO 8601 string (with or without offset) to datetime64[us] in UTC, or NaT.
+    """
+    try:
+        value = datetime.fromisoformat(text)
+    except ValueError:
+        return np.datetime64("NaT")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(value, "us")
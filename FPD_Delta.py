@@ -0,0 +1,280 @@
+# FPD to AAS Delta
+# ---------------------------------------------
+# Compares two versions of an FPD JSON file and writes the changes of the AAS
+# submodel as a patch document instead of a complete new package. Process
+# elements are matched by their FPD id, flows and usages by the names of
+# their ends, and the children of changed collections by idShort, so a
+# changed setpoint gives a single operation.
+# The values in the patch are the AAS JSON serialization of the elements, as
+# written by the direct emitter (see FPD2AAS_Emit). Applying the patch to
+# the JSON AAS part of the old conversion gives the AAS part of converting
+# the new file.
+# Usage: python FPD_Delta.py OLD.json NEW.json [-o PATCH.json]
+#        python FPD_Delta.py --apply PATCH.json OLD.aasx [-o NEW.aasx]
+# ---------------------------------------------
+
+import argparse
+import difflib
+import json
+import os
+import sys
+import zipfile
+from basyx.aas.adapter.json import json_serialization
+import FPD2AAS_Functions as func
+import FPD2AAS_Emit
+import FPD_Mapping
+import FPD
+
+PATCH_FORMAT = "fpd-aas-delta"
+PATCH_VERSION = 1
+
+class PatchError(ValueError):
+    """
+    Raised when a patch does not fit the AAS it is applied to.
+    """
+
+# -------------------------------
+# The AAS JSON form of both versions
+# -------------------------------
+class _Version:
+    """
+    The process entries and the flow and usage endpoints of one FPD document,
+    in the order the converter writes them. Entries are rendered to AAS JSON
+    only when the diff needs them.
+    """
+
+    def __init__(self, document, renderer):
+        self.project = document[0]
+        self.renderer = renderer
+        by_type = {t: [] for t in FPD_Mapping.BUILDERS}
+        relations = {"Flow": [], "Usage": []}
+        names = {}
+        for el in document[1]["elementDataInformation"]:
+            t = el["$type"].rpartition(":")[2]
+            names.setdefault(el.get("id"), el.get("name"))
+            if t in by_type:
+                by_type[t].append(el)
+            elif t in relations:
+                relations[t].append((el["sourceRef"], el["targetRef"]))
+        # The process collection holds all types, in the order of FPD_Mapping.MAPPINGS
+        self.process = [(el, t) for t, els in by_type.items() for el in els]
+        self.relations = {}
+        for t, pairs in relations.items():
+            self.relations[t] = [(names.get(source), names.get(target)) for source, target in pairs]
+            self.relations[t] = [(src, tgt) for src, tgt in self.relations[t] if src and tgt]
+
+    def entry(self, i):
+        """Returns the AAS JSON of process entry i."""
+        el, t = self.process[i]
+        return json.loads(self.renderer.render(el, t)[1])
+
+    def name(self, i):
+        return self.entry(i)["idShort"]
+
+    def project_information(self):
+        return json.loads(json.dumps(FPD.add_project_info(self.project), cls=json_serialization.AASToJsonEncoder))
+
+# -------------------------------
+# Diff
+# -------------------------------
+def _sequence(path, old_keys, new_keys, old_step, update, insert, ops):
+    """
+    Adds the operations that turn a sequence of children into another, given
+    the key of each child. Unmatched children are removed and inserted;
+    matched ones are passed to update(i, j). The operations are generated from
+    the end backwards, so the indices of earlier children stay valid while they
+    are applied in order.
+    """
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+        if tag == "equal":
+            for i, j in zip(reversed(range(i1, i2)), reversed(range(j1, j2))):
+                update(i, j)
+            continue
+        for i in reversed(range(i1, i2)):
+            ops.append({"op": "remove", "path": path + [old_step(i)]})
+        for k, j in enumerate(range(j1, j2)):
+            ops.append({"op": "add", "path": path, "index": i1 + k, "value": insert(j)})
+
+def _element(path, old, new, ops):
+    """
+    Adds the operations that turn the AAS JSON element old at path into new:
+    a collection with the same idShort is patched child by child, anything
+    else is replaced as a whole.
+    """
+    if old == new:
+        return
+    shell = lambda element: {key: value for key, value in element.items() if key != "value"}
+    if (old.get("modelType") == "SubmodelElementCollection" and shell(old) == shell(new)):
+        old_children = old.get("value", [])
+        new_children = new.get("value", [])
+        _sequence(path,
+                  [child["idShort"] for child in old_children], [child["idShort"] for child in new_children],
+                  lambda i: old_children[i]["idShort"],
+                  lambda i, j: _element(path + [old_children[i]["idShort"]], old_children[i], new_children[j], ops),
+                  lambda j: new_children[j], ops)
+    else:
+        ops.append({"op": "replace", "path": path, "value": new})
+
+def diff(old_document, new_document):
+    """
+    Returns the patch document (a dict) that turns the AAS submodel converted
+    from old_document into the one converted from new_document. Both are FPD
+    JSON documents as read from the files.
+    """
+    renderer = FPD2AAS_Emit.ElementRenderer(write_json=True)
+    old = _Version(old_document, renderer)
+    new = _Version(new_document, renderer)
+    ops = []
+
+    _element(["projectInformation"], old.project_information(), new.project_information(), ops)
+
+    def update(i, j):
+        # Elements equal in FPD JSON are converted alike; only changed ones are rendered
+        if old.process[i][0] != new.process[j][0] or old.process[i][1] != new.process[j][1]:
+            _element(["process", old.name(i)], old.entry(i), new.entry(j), ops)
+    _sequence(["process"],
+              [el.get("id") for el, _ in old.process], [el.get("id") for el, _ in new.process],
+              old.name, update, new.entry, ops)
+
+    for container, t, factory in (("flows", "Flow", func.add_flow), ("usages", "Usage", func.add_usage)):
+        emitter = FPD2AAS_Emit.RelationEmitter(factory, write_json=True)
+
+        def relation(j, pairs=new.relations[t], emitter=emitter):
+            out = []
+            emitter.emit(*pairs[j], out)
+            return json.loads("".join(out))
+        _sequence([container], old.relations[t], new.relations[t], lambda i: i, lambda i, j: None, relation, ops)
+
+    return {
+        "format": PATCH_FORMAT,
+        "version": PATCH_VERSION,
+        "submodel": func.get_id_management_submodel("FPD"),
+        "operations": ops,
+    }
+
+def diff_files(path_old, path_new):
+    """
+    Returns the patch document between two FPD JSON files (see diff).
+    """
+    with open(path_old, "r", encoding="utf-8") as f:
+        old_document = json.load(f)
+    with open(path_new, "r", encoding="utf-8") as f:
+        new_document = json.load(f)
+    return diff(old_document, new_document)
+
+# -------------------------------
+# Apply
+# -------------------------------
+def _children(node):
+    return node["submodelElements"] if "submodelElements" in node else node.setdefault("value", [])
+
+def _child_index(node, step, path):
+    children = _children(node)
+    if isinstance(step, int):
+        if 0 <= step < len(children):
+            return step
+    else:
+        for i, child in enumerate(children):
+            if child.get("idShort") == step:
+                return i
+    raise PatchError(f"No element {step!r} in {'/'.join(map(str, path)) or 'the submodel'}")
+
+def _node(submodel, path):
+    node = submodel
+    for n, step in enumerate(path):
+        node = _children(node)[_child_index(node, step, path[:n])]
+    return node
+
+def _prune(node):
+    # Empty collections and lists are serialized without a value
+    if "submodelElements" not in node and not node.get("value"):
+        node.pop("value", None)
+
+def apply(environment, patch):
+    """
+    Applies a patch document to an AAS environment in JSON form (a dict, as
+    read from the JSON AAS part of a package) in place, and returns it.
+    Raises PatchError if the patch does not fit.
+    """
+    if patch.get("format") != PATCH_FORMAT or patch.get("version") != PATCH_VERSION:
+        raise PatchError("Not an FPD AAS delta of a supported version")
+    submodel = next((sm for sm in environment.get("submodels", ()) if sm.get("id") == patch["submodel"]), None)
+    if submodel is None:
+        raise PatchError(f"No submodel {patch['submodel']} in the environment")
+    for op in patch["operations"]:
+        path = op["path"]
+        if op["op"] == "add":
+            node = _node(submodel, path)
+            children = _children(node)
+            if not 0 <= op["index"] <= len(children):
+                raise PatchError(f"Index {op['index']} out of range in {'/'.join(map(str, path))}")
+            children.insert(op["index"], op["value"])
+        elif op["op"] in ("remove", "replace"):
+            if not path:
+                raise PatchError(f"Empty path in {op['op']} operation")
+            parent = _node(submodel, path[:-1])
+            i = _child_index(parent, path[-1], path[:-1])
+            if op["op"] == "remove":
+                del _children(parent)[i]
+                _prune(parent)
+            else:
+                _children(parent)[i] = op["value"]
+        else:
+            raise PatchError(f"Unknown operation {op['op']!r}")
+    return environment
+
+def apply_aasx(path_aasx, patch, path_output):
+    """
+    Writes a copy of an AASX package with the patch applied to its AAS part.
+    The package must have been written with JSON output (--json); its other
+    parts are copied unchanged. path_output may be path_aasx.
+    """
+    # Written under a temporary name so that the package can be patched in place
+    tmp = f"{path_output}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(path_aasx) as package:
+        part = next((name for name in package.namelist() if name.startswith("aasx/data.")), None)
+        if part is None or not part.endswith(".json"):
+            raise PatchError(f"{path_aasx} has no JSON AAS part; convert with --json to apply deltas")
+        environment = apply(json.loads(package.read(part)), patch)
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as output:
+            for info in package.infolist():
+                if info.filename == part:
+                    output.writestr(info, json.dumps(environment))
+                else:
+                    output.writestr(info, package.read(info))
+    os.replace(tmp, path_output)
+    return path_output
+
+# -------------------------------
+# Command line entry point
+# -------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the AAS changes between two FPD JSON files as a patch, "
+                                                 "or apply such a patch to an AASX package.")
+    parser.add_argument("inputs", nargs=2, metavar="INPUT",
+                        help="OLD.json NEW.json, or with --apply PATCH.json OLD.aasx")
+    parser.add_argument("--apply", action="store_true", help="apply a patch to a package written with --json")
+    parser.add_argument("-o", "--output", default=None,
+                        help="patch or package to write (default: stdout for a patch, OLD.aasx in place)")
+    args = parser.parse_args(argv)
+
+    if args.apply:
+        path_patch, path_aasx = args.inputs
+        with open(path_patch, "r", encoding="utf-8") as f:
+            patch = json.load(f)
+        apply_aasx(path_aasx, patch, args.output or path_aasx)
+        print(f"{len(patch['operations'])} operations applied to {args.output or path_aasx}")
+        return 0
+    patch = diff_files(*args.inputs)
+    text = json.dumps(patch, separators=(",", ":"))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"{len(patch['operations'])} operations written to {args.output}")
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+# Synthetic FPD Generator
+# ---------------------------------------------
+# Generates valid FPD JSON documents of any size for benchmarks and tests.
+# Usage: python FPD_Generate.py -n ELEMENTS OUTPUT [--seed SEED] [--characteristics N]
+#                               [--products N] [--energies N] [--informations N]
+#                               [--operators N] [--resources N] [--flows N] [--usages N]
+# ---------------------------------------------
+
+import argparse
+import json
+import random
+import sys
+import uuid
+
+# -------------------------------
+# Share of each element type, taken from the example FPD.json
+# (Energy is added so that every state type is exercised)
+# -------------------------------
+DEFAULT_SHARES = {
+    "products": 0.17,
+    "energies": 0.05,
+    "informations": 0.13,
+    "operators": 0.08,
+    "resources": 0.08,
+    "flows": 0.42,
+    "usages": 0.07,
+}
+
+STATE_KINDS = (("products", "Product", "P"), ("energies", "Energy", "E"), ("informations", "Information", "I"))
+
+UNITS = ("", "kg", "s", "kWh", "m", "pcs")
+
+# -------------------------------
+# Element counts for a target size
+# -------------------------------
+def default_counts(n):
+    """
+    Splits a total of n elements (plus the system limit) over the element types
+    in the proportions of the example FPD. At least one process operator is
+    created whenever there are flows, and one technical resource whenever
+    there are usages.
+    """
+    counts = {k: int(n * share) for k, share in DEFAULT_SHARES.items()}
+    # Give the rounding remainder to the flows so that the total is exactly n
+    counts["flows"] += n - sum(counts.values())
+    if counts["flows"] and not counts["operators"]:
+        counts["operators"] = 1
+        counts["flows"] -= 1
+    if counts["usages"] and not counts["resources"]:
+        counts["resources"] = 1
+        counts["usages"] -= 1
+    if counts["usages"] and not counts["operators"]:
+        counts["operators"] = 1
+        counts["usages"] -= 1
+    return counts
+
+# -------------------------------
+# Building blocks of FPD elements
+# -------------------------------
+def _identification(unique_ident, long_name, short_name, version="1", revision="0"):
+    return {
+        "$type": "fpb:Identification",
+        "uniqueIdent": unique_ident,
+        "longName": long_name,
+        "shortName": short_name,
+        "versionNumber": version,
+        "revisionNumber": revision,
+    }
+
+def _characteristic(rng, element_id, index):
+    """
+    Returns a characteristic with random values, units and validity limits.
+    """
+    if rng.random() < 0.5:
+        valid_from, valid_to = 0, 0
+    else:
+        valid_from = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T08:00:00"
+        valid_to = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T17:00:00"
+    return {
+        "$type": "fpbch:Characteristics",
+        "category": _identification(f"{element_id}_c{index}", "", f"C_{index}", "", ""),
+        "descriptiveElement": {
+            "$type": "fpbch:DescriptiveElement",
+            "valueDeterminationProcess": rng.choice(("", "measured", "calculated")),
+            "representivity": rng.choice(("", "mean", "max")),
+            "setpointValue": {"$type": "fpbch:ValueWithUnit", "value": rng.randint(0, 1000), "unit": rng.choice(UNITS)},
+            "validityLimits": [
+                {"$type": "fpbch:ValidityLimits", "limitType": rng.choice(("", "time")), "from": valid_from, "to": valid_to}
+            ],
+            "actualValues": {"$type": "fpbch:ValueWithUnit", "value": round(rng.uniform(0, 1000), 3), "unit": rng.choice(UNITS)},
+        },
+        "relationalElement": {
+            "$type": "fpbch:RelationalElement",
+            "view": "",
+            "model": "",
+            "regulationsForRelationalGeneration": "",
+        },
+    }
+
+def _object(rng, type_name, element_id, name, long_name, links, characteristics):
+    """
+    Returns a state, process operator or technical resource element.
+    """
+    return {
+        "$type": f"fpb:{type_name}",
+        "id": element_id,
+        "identification": _identification(element_id, long_name, name),
+        "isAssignedTo": links["assigned"],
+        "incoming": links["incoming"],
+        "outgoing": links["outgoing"],
+        "name": name,
+        "characteristics": [_characteristic(rng, element_id, i + 1) for i in range(characteristics)],
+    }
+
+def _relation(type_name, element_id, source, target):
+    return {"$type": f"fpb:{type_name}", "id": element_id, "sourceRef": source, "targetRef": target}
+
+# -------------------------------
+# Generate a document
+# -------------------------------
+class SyntheticFPD:
+    """
+    A synthetic FPD document with the given element counts.
+    Flows alternate between state -> operator and operator -> state, and usages
+    connect technical resources to operators, so every relation resolves.
+    Only the ids and links are kept in memory; the elements themselves are
+    generated while the document is written, so very large documents can be
+    produced with little memory. The same seed yields the same document.
+    """
+
+    def __init__(self, products=0, energies=0, informations=0, operators=0, resources=0,
+                 flows=0, usages=0, characteristics=1, seed=0):
+        if flows and not operators:
+            raise ValueError("Flows need at least one process operator")
+        if usages and not (operators and resources):
+            raise ValueError("Usages need at least one process operator and one technical resource")
+        self.seed = seed
+        self.characteristics = characteristics
+        rng = random.Random(seed)
+        new_id = lambda: str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+        self.project_id = new_id()
+        self.system_limit_id = new_id()
+        self.states = {}
+        counts = dict(products=products, energies=energies, informations=informations)
+        for key, type_name, _ in STATE_KINDS:
+            self.states[type_name] = [new_id() for _ in range(counts[key])]
+        self.operators = [new_id() for _ in range(operators)]
+        self.resources = [new_id() for _ in range(resources)]
+        self.flows = []
+        self.usages = []
+        self.links = {}
+        for i in self._all_objects():
+            self.links[i] = {"assigned": [], "incoming": [], "outgoing": []}
+
+        all_states = [i for ids in self.states.values() for i in ids]
+        for n in range(flows):
+            op = self.operators[n % operators]
+            state = rng.choice(all_states) if all_states else self.operators[rng.randrange(operators)]
+            source, target = (state, op) if n % 2 == 0 else (op, state)
+            self._link(self.flows, new_id(), source, target, assign=state != op)
+        for n in range(usages):
+            self._link(self.usages, new_id(), self.resources[n % resources], rng.choice(self.operators), assign=True)
+
+    def _all_objects(self):
+        for ids in self.states.values():
+            yield from ids
+        yield from self.operators
+        yield from self.resources
+
+    def _link(self, relations, relation_id, source, target, assign):
+        relations.append((relation_id, source, target))
+        self.links[source]["outgoing"].append(relation_id)
+        self.links[target]["incoming"].append(relation_id)
+        if assign:
+            if target not in self.links[source]["assigned"]:
+                self.links[source]["assigned"].append(target)
+            if source not in self.links[target]["assigned"]:
+                self.links[target]["assigned"].append(source)
+
+    def __len__(self):
+        """
+        Number of elements in elementDataInformation (including the system limit).
+        """
+        return sum(1 for _ in self._all_objects()) + len(self.flows) + len(self.usages) + 1
+
+    def project(self):
+        return {
+            "$type": "fpb:Project",
+            "name": "Synthetic_Project",
+            "targetNamespace": "http://www.hsu-ifa.de/fpbjs",
+            "entryPoint": self.project_id,
+        }
+
+    def process(self):
+        return {
+            "$type": "fpb:Process",
+            "id": self.project_id,
+            "elementsContainer": [i for i, _, _ in self.usages] + [self.system_limit_id] + self.resources,
+            "isDecomposedProcessOperator": None,
+            "consistsOfStates": [i for ids in self.states.values() for i in ids],
+            "consistsOfSystemLimit": self.system_limit_id,
+            "consistsOfProcesses": [],
+            "consistsOfProcessOperator": list(self.operators),
+        }
+
+    def elements(self):
+        """
+        Yields the elementDataInformation entries one at a time.
+        """
+        rng = random.Random(self.seed + 1)
+        for relation_id, source, target in self.usages:
+            yield _relation("Usage", relation_id, source, target)
+        yield {
+            "$type": "fpb:SystemLimit",
+            "id": self.system_limit_id,
+            "elementsContainer": [i for i, _, _ in self.flows] + self.operators
+                                 + [i for ids in self.states.values() for i in ids],
+        }
+        for n, resource_id in enumerate(self.resources):
+            yield _object(rng, "TechnicalResource", resource_id, f"Resource_{n}_TR",
+                          f"Technical_Resource_{n}", self.links[resource_id], self.characteristics)
+        for relation_id, source, target in self.flows:
+            yield _relation("Flow", relation_id, source, target)
+        for n, operator_id in enumerate(self.operators):
+            yield _object(rng, "ProcessOperator", operator_id, f"Operator_{n}_PO",
+                          f"Process_Operator_{n}", self.links[operator_id], self.characteristics)
+        for _, type_name, suffix in STATE_KINDS:
+            for n, state_id in enumerate(self.states[type_name]):
+                yield _object(rng, type_name, state_id, f"{type_name}_{n}_{suffix}",
+                              f"{type_name}_{n}", self.links[state_id], self.characteristics)
+
+    def visual_elements(self):
+        """
+        Yields elementVisualInformation entries laid out on a simple grid.
+        """
+        sizes = {"ProcessOperator": (150, 80), "TechnicalResource": (150, 80), "Product": (50, 50),
+                 "Energy": (50, 50), "Information": (50, 50)}
+        shapes = [("TechnicalResource", self.resources), ("ProcessOperator", self.operators)]
+        shapes += [(t, self.states[t]) for _, t, _ in STATE_KINDS]
+        n = 0
+        for type_name, ids in shapes:
+            width, height = sizes[type_name]
+            for element_id in ids:
+                yield {"id": element_id, "width": width, "height": height, "type": f"fpb:{type_name}",
+                       "x": 200 * (n % 50), "y": 150 * (n // 50)}
+                n += 1
+        for type_name, relations in (("Usage", self.usages), ("Flow", self.flows)):
+            for relation_id, _, _ in relations:
+                yield {"id": relation_id, "type": f"fpb:{type_name}", "waypoints": []}
+
+    def write(self, path):
+        """
+        Writes the document to path in the layout of an FPD export, one element per line.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("[\n" + json.dumps(self.project()) + ",\n{\n")
+            f.write('"process": ' + json.dumps(self.process()) + ",\n")
+            _write_array(f, "elementDataInformation", self.elements())
+            f.write(",\n")
+            _write_array(f, "elementVisualInformation", self.visual_elements())
+            f.write("\n}\n]\n")
+
+    def document(self):
+        """
+        Returns the whole document as a JSON-compatible list (for small documents).
+        """
+        return [self.project(), {
+            "process": self.process(),
+            "elementDataInformation": list(self.elements()),
+            "elementVisualInformation": list(self.visual_elements()),
+        }]
+
+def _write_array(f, key, items):
+    f.write(json.dumps(key) + ": [")
+    separator = "\n"
+    for item in items:
+        f.write(separator + json.dumps(item))
+        separator = ",\n"
+    f.write("\n]")
+
+def generate(n, seed=0, characteristics=1, **counts):
+    """
+    Returns a SyntheticFPD with about n elements. Explicit counts per type
+    (products, energies, informations, operators, resources, flows, usages)
+    override the default split.
+    """
+    merged = default_counts(n)
+    merged.update({k: v for k, v in counts.items() if v is not None})
+    return SyntheticFPD(seed=seed, characteristics=characteristics, **merged)
+
+# -------------------------------
+# Command line entry point
+# -------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic FPD JSON document.")
+    parser.add_argument("output", help="path of the FPD JSON file to write")
+    parser.add_argument("-n", "--elements", type=int, default=1000,
+                        help="approximate number of elements (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: %(default)s)")
+    parser.add_argument("--characteristics", type=int, default=1,
+                        help="characteristics per element (default: %(default)s)")
+    for key in DEFAULT_SHARES:
+        parser.add_argument(f"--{key}", type=int, default=None, help=f"exact number of {key}")
+    args = parser.parse_args(argv)
+
+    counts = {key: getattr(args, key) for key in DEFAULT_SHARES}
+    doc = generate(args.elements, args.seed, args.characteristics, **counts)
+    doc.write(args.output)
+    print(f"Wrote {len(doc)} elements to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
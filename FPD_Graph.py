@@ -0,0 +1,337 @@
+# Flow and Usage Graph Index
+# ---------------------------------------------
+# Compact adjacency index over the flows and usages of an FPD. The elements
+# are numbered once and the relations stored as CSR arrays (per direction,
+# one array of neighbours and one of offsets into it per element), so the
+# successors or predecessors of an element are a slice, and topological
+# order, reachability and cycle detection run in O(elements + relations).
+# The index can be stored as a .npz supplementary file in the AASX and
+# loaded back without reading the AAS.
+# Requires numpy (only imported when the graph is requested).
+# ---------------------------------------------
+
+import io
+from collections import deque
+import numpy as np
+from basyx.aas import model
+import FPD_Import
+
+# -------------------------------
+# Location of the index inside the AASX package
+# -------------------------------
+GRAPH_PATH = "/aasx/files/relations.npz"
+GRAPH_CONTENT_TYPE = "application/zip"
+GRAPH_ID_SHORT = "relationGraph"
+
+# Relation types; an edge's kind is its position in this tuple
+KINDS = ("Flow", "Usage")
+
+# -------------------------------
+# Collect elements and relations
+# -------------------------------
+class GraphBuilder:
+    """
+    Collects the element ids and the relation endpoints of FPD JSON elements,
+    one element at a time, and builds the RelationGraph at the end.
+    Relations whose endpoints are not elements of the document are dropped.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.names = []
+        self.types = []
+        self.index = {}
+        self.relations = []
+
+    def add(self, el):
+        """
+        Adds one FPD JSON element (an element or a relation).
+        """
+        t = el["$type"].rpartition(":")[2]
+        if t in KINDS:
+            self.relations.append((el["sourceRef"], el["targetRef"], KINDS.index(t)))
+        elif el.get("id") not in self.index:
+            self.index[el.get("id")] = len(self.ids)
+            self.ids.append(el.get("id"))
+            self.names.append(el.get("name") or "")
+            self.types.append(t)
+
+    def collect(self, elements):
+        """
+        Yields the given elements while adding them to the graph.
+        """
+        for el in elements:
+            self.add(el)
+            yield el
+
+    def __len__(self):
+        return len(self.relations)
+
+    def build(self):
+        """
+        Returns the RelationGraph of all elements and resolvable relations.
+        """
+        index = self.index
+        edges = [(index[source], index[target], kind) for source, target, kind in self.relations
+                 if source in index and target in index]
+        edges = np.array(edges, dtype=np.int64).reshape(-1, 3)
+        return RelationGraph.from_edges(self.ids, self.names, self.types, edges[:, 0], edges[:, 1], edges[:, 2])
+
+    def to_npz(self):
+        """
+        Returns the graph as the bytes of a compressed .npz file.
+        """
+        return self.build().to_npz()
+
+    def add_to(self, submodel, file_store):
+        """
+        Stores the graph in file_store and adds a File element pointing to it to the submodel.
+        """
+        name = file_store.add_file(GRAPH_PATH, io.BytesIO(self.to_npz()), GRAPH_CONTENT_TYPE)
+        submodel.submodel_element.add(graph_file_element(name))
+        return name
+
+def graph_file_element(path=GRAPH_PATH):
+    """
+    Returns the File element that references the graph in the package.
+    """
+    return model.File(
+        id_short=GRAPH_ID_SHORT,
+        content_type=GRAPH_CONTENT_TYPE,
+        value=path,
+        category='PARAMETER'
+    )
+
+def _csr(n, rows, columns, kinds):
+    """
+    Returns (offsets, columns, kinds) of the edges sorted by row; the edges
+    of row i are at offsets[i]:offsets[i + 1], in their original order.
+    """
+    order = np.argsort(rows, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=offsets[1:])
+    return offsets, columns[order].astype(np.int32), kinds[order].astype(np.int8)
+
+# -------------------------------
+# The graph index
+# -------------------------------
+class RelationGraph:
+    """
+    CSR adjacency index over the flows and usages of an FPD.
+
+    The .npz file holds these arrays:
+      id, name, type                 one entry per element (node)
+      out_offsets, out_targets       successors of node i: out_targets[out_offsets[i]:out_offsets[i + 1]]
+      out_kinds                      int8 kind of each of those edges (index into `kinds`)
+      in_offsets, in_sources         predecessors, the same way
+      in_kinds
+      kinds                          the relation types ("Flow", "Usage")
+
+    Queries take and return element ids; `kind` limits them to "Flow" or
+    "Usage" (default: both).
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.ids = arrays["id"].tolist()
+        self.index = {element_id: i for i, element_id in enumerate(self.ids)}
+        self.kinds = tuple(arrays["kinds"].tolist())
+        self._adjacency = {}
+
+    @classmethod
+    def from_edges(cls, ids, names, types, sources, targets, kinds):
+        """
+        Builds the graph from node lists and edge arrays of node numbers.
+        """
+        n = len(ids)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        kinds = np.asarray(kinds, dtype=np.int64)
+        out_offsets, out_targets, out_kinds = _csr(n, sources, targets, kinds)
+        in_offsets, in_sources, in_kinds = _csr(n, targets, sources, kinds)
+        return cls({
+            "id": np.array(ids, dtype=str),
+            "name": np.array(names, dtype=str),
+            "type": np.array(types, dtype=str),
+            "out_offsets": out_offsets,
+            "out_targets": out_targets,
+            "out_kinds": out_kinds,
+            "in_offsets": in_offsets,
+            "in_sources": in_sources,
+            "in_kinds": in_kinds,
+            "kinds": np.array(KINDS, dtype=str),
+        })
+
+    @classmethod
+    def from_elements(cls, elements):
+        """
+        Builds the graph from FPD JSON elements.
+        """
+        builder = GraphBuilder()
+        for el in elements:
+            builder.add(el)
+        return builder.build()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def edge_count(self):
+        return len(self.arrays["out_targets"])
+
+    def _node(self, element_id):
+        try:
+            return self.index[element_id]
+        except KeyError:
+            raise KeyError(f"Unknown element id {element_id!r}") from None
+
+    def _kind(self, kind):
+        if kind is None:
+            return None
+        if kind not in self.kinds:
+            raise ValueError(f"Unknown relation kind {kind!r}, expected one of {', '.join(self.kinds)}")
+        return self.kinds.index(kind)
+
+    def adjacency(self, kind=None, reverse=False):
+        """
+        Returns (offsets, neighbours) as lists for the edges of one kind (or
+        all) in one direction. They are computed once per kind and direction
+        and used by the traversals.
+        """
+        key = (kind, reverse)
+        if key not in self._adjacency:
+            prefix = "in" if reverse else "out"
+            offsets = self.arrays[f"{prefix}_offsets"]
+            neighbours = self.arrays[f"{prefix}_sources" if reverse else f"{prefix}_targets"]
+            code = self._kind(kind)
+            if code is not None:
+                keep = self.arrays[f"{prefix}_kinds"] == code
+                rows = np.repeat(np.arange(len(self)), np.diff(offsets))
+                offsets = np.zeros(len(self) + 1, dtype=np.int64)
+                np.cumsum(np.bincount(rows[keep], minlength=len(self)), out=offsets[1:])
+                neighbours = neighbours[keep]
+            self._adjacency[key] = (offsets.tolist(), neighbours.tolist())
+        return self._adjacency[key]
+
+    def _neighbours(self, element_id, kind, reverse):
+        node = self._node(element_id)
+        prefix = "in" if reverse else "out"
+        offsets = self.arrays[f"{prefix}_offsets"]
+        start, end = offsets[node], offsets[node + 1]
+        neighbours = self.arrays[f"{prefix}_sources" if reverse else f"{prefix}_targets"][start:end]
+        code = self._kind(kind)
+        if code is not None:
+            neighbours = neighbours[self.arrays[f"{prefix}_kinds"][start:end] == code]
+        ids = self.ids
+        return [ids[i] for i in neighbours.tolist()]
+
+    def successors(self, element_id, kind=None):
+        """Returns the ids of the relation targets of an element, in relation order."""
+        return self._neighbours(element_id, kind, False)
+
+    def predecessors(self, element_id, kind=None):
+        """Returns the ids of the relation sources of an element, in relation order."""
+        return self._neighbours(element_id, kind, True)
+
+    def reachable(self, element_id, kind=None, reverse=False):
+        """
+        Returns the ids of all elements reachable from an element (upstream
+        with reverse), in breadth-first order. The element itself is included
+        only if it lies on a cycle.
+        """
+        offsets, neighbours = self.adjacency(kind, reverse)
+        seen = bytearray(len(self))
+        queue = deque([self._node(element_id)])
+        result = []
+        while queue:
+            node = queue.popleft()
+            for other in neighbours[offsets[node]:offsets[node + 1]]:
+                if not seen[other]:
+                    seen[other] = 1
+                    result.append(other)
+                    queue.append(other)
+        ids = self.ids
+        return [ids[i] for i in result]
+
+    def has_path(self, source_id, target_id, kind=None):
+        """Returns True if target_id is reachable from source_id."""
+        return target_id in self.reachable(source_id, kind)
+
+    def topological_order(self, kind=None):
+        """
+        Returns all element ids so that every relation goes from an earlier to
+        a later element; ties keep the input order. Raises ValueError if the
+        relations contain a cycle (see find_cycle).
+        """
+        offsets, neighbours = self.adjacency(kind)
+        in_offsets, _ = self.adjacency(kind, reverse=True)
+        indegree = [in_offsets[i + 1] - in_offsets[i] for i in range(len(self))]
+        queue = deque(i for i, d in enumerate(indegree) if d == 0)
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for other in neighbours[offsets[node]:offsets[node + 1]]:
+                indegree[other] -= 1
+                if indegree[other] == 0:
+                    queue.append(other)
+        if len(order) != len(self):
+            raise ValueError(f"The relations contain a cycle: {' -> '.join(self.find_cycle(kind))}")
+        ids = self.ids
+        return [ids[i] for i in order]
+
+    def find_cycle(self, kind=None):
+        """
+        Returns the element ids of one cycle (the first element repeated at
+        the end), or None if the relations are acyclic.
+        """
+        offsets, neighbours = self.adjacency(kind)
+        state = bytearray(len(self))  # 0 unvisited, 1 on the current path, 2 done
+        for root in range(len(self)):
+            if state[root]:
+                continue
+            path = [root]
+            positions = [offsets[root]]
+            state[root] = 1
+            while path:
+                node = path[-1]
+                position = positions[-1]
+                if position == offsets[node + 1]:
+                    state[node] = 2
+                    path.pop()
+                    positions.pop()
+                    continue
+                positions[-1] = position + 1
+                other = neighbours[position]
+                if state[other] == 1:
+                    cycle = path[path.index(other):] + [other]
+                    return [self.ids[i] for i in cycle]
+                if state[other] == 0:
+                    state[other] = 1
+                    path.append(other)
+                    positions.append(offsets[other])
+        return None
+
+    def to_npz(self):
+        """
+        Returns the graph as the bytes of a compressed .npz file.
+        """
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **self.arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def load(cls, file):
+        """
+        Loads a graph written by to_npz (path or file object).
+        """
+        with np.load(file) as data:
+            return cls({key: data[key] for key in data.files})
+
+    @classmethod
+    def from_aasx(cls, path_aasx):
+        """
+        Loads the graph stored in an AASX package written with --graph, from
+        the part the relationGraph File element references.
+        """
+        return cls.load(io.BytesIO(FPD_Import.read_file_element(path_aasx, GRAPH_ID_SHORT)))
@@ -0,0 +1,491 @@
+# AASX to FPD Import
+# ---------------------------------------------
+# Reads an AASX package written by FPD2AAS.py back into FPD JSON.
+# Opening a package only parses its AAS part (XML with lxml, or JSON) and
+# indexes the process collections, flows and usages by idShort; an element
+# is turned into its FPD JSON form when it is asked for, so reading a few
+# elements of a large package does not build the whole model. No basyx
+# objects are created.
+# Only the data mapped to the AAS is restored: the SystemLimit, the ids of
+# flows and usages (new ones are derived from their position) and all but
+# the first validity limit of a characteristic are lost. Converting the
+# result again gives the same AAS part.
+# Usage: python FPD_Import.py INPUT.aasx [-o OUTPUT.json]
+# ---------------------------------------------
+
+import argparse
+import json
+import posixpath
+import sys
+import uuid
+import zipfile
+from lxml import etree
+import FPD
+
+_NS_RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_REL_ORIGIN = "http://admin-shell.io/aasx/relationships/aasx-origin"
+_REL_SPEC = "http://admin-shell.io/aasx/relationships/aas-spec"
+
+# -------------------------------
+# Access to the nodes of the XML or JSON AAS part
+# -------------------------------
+class _XmlFormat:
+    """
+    Reads submodel elements from an lxml tree of the XML serialization. The
+    AAS namespace is taken from the root element, so packages of other AAS
+    3.x versions are read as well.
+    """
+
+    def __init__(self, data):
+        parser = etree.XMLParser(huge_tree=True, remove_blank_text=True)
+        self.root = etree.fromstring(data, parser)
+        self.ns = self.root.tag.rpartition("}")[0] + "}"
+        self._id_short = f"{self.ns}idShort"
+        self._value = f"{self.ns}value"
+        self._collection = f"{self.ns}submodelElementCollection"
+
+    def submodels(self):
+        ns = self.ns
+        for sm in self.root.iterfind(f"{ns}submodels/{ns}submodel"):
+            elements = sm.find(f"{ns}submodelElements")
+            yield sm.findtext(f"{ns}id"), list(elements) if elements is not None else []
+
+    # The children are scanned directly; find() and findtext() parse a path per call
+    def _child(self, node, tag):
+        for child in node:
+            if child.tag == tag:
+                return child
+        return None
+
+    def id_short(self, node):
+        child = self._child(node, self._id_short)
+        return None if child is None else child.text
+
+    def is_collection(self, node):
+        return node.tag == self._collection
+
+    def children(self, node):
+        value = self._child(node, self._value)
+        return list(value) if value is not None else []
+
+    def value(self, node):
+        value = self._child(node, self._value)
+        return None if value is None else (value.text or "")
+
+    def flatten(self, node, prefix, out):
+        """_flatten for XML: reads idShort and value of each child in one scan."""
+        id_short_tag, value_tag, collection_tag = self._id_short, self._value, self._collection
+        value = self._child(node, value_tag)
+        for child in (value if value is not None else ()):
+            id_short = child_value = None
+            for part in child:
+                tag = part.tag
+                if tag == id_short_tag:
+                    id_short = part.text
+                elif tag == value_tag:
+                    child_value = part
+            if child.tag == collection_tag:
+                self.flatten(child, prefix + id_short + ".", out)
+            else:
+                out[prefix + id_short] = None if child_value is None else (child_value.text or "")
+        return out
+
+    def keys(self, node):
+        value = self._child(node, self._value)
+        keys = None if value is None else self._child(value, f"{self.ns}keys")
+        return [self._child(key, self._value).text for key in (keys if keys is not None else ())]
+
+class _JsonFormat:
+    """Reads submodel elements from the parsed JSON serialization."""
+
+    def __init__(self, data):
+        self.root = json.loads(data)
+
+    def submodels(self):
+        for sm in self.root.get("submodels", ()):
+            yield sm.get("id"), sm.get("submodelElements", [])
+
+    @staticmethod
+    def id_short(node):
+        return node.get("idShort")
+
+    @staticmethod
+    def is_collection(node):
+        return node.get("modelType") == "SubmodelElementCollection"
+
+    @staticmethod
+    def children(node):
+        return node.get("value") or []
+
+    @staticmethod
+    def value(node):
+        return node.get("value")
+
+    @staticmethod
+    def keys(node):
+        return [key.get("value") for key in (node.get("value") or {}).get("keys", ())]
+
+    def flatten(self, node, prefix, out):
+        for child in node.get("value") or ():
+            if child.get("modelType") == "SubmodelElementCollection":
+                self.flatten(child, prefix + child["idShort"] + ".", out)
+            else:
+                out[prefix + child["idShort"]] = child.get("value")
+        return out
+
+def _find_spec_part(package):
+    """
+    Returns the name of the AAS part of an AASX package, following the
+    package relationships (aasx-origin, then aas-spec).
+    """
+    def targets(rels_name, rel_type, base):
+        root = etree.fromstring(package.read(rels_name))
+        for rel in root.iterfind(f"{_NS_RELS}Relationship"):
+            if rel.get("Type") == rel_type:
+                yield posixpath.normpath(posixpath.join(base, rel.get("Target"))).lstrip("/")
+
+    for origin in targets("_rels/.rels", _REL_ORIGIN, "/"):
+        folder, name = posixpath.split(origin)
+        for part in targets(posixpath.join(folder, "_rels", name + ".rels"), _REL_SPEC, "/" + folder):
+            return part
+    raise ValueError("No AAS part found in the AASX package")
+
+def _read_spec(package):
+    """Returns the reader (_XmlFormat or _JsonFormat) of the AAS part of an open AASX package."""
+    part = _find_spec_part(package)
+    data = package.read(part)
+    return _JsonFormat(data) if part.endswith(".json") else _XmlFormat(data)
+
+def read_file_element(path, id_short):
+    """
+    Returns the content of the supplementary file referenced by the File
+    element `id_short` at the top level of a submodel of an AASX package. The
+    part is taken from the File element's value, which is the name the package
+    writer gave the file.
+    """
+    with zipfile.ZipFile(path) as package:
+        fmt = _read_spec(package)
+        for _, elements in fmt.submodels():
+            for node in elements:
+                if fmt.id_short(node) == id_short and fmt.value(node):
+                    return package.read(fmt.value(node).lstrip("/"))
+    raise ValueError(f"The package has no File element {id_short}")
+
+# -------------------------------
+# Rebuild FPD JSON from the mapped Properties
+# -------------------------------
+def _flatten(fmt, node, prefix="", out=None):
+    """
+    Returns the Property values below a collection as a dict of dotted id_short path -> value.
+    """
+    return fmt.flatten(node, prefix, {} if out is None else out)
+
+def _identification(flat, prefix):
+    return {
+        "$type": "fpb:Identification",
+        "uniqueIdent": flat.get(prefix + "uniqueIdent") or "",
+        "longName": flat.get(prefix + "longName") or "",
+        "shortName": flat.get(prefix + "shortName") or "",
+        "versionNumber": flat.get(prefix + "versionNumber") or "",
+        "revisionNumber": flat.get(prefix + "revisionNumber") or "",
+    }
+
+def _value_with_unit(value, unit):
+    return {"$type": "fpbch:ValueWithUnit", "value": float(value) if value else 0.0, "unit": unit or ""}
+
+def _characteristic_json(category, value_determination_process, representivity, setpoint,
+                         validity_limits, actual, view, model_, regulation):
+    return {
+        "$type": "fpbch:Characteristics",
+        "category": category,
+        "descriptiveElement": {
+            "$type": "fpbch:DescriptiveElement",
+            "valueDeterminationProcess": value_determination_process,
+            "representivity": representivity,
+            "setpointValue": setpoint,
+            "validityLimits": validity_limits,
+            "actualValues": actual,
+        },
+        "relationalElement": {
+            "$type": "fpbch:RelationalElement",
+            "view": view,
+            "model": model_,
+            "regulationsForRelationalGeneration": regulation,
+        },
+    }
+
+def _characteristic(flat, prefix):
+    """
+    Returns the FPD characteristic stored under prefix, or None for the empty
+    collection of a state without characteristics.
+    """
+    if flat.get(prefix + "uniqueIdent") is None:
+        return None
+    desc = prefix + "descriptiveElement."
+    rel = prefix + "relationalElement."
+    limit_type = flat.get(desc + "validityLimits.limitType") or ""
+    valid_from = flat.get(desc + "validityLimits.from")
+    valid_to = flat.get(desc + "validityLimits.to")
+    validity_limits = []
+    if limit_type or valid_from is not None or valid_to is not None:
+        limit = {"$type": "fpbch:ValidityLimits", "limitType": limit_type}
+        if valid_from is not None:
+            limit["from"] = valid_from
+        if valid_to is not None:
+            limit["to"] = valid_to
+        validity_limits.append(limit)
+    return _characteristic_json(
+        _identification(flat, prefix),
+        flat.get(desc + "valueDeterminationProcess") or "",
+        flat.get(desc + "representivity") or "",
+        _value_with_unit(flat.get(desc + "setpointValue.valueSetpoint"), flat.get(desc + "setpointValue.unitSetpoint")),
+        validity_limits,
+        _value_with_unit(flat.get(desc + "actualValues.valueActualValue"), flat.get(desc + "actualValues.unitActualValue")),
+        flat.get(rel + "view") or "",
+        flat.get(rel + "model") or "",
+        flat.get(rel + "regulationsForRelationalGeneration") or "",
+    )
+
+# What operators and resources without characteristics are mapped with
+_EMPTY_CHARACTERISTIC = _characteristic_json(
+    _identification({}, ""), "", "", _value_with_unit(None, None), [], _value_with_unit(None, None), "", "", "")
+
+def element_json(fmt, node, t):
+    """
+    Returns the FPD JSON element of a process collection entry of type t.
+    """
+    flat = _flatten(fmt, node)
+    characteristics = []
+    prefix, n = "characteristics.", 1
+    while prefix + "uniqueIdent" in flat:
+        ch = _characteristic(flat, prefix)
+        if ch is not None and not (n == 1 and t not in FPD.STATE_TYPES and ch == _EMPTY_CHARACTERISTIC):
+            characteristics.append(ch)
+        n += 1
+        prefix = f"characteristics_{n}."
+    assignment = flat.get("assignment")
+    return {
+        "$type": "fpb:" + t,
+        "id": flat.get("identification.uniqueIdent"),
+        "name": fmt.id_short(node),
+        "identification": _identification(flat, "identification."),
+        "isAssignedTo": assignment.split(",") if assignment else [],
+        "characteristics": characteristics,
+    }
+
+# -------------------------------
+# Lazily read FPD package
+# -------------------------------
+class FPDPackage:
+    """
+    An AASX package written by FPD2AAS.py, opened for reading FPD data.
+    Opening parses the AAS part and indexes the entries of every process
+    collection (also of split output, see FPD_Split) by name; element(),
+    flows() and usages() turn them into FPD JSON on demand.
+    """
+
+    def __init__(self, path):
+        with zipfile.ZipFile(path) as package:
+            self.fmt = _read_spec(package)
+        self.project = None
+        self.nodes = {}
+        self.collections = []
+        self.relations = {"Flow": [], "Usage": []}
+        self._ids = {}
+        self._types = None
+        self._operators = None
+        for submodel_id, elements in self._ordered_submodels():
+            for node in elements:
+                id_short = self.fmt.id_short(node)
+                if id_short == "process":
+                    names = []
+                    for child in self.fmt.children(node):
+                        names.append(self.fmt.id_short(child))
+                        self.nodes.setdefault(names[-1], child)
+                    self.collections.append(names)
+                elif id_short == "projectInformation" and self.project is None:
+                    info = _flatten(self.fmt, node)
+                    self.project = {
+                        "$type": "fpb:Project",
+                        "name": info.get("name"),
+                        "targetNamespace": info.get("targetNamespace"),
+                        "entryPoint": info.get("entryPoint"),
+                    }
+                elif id_short in ("flows", "usages"):
+                    t = "Flow" if id_short == "flows" else "Usage"
+                    self.relations[t].extend((submodel_id, item) for item in self.fmt.children(node))
+        if self.project is None:
+            raise ValueError("The package has no FPD projectInformation")
+
+    def _ordered_submodels(self):
+        """
+        Returns (submodel id, submodel elements) of all submodels; the parts of
+        split output are put in the order of the index submodel's parts list.
+        Output split per operator also names every operator in the part labels.
+        """
+        submodels = list(self.fmt.submodels())
+        order = {}
+        for _, elements in submodels:
+            index = {self.fmt.id_short(node): node for node in elements}
+            if "parts" not in index:
+                continue
+            labels = []
+            for item in self.fmt.children(index["parts"]):
+                part = {self.fmt.id_short(child): child for child in self.fmt.children(item)}
+                order.setdefault(self.fmt.keys(part["submodel"])[-1], len(order))
+                labels.append(self.fmt.value(part["label"]) if "label" in part else None)
+            if "split" in index and self.fmt.value(index["split"]) == "operator":
+                self._operators = {label.strip() for label in labels if label}
+        submodels.sort(key=lambda sm: order.get(sm[0], -1))
+        return submodels
+
+    def _state_type(self, name):
+        """Returns the stateType of an entry, or None for operators and resources."""
+        for child in self.fmt.children(self.nodes[name]):
+            if self.fmt.id_short(child) == "stateType":
+                return self.fmt.value(child)
+        return None
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, name):
+        return name in self.nodes
+
+    def names(self):
+        """Returns the names of the states, operators and resources in process order."""
+        return list(self.nodes)
+
+    def _endpoints(self, t):
+        """Yields (source name, target name) of each relation of type t."""
+        for submodel_id, item in self.relations[t]:
+            ends = [self.fmt.keys(ref) for ref in self.fmt.children(item)]
+            if len(ends) == 2 and ends[0] and ends[1]:
+                yield ends[0][-1], ends[1][-1]
+            else:
+                yield None, None
+
+    def element_type(self, name):
+        """
+        Returns the FPD $type suffix of an element. States carry it in stateType.
+        In output split per operator the index names the operators; otherwise
+        operators and resources are told apart by the flows and usages (usages
+        go from a resource to an operator, only operators have flows). Entries
+        without either take the type of the closest operator or resource before
+        them in process order (resources come after the operators; the process
+        collections of split output are taken in turn), else of the closest one
+        after them, else ProcessOperator.
+        """
+        state_type = self._state_type(name)
+        if state_type is not None:
+            return state_type
+        if self._operators is not None:
+            return "ProcessOperator" if name in self._operators else "TechnicalResource"
+        if self._types is None:
+            self._types = {}
+            for src, tgt in self._endpoints("Usage"):
+                self._types.setdefault(src, "TechnicalResource")
+                self._types[tgt] = "ProcessOperator"
+            for src, tgt in self._endpoints("Flow"):
+                self._types[src] = self._types[tgt] = "ProcessOperator"
+            unknown = []
+            previous = None
+            for names in self.collections:
+                for entry in names:
+                    if self._state_type(entry) is not None:
+                        continue
+                    t = self._types.get(entry)
+                    if t is None:
+                        unknown.append(entry)
+                        continue
+                    for other in unknown:
+                        self._types[other] = previous or t
+                    unknown.clear()
+                    previous = t
+            for other in unknown:
+                self._types[other] = previous or "ProcessOperator"
+        return self._types.get(name, "ProcessOperator")
+
+    def element(self, name):
+        """Returns the FPD JSON element with the given name."""
+        return element_json(self.fmt, self.nodes[name], self.element_type(name))
+
+    def element_id(self, name):
+        """Returns the id of the element with the given name, or None if there is none."""
+        if name not in self._ids:
+            node = self.nodes.get(name)
+            self._ids[name] = None if node is None else _flatten(self.fmt, node).get("identification.uniqueIdent")
+        return self._ids[name]
+
+    def elements(self):
+        """Yields the FPD JSON elements in process order."""
+        for name in self.nodes:
+            yield self.element(name)
+
+    def _relations(self, t):
+        """
+        Yields the FPD JSON relations of type t. Relations to entries outside
+        the process collections are skipped.
+        """
+        for n, (src, tgt) in enumerate(self._endpoints(t)):
+            source_ref, target_ref = self.element_id(src), self.element_id(tgt)
+            if source_ref is None or target_ref is None:
+                continue
+            yield {
+                "$type": "fpb:" + t,
+                "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{self.project['entryPoint']}/{t}/{n}")),
+                "sourceRef": source_ref,
+                "targetRef": target_ref,
+            }
+
+    def flows(self):
+        """Yields the flows as FPD JSON relations."""
+        return self._relations("Flow")
+
+    def usages(self):
+        """Yields the usages as FPD JSON relations."""
+        return self._relations("Usage")
+
+    def to_fpd(self):
+        """
+        Returns the whole FPD JSON document: [project, {"process", "elementDataInformation"}].
+        """
+        elements = list(self.elements())
+        relations = list(self.flows()) + list(self.usages())
+        process = {
+            "$type": "fpb:Process",
+            "id": self.project["entryPoint"],
+            "elementsContainer": [el["id"] for el in relations],
+            "isDecomposedProcessOperator": None,
+            "consistsOfStates": [el["id"] for el in elements if el["$type"][4:] in FPD.STATE_TYPES],
+            "consistsOfSystemLimit": None,
+            "consistsOfProcesses": [],
+            "consistsOfProcessOperator": [el["id"] for el in elements if el["$type"] == "fpb:ProcessOperator"],
+        }
+        return [self.project, {"process": process, "elementDataInformation": elements + relations}]
+
+def read_aasx(path):
+    """
+    Reads an AASX package written by FPD2AAS.py and returns its FPD JSON document.
+    """
+    return FPDPackage(path).to_fpd()
+
+# -------------------------------
+# Command line entry point
+# -------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert an AASX package written by FPD2AAS.py back into FPD JSON.")
+    parser.add_argument("input", help="AASX package")
+    parser.add_argument("-o", "--output", default="-", help="FPD JSON file ('-' for stdout, the default)")
+    args = parser.parse_args(argv)
+    doc = read_aasx(args.input)
+    if args.output == "-":
+        json.dump(doc, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,456 @@
+# FPD Element Offset Index
+# ---------------------------------------------
+# Byte-offset index over the elementDataInformation array of an FPD JSON
+# file, built in one streaming pass and saved next to it as <file>.idx.
+# It holds the byte range of every element, of the project and of the
+# process, and what selecting a subset needs: the id, $type and isAssignedTo
+# of each element and the endpoints of the flows and usages. The index file
+# and the JSON file are memory-mapped, so a partial conversion decodes only
+# the selected elements, and opening an index reads only its header; each
+# column is decoded when a selection first needs it.
+# A subset is selected by element id, by $type and by isAssignedTo (see
+# Selection); the flows and usages between the selected elements are added.
+# An index whose JSON file has changed (size or modification time) is
+# rebuilt when it is opened.
+# Usage: python FPD_Index.py [--id ID] [--type TYPE] [--assigned-to ID [--depth N]] INPUT [INPUT ...]
+# ---------------------------------------------
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+from itertools import accumulate
+import FPD_Model
+import FPD_Stream
+
+# -------------------------------
+# Index file layout (little-endian)
+# -------------------------------
+#   header    magic, size and modification time (ns) of the JSON file,
+#             element count, project and process byte ranges (-1 without a
+#             process), length of the types table
+#   ranges    per element two uint64: start and end (exclusive) byte offset in the JSON file
+#   codes     per element a uint32: the number of its $type suffix in the types table
+#   columns   id, isAssignedTo ids, source and target id (null except for flows
+#             and usages), each as count + 1 uint64 offsets followed by a
+#             UTF-8 JSON array; the value of element i is the JSON text from
+#             offset i up to the separator before offset i + 1, and the last
+#             offset is the length of the array
+#   types     UTF-8 JSON array of the $type suffixes
+INDEX_SUFFIX = ".idx"
+MAGIC = b"FPDIDX02"
+_HEADER = struct.Struct("<8sQqQQQqqQ")
+COLUMNS = ("ids", "assigned", "sources", "targets")
+
+# What to convert. `depth` is the number of isAssignedTo steps followed from
+# the assigned_to elements; None follows them until nothing is added.
+Selection = namedtuple("Selection", "ids types assigned_to depth", defaults=((), (), (), 1))
+
+def index_path(path_json):
+    """
+    Returns the path of the index saved next to an FPD JSON file.
+    """
+    return path_json + INDEX_SUFFIX
+
+def _stat(path_json):
+    st = os.stat(path_json)
+    return st.st_size, st.st_mtime_ns
+
+def _fields(el):
+    """
+    Returns ($type suffix, id, isAssignedTo, sourceRef, targetRef) of a JSON element.
+    """
+    if not isinstance(el, dict):
+        el = {}
+    assigned = el.get("isAssignedTo")
+    return (str(el.get("$type", "")).rpartition(":")[2], el.get("id"),
+            assigned if isinstance(assigned, list) else [], el.get("sourceRef"), el.get("targetRef"))
+
+def _ascii(fields):
+    return all(not isinstance(value, str) or value.isascii()
+               for value in fields[:2] + tuple(fields[2]) + fields[3:])
+
+def _uint_array(data, start, count, typecode):
+    """
+    Returns `count` little-endian unsigned integers of the index file from
+    `start`: a view of the memory map, or a byte-swapped copy on big-endian machines.
+    """
+    size = array(typecode).itemsize
+    if sys.byteorder == "little":
+        return memoryview(data)[start:start + size * count].cast(typecode)
+    values = array(typecode, data[start:start + size * count])
+    values.byteswap()
+    return values
+
+def _little_endian(values, typecode):
+    values = array(typecode, values)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+def _encode_value(value, escape=json.encoder.encode_basestring_ascii):
+    """Returns the compact JSON of one column value; ids and id lists take the short way."""
+    if isinstance(value, str):
+        return escape(value).encode("ascii")
+    if value is None:
+        return b"null"
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return ("[" + ",".join(map(escape, value)) + "]").encode("ascii")
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+def _encode_column(values):
+    """
+    Returns the offsets and the JSON array of a column as written to the index file.
+    """
+    parts = [_encode_value(value) for value in values]
+    # Each value is followed by a separator, the last by the closing bracket
+    offsets = array("Q", accumulate((len(part) + 1 for part in parts), initial=1)) if parts else array("Q", [2])
+    return offsets, b"[" + b",".join(parts) + b"]"
+
+class _Column:
+    """
+    The values of one index column in the memory-mapped index file. Single
+    values are decoded on access; iterating decodes the whole column with
+    one json.loads and keeps it.
+    """
+
+    def __init__(self, data, start, offsets):
+        self.data = data
+        self.start = start
+        self.offsets = offsets
+        self._values = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if self._values is not None:
+            return self._values[i]
+        if not 0 <= i < len(self):
+            raise IndexError("column index out of range")
+        return json.loads(self.data[self.start + self.offsets[i]:self.start + self.offsets[i + 1] - 1])
+
+    def __iter__(self):
+        if self._values is None:
+            self._values = json.loads(self.data[self.start:self.start + self.offsets[-1]])
+        return iter(self._values)
+
+# -------------------------------
+# The index
+# -------------------------------
+class ElementOffsetIndex:
+    """
+    Byte ranges and selection data of the elements of one FPD JSON file,
+    numbered in file order. Created with build or load (or open_index, which
+    loads the saved index or builds and saves a new one); close releases the
+    memory maps.
+    """
+
+    def __init__(self, path_json, ranges, spans, types, codes, columns, source_stat, index_map=None):
+        self.path_json = path_json
+        self.ranges = ranges            # start of element i at 2 * i, its end at 2 * i + 1
+        self.spans = spans              # "project" and "process" byte range (process None without one)
+        self.types = types              # the $type suffixes
+        self.codes = codes              # number in types of each element's $type suffix
+        self.ids = columns["ids"]
+        self.assigned = columns["assigned"]
+        self.sources = columns["sources"]
+        self.targets = columns["targets"]
+        self.source_stat = source_stat
+        self._index_map = index_map
+        self._json_map = None
+        self._positions = None
+        self._assigned_by = None
+
+    @classmethod
+    def build(cls, path_json):
+        """
+        Indexes an FPD JSON file in one streaming pass.
+        """
+        source_stat = _stat(path_json)
+        stream = FPD_Stream.FPDStream(path_json, encoding="latin-1")
+        ranges = array("Q")
+        numbers = {}
+        types = []
+        codes = array("I")
+        columns = {name: [] for name in COLUMNS}
+        with open(path_json, "rb") as raw:
+            for start, end, el in stream.spans():
+                ranges.append(start)
+                ranges.append(end)
+                fields = _fields(el)
+                if not _ascii(fields):
+                    # Read as latin-1 only ASCII text is certain to be right; decode the element properly
+                    raw.seek(start)
+                    fields = _fields(json.loads(raw.read(end - start)))
+                t, element_id, assigned, source, target = fields
+                if t not in numbers:
+                    numbers[t] = len(types)
+                    types.append(t)
+                codes.append(numbers[t])
+                columns["ids"].append(element_id)
+                columns["assigned"].append(assigned)
+                columns["sources"].append(source)
+                columns["targets"].append(target)
+        spans = {"project": tuple(stream.project_span), "process": None}
+        if stream.process_span is not None:
+            spans["process"] = tuple(stream.process_span)
+        return cls(path_json, ranges, spans, types, codes, columns, source_stat)
+
+    @classmethod
+    def load(cls, path_json, path_index=None):
+        """
+        Memory-maps the index saved for an FPD JSON file. Only the header,
+        the section offsets and the types table are read here. Raises
+        ValueError if the file is not a complete index.
+        """
+        path_index = path_index or index_path(path_json)
+        with open(path_index, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        views = []
+        try:
+            if len(data) < _HEADER.size:
+                raise ValueError(f"{path_index} is not an FPD element index")
+            (magic, size, mtime, count, project_start, project_end,
+             process_start, process_end, types_length) = _HEADER.unpack_from(data)
+            if magic != MAGIC:
+                raise ValueError(f"{path_index} is not an FPD element index")
+            position = _HEADER.size
+            sections = []
+            for typecode, length in (("Q", 2 * count), ("I", count)):
+                section_size = array(typecode).itemsize * length
+                if position + section_size > len(data):
+                    raise ValueError(f"{path_index} is not an FPD element index")
+                sections.append(_uint_array(data, position, length, typecode))
+                views.append(sections[-1])
+                position += section_size
+            ranges, codes = sections
+            columns = {}
+            for name in COLUMNS:
+                if position + 8 * (count + 1) > len(data):
+                    raise ValueError(f"{path_index} is not an FPD element index")
+                offsets = _uint_array(data, position, count + 1, "Q")
+                views.append(offsets)
+                position += 8 * (count + 1)
+                columns[name] = _Column(data, position, offsets)
+                position += offsets[-1]
+            if position + types_length != len(data):
+                raise ValueError(f"{path_index} is not an FPD element index")
+            types = json.loads(data[position:])
+        except Exception:
+            for view in views:
+                if isinstance(view, memoryview):
+                    view.release()
+            data.close()
+            raise
+        spans = {"project": (project_start, project_end),
+                 "process": (process_start, process_end) if process_start >= 0 else None}
+        return cls(path_json, ranges, spans, types, codes, columns, (size, mtime), data)
+
+    def save(self, path_index=None):
+        """
+        Writes the index next to the JSON file (or to path_index) and returns its path.
+        """
+        path_index = path_index or index_path(self.path_json)
+        types = json.dumps(self.types, separators=(",", ":")).encode("utf-8")
+        process = self.spans["process"] or (-1, -1)
+        # Written under a temporary name so that concurrent readers never see a partial index
+        tmp = f"{path_index}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, *self.source_stat, len(self), *self.spans["project"], *process, len(types)))
+            f.write(_little_endian(self.ranges, "Q"))
+            f.write(_little_endian(self.codes, "I"))
+            for name in COLUMNS:
+                offsets, values = _encode_column(getattr(self, name))
+                f.write(_little_endian(offsets, "Q"))
+                f.write(values)
+            f.write(types)
+        os.replace(tmp, path_index)
+        return path_index
+
+    @property
+    def fresh(self):
+        """True if the JSON file is unchanged since the index was built."""
+        return _stat(self.path_json) == tuple(self.source_stat)
+
+    def close(self):
+        """
+        Releases the memory maps of the index and of the JSON file.
+        """
+        views = [self.ranges, self.codes] + [getattr(self, name).offsets for name in COLUMNS
+                                             if isinstance(getattr(self, name), _Column)]
+        for view in views:
+            if isinstance(view, memoryview):
+                view.release()
+        for data in (self._index_map, self._json_map):
+            if data is not None:
+                data.close()
+        self._index_map = self._json_map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return len(self.ids)
+
+    # -------------------------------
+    # Decode elements from the JSON file
+    # -------------------------------
+    def _decode(self, span):
+        if self._json_map is None:
+            with open(self.path_json, "rb") as f:
+                self._json_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        start, end = span
+        return json.loads(self._json_map[start:end])
+
+    def element(self, i):
+        """Returns the decoded JSON of element number i."""
+        return self._decode((self.ranges[2 * i], self.ranges[2 * i + 1]))
+
+    def elements(self, numbers):
+        """Returns the decoded JSON of the given element numbers, in that order."""
+        return [self.element(i) for i in numbers]
+
+    def project(self):
+        return self._decode(self.spans["project"])
+
+    def process(self):
+        """Returns the process, or None if the file has none."""
+        return self._decode(self.spans["process"]) if self.spans["process"] is not None else None
+
+    def document(self, selection):
+        """
+        Returns an FPD document of the same form as the file that contains
+        only the selected elements (see select).
+        """
+        return [self.project(), {
+            "process": self.process(),
+            "elementDataInformation": self.elements(self.select(selection)),
+        }]
+
+    # -------------------------------
+    # Select a subset
+    # -------------------------------
+    def positions(self):
+        """
+        Returns a dict of the element number per id (the first element with that id).
+        """
+        if self._positions is None:
+            self._positions = {}
+            for i, element_id in enumerate(self.ids):
+                self._positions.setdefault(element_id, i)
+        return self._positions
+
+    def number(self, element_id):
+        try:
+            return self.positions()[element_id]
+        except KeyError:
+            raise KeyError(f"Unknown element id {element_id!r} in {self.path_json}") from None
+
+    def _assigned(self, i):
+        """
+        Yields the numbers of the elements assigned to element i and of those it is assigned to.
+        """
+        if self._assigned_by is None:
+            self._assigned_by = {}
+            for j, refs in enumerate(self.assigned):
+                for ref in refs:
+                    self._assigned_by.setdefault(ref, []).append(j)
+        yield from self._assigned_by.get(self.ids[i], ())
+        positions = self.positions()
+        for ref in self.assigned[i]:
+            if ref in positions:
+                yield positions[ref]
+
+    def select(self, selection):
+        """
+        Returns the numbers of the selected elements in file order: those with
+        the ids and $type suffixes of the selection, the assigned_to elements
+        with the elements assigned to them and those they are assigned to
+        (repeated `depth` times), and the flows and usages whose source and
+        target are both among them. Flows and usages are not selected by id or
+        type themselves. Raises KeyError for an unknown id.
+        """
+        codes = [self.types[code] for code in self.codes]
+        chosen = {self.number(element_id) for element_id in selection.ids}
+        types = set(selection.types)
+        chosen.update(i for i, t in enumerate(codes) if t in types)
+
+        frontier = [self.number(element_id) for element_id in selection.assigned_to]
+        chosen.update(frontier)
+        step = 0
+        while frontier and (selection.depth is None or step < selection.depth):
+            step += 1
+            found = []
+            for i in frontier:
+                for j in self._assigned(i):
+                    if j not in chosen:
+                        chosen.add(j)
+                        found.append(j)
+            frontier = found
+
+        chosen = {i for i in chosen if codes[i] not in FPD_Model.RELATION_TYPES}
+        ids = list(self.ids)
+        selected = {ids[i] for i in chosen}
+        sources, targets = list(self.sources), list(self.targets)
+        chosen.update(i for i, t in enumerate(codes)
+                      if t in FPD_Model.RELATION_TYPES and sources[i] in selected and targets[i] in selected)
+        return sorted(chosen)
+
+def open_index(path_json, save=True):
+    """
+    Returns the index of an FPD JSON file: the saved one if it is up to date,
+    otherwise a new one, which is saved next to the file with save.
+    """
+    try:
+        index = ElementOffsetIndex.load(path_json)
+        if index.fresh:
+            return index
+        index.close()
+    except (OSError, ValueError):
+        pass                    # Not indexed yet, or not a valid index
+    index = ElementOffsetIndex.build(path_json)
+    if save:
+        try:
+            index.save()
+        except OSError:
+            pass                # A read-only input directory: use the index unsaved
+    return index
+
+def read_document(path_json, selection, save=True):
+    """
+    Returns the selected part of an FPD JSON file as a document (see
+    ElementOffsetIndex.document) and the set of all element ids of the file.
+    """
+    with open_index(path_json, save) as index:
+        return index.document(selection), set(index.ids)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the element offset index of FPD JSON files "
+                                                 "and list the elements of a selection.")
+    parser.add_argument("inputs", nargs="+", help="FPD JSON files")
+    parser.add_argument("--id", action="append", default=[], help="select the element with this id")
+    parser.add_argument("--type", action="append", default=[], help="select the elements of this $type suffix")
+    parser.add_argument("--assigned-to", action="append", default=[], metavar="ID",
+                        help="select this element and the elements assigned to it and it is assigned to")
+    parser.add_argument("--depth", type=int, default=1,
+                        help="isAssignedTo steps followed from --assigned-to (0: all; default: %(default)s)")
+    args = parser.parse_args(argv)
+    selection = Selection(args.id, args.type, args.assigned_to, args.depth or None)
+    for path in args.inputs:
+        with open_index(path) as index:
+            print(f"{path}: {len(index)} elements, index {index_path(path)}")
+            if args.id or args.type or args.assigned_to:
+                for i in index.select(selection):
+                    print(f"  {index.ids[i]}  {index.types[index.codes[i]]}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
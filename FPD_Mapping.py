@@ -0,0 +1,277 @@
+# Declarative FPD to AAS Mapping
+# ---------------------------------------------
+# One table describes how each FPD element type becomes a collection in the
+# process collection: the id_short, the nested collections, and per Property
+# its id_short, value type, category and source path in the decoded element
+# (FPD_Model). At import the table is compiled into one CollectionTemplate and
+# one generated value function per type, so mapping an element is a single
+# tuple expression followed by a template stamp.
+# A new element type is added by adding an entry to MAPPINGS.
+# ---------------------------------------------
+
+from collections import namedtuple
+from basyx.aas import model
+import FPD2AAS_Functions as func
+import FPD_Model
+
+# -------------------------------
+# Building blocks of the mapping table
+# -------------------------------
+# A Property. `source` is a dotted attribute path from the object of the
+# enclosing Group; `transform` names an entry of TRANSFORMS.
+Field = namedtuple("Field", "id_short source value_type category transform",
+                   defaults=("string", "CONSTANT", None))
+
+# A SubmodelElementCollection. With a `source`, the children read from that
+# path instead of the enclosing object. A numeric path segment takes that
+# item of a sequence, or `fallback` if the sequence is too short; with a None
+# fallback all Properties of the group stay empty.
+Group = namedtuple("Group", "id_short children source fallback category",
+                   defaults=(None, None, "PARAMETER"))
+
+# Further collections added after the root's children, one per item of the
+# sequence at `source` from position `skip` on, named id_short.format(position + 1).
+Repeat = namedtuple("Repeat", "source skip id_short group")
+
+# The mapping of one element type: the root collection, the Field that
+# gives its id_short and any repeated child collections.
+Mapping = namedtuple("Mapping", "root id_short repeats", defaults=((),))
+
+VALUE_TYPES = {
+    "string": model.datatypes.String,
+    "double": model.datatypes.Double,
+    "dateTime": model.datatypes.DateTime,
+}
+
+TRANSFORMS = {
+    "strip": str.strip,
+    "join": lambda items: ",".join(items) if items else None,
+}
+
+# -------------------------------
+# Mapping table
+# -------------------------------
+CHARACTERISTICS = Group("characteristics", (
+    Field("uniqueIdent", "category.unique_ident"),
+    Field("longName", "category.long_name"),
+    Field("shortName", "category.short_name"),
+    Field("versionNumber", "category.version"),
+    Field("revisionNumber", "category.revision"),
+    Group("descriptiveElement", (
+        Field("valueDeterminationProcess", "value_determination_process"),
+        Field("representivity", "representivity"),
+        Group("setpointValue", (
+            Field("valueSetpoint", "setpoint.value", "double"),
+            Field("unitSetpoint", "setpoint.unit"),
+        )),
+        Group("validityLimits", (
+            Field("limitType", "limit_type"),
+            Field("from", "valid_from", "dateTime"),
+            Field("to", "valid_to", "dateTime"),
+        )),
+        Group("actualValues", (
+            Field("valueActualValue", "actual.value", "double"),
+            Field("unitActualValue", "actual.unit"),
+        )),
+    )),
+    Group("relationalElement", (
+        Field("view", "view", category="PARAMETER"),
+        Field("model", "model", category="PARAMETER"),
+        Field("regulationsForRelationalGeneration", "regulation", category="PARAMETER"),
+    )),
+))
+
+IDENTIFICATION = Group("identification", (
+    Field("uniqueIdent", "id"),
+    Field("longName", "identification.long_name"),
+    Field("shortName", "identification.short_name"),
+    Field("versionNumber", "identification.version"),
+    Field("revisionNumber", "identification.revision"),
+))
+
+# Every characteristic after the first becomes characteristics_2, characteristics_3, ...
+EXTRA_CHARACTERISTICS = Repeat("characteristics", 1, "characteristics_{}", CHARACTERISTICS)
+
+# States without characteristics leave the characteristics collection empty
+STATE = Group("state", (
+    Field("stateType", "type"),
+    IDENTIFICATION,
+    CHARACTERISTICS._replace(source="characteristics.0"),
+    Field("assignment", "assigned_to", transform="join"),
+))
+
+# Operators and resources without characteristics get empty strings and zeros
+OPERATOR_IDENTIFICATION = IDENTIFICATION._replace(children=tuple(
+    field._replace(transform="strip") if field.id_short == "shortName" else field
+    for field in IDENTIFICATION.children
+))
+
+def _element_group(id_short, identification):
+    return Group(id_short, (
+        identification,
+        CHARACTERISTICS._replace(source="characteristics.0", fallback=FPD_Model.EMPTY_CHARACTERISTIC),
+        Field("assignment", "assigned_to", transform="join"),
+    ))
+
+# In the order the types appear in the process collection
+MAPPINGS = {
+    "Product": Mapping(STATE, Field("idShort", "name"), (EXTRA_CHARACTERISTICS,)),
+    "Energy": Mapping(STATE, Field("idShort", "name"), (EXTRA_CHARACTERISTICS,)),
+    "Information": Mapping(STATE, Field("idShort", "name"), (EXTRA_CHARACTERISTICS,)),
+    "ProcessOperator": Mapping(_element_group("processOperator", OPERATOR_IDENTIFICATION),
+                               Field("idShort", "name", transform="strip"), (EXTRA_CHARACTERISTICS,)),
+    "TechnicalResource": Mapping(_element_group("technicalResource", IDENTIFICATION),
+                                 Field("idShort", "name"), (EXTRA_CHARACTERISTICS,)),
+}
+
+# -------------------------------
+# Compile the table
+# -------------------------------
+def build_prototype(group):
+    """
+    Builds the empty basyx collection described by a Group.
+    """
+    children = []
+    for child in group.children:
+        if isinstance(child, Group):
+            children.append(build_prototype(child))
+        else:
+            children.append(model.Property(
+                id_short=child.id_short,
+                value_type=VALUE_TYPES[child.value_type],
+                value=None,
+                category=child.category
+            ))
+    return model.SubmodelElementCollection(id_short=group.id_short, category=group.category, value=children)
+
+def _fields(group, prefix=""):
+    """
+    Yields (dotted id_short path, Field) for the Properties of a group in depth-first order.
+    """
+    for child in group.children:
+        name = prefix + child.id_short
+        if isinstance(child, Group):
+            yield from _fields(child, name + ".")
+        else:
+            yield name, child
+
+def _path(base, path, fallback=None):
+    """
+    Returns the Python expression reading a dotted path from the variable `base`.
+    """
+    expr = base
+    for segment in path.split("."):
+        if segment.isdigit():
+            expr = f"({expr}[{segment}] if len({expr}) > {segment} else {fallback})"
+        elif segment.isidentifier():
+            expr = f"{expr}.{segment}"
+        else:
+            raise ValueError(f"Invalid path segment {segment!r} in {path!r}")
+    return expr
+
+def compile_values(group, name="values", id_short=None):
+    """
+    Generates a function that returns the Property values of a Group for one
+    object, as a tuple in the depth-first order of the group's Properties.
+    With an id_short Field the function returns (id_short, values) instead.
+    Returns (function, source code).
+    """
+    env = dict(TRANSFORMS)
+    lines = []
+    exprs = []
+
+    def walk(group, var, nullable):
+        if group.source is not None:
+            fallback = f"_fallback{len(env)}"
+            env[fallback] = group.fallback
+            child = f"_g{len(lines)}"
+            lines.append(f"    {child} = {_path(var, group.source, fallback)}")
+            var, nullable = child, group.fallback is None
+        for child in group.children:
+            if isinstance(child, Group):
+                walk(child, var, nullable)
+                continue
+            expr = _path(var, child.source)
+            if child.transform is not None:
+                if child.transform not in TRANSFORMS:
+                    raise ValueError(f"Unknown transform {child.transform!r}")
+                expr = f"{child.transform}({expr})"
+            if nullable:
+                expr = f"(None if {var} is None else {expr})"
+            exprs.append(expr)
+
+    if id_short is not None:
+        walk(Group(None, (id_short,)), "el", False)
+        id_expr = exprs.pop()
+    walk(group, "el", False)
+    result = "(" + ", ".join(exprs) + ",)"
+    if id_short is not None:
+        result = f"({id_expr}, {result})"
+    source = f"def {name}(el):\n" + "\n".join(lines + ["    return " + result]) + "\n"
+    exec(compile(source, f"<FPD_Mapping {name}>", "exec"), env)
+    return env[name], source
+
+class CompiledGroup:
+    """
+    A Group compiled to a func.CollectionTemplate and a generated value function.
+    """
+
+    def __init__(self, group, name="values"):
+        self.group = group
+        self.template = func.CollectionTemplate(build_prototype(group), tuple(f for f, _ in _fields(group)))
+        self.values, self.source = compile_values(group, name)
+
+    def build(self, id_short, obj, trusted=False):
+        """Returns a new collection with the given id_short for one object."""
+        return self.template.stamp_values(id_short, self.values(obj), trusted)
+
+def _compiled_group(groups, group, name):
+    if group not in groups:
+        groups[group] = CompiledGroup(group, name)
+    return groups[group]
+
+class CompiledMapping:
+    """
+    The builder of one element type compiled from its Mapping. Groups that
+    are already in `groups` (a dict of CompiledGroup per Group) are reused,
+    so types sharing a Group also share its template.
+    """
+
+    def __init__(self, t, mapping, groups=None):
+        self.type = t
+        self.mapping = mapping
+        groups = {} if groups is None else groups
+        name = "".join(c if c.isalnum() else "_" for c in t)
+        self.root = _compiled_group(groups, mapping.root, f"{name}_root_values")
+        # Reads the id_short and the root's Property values in one call
+        self.values, self.source = compile_values(mapping.root, f"{name}_values", mapping.id_short)
+        self.repeats = [(repeat, _compiled_group(groups, repeat.group, f"{name}_{repeat.source}_values"))
+                        for repeat in mapping.repeats]
+
+    def repeated(self, el):
+        """Yields (compiled group, id_short, Property values) for each repeated child collection."""
+        for repeat, compiled in self.repeats:
+            items = getattr(el, repeat.source)
+            for i in range(repeat.skip, len(items)):
+                yield compiled, repeat.id_short.format(i + 1), compiled.values(items[i])
+
+    def build(self, el, trusted=False):
+        """
+        Returns the collection of one decoded element. With trusted the basyx
+        checks are skipped (see func.CollectionTemplate.stamp_values).
+        """
+        id_short, values = self.values(el)
+        smc = self.root.template.stamp_values(id_short, values, trusted)
+        func.add_all(smc, [compiled.template.stamp_values(child_id_short, child_values, trusted)
+                           for compiled, child_id_short, child_values in self.repeated(el)])
+        return smc
+
+def compile_mappings(mappings=None):
+    """
+    Compiles a mapping table (default: MAPPINGS) into a dict of CompiledMapping per $type suffix.
+    """
+    mappings = MAPPINGS if mappings is None else mappings
+    groups = {}
+    return {t: CompiledMapping(t, mapping, groups) for t, mapping in mappings.items()}
+
+BUILDERS = compile_mappings()
@@ -0,0 +1,358 @@
+# Merge several FPD Projects into one AAS
+# ---------------------------------------------
+# Converts N FPD JSON files into a single Asset Administration Shell with one
+# submodel per project (FPD_1, FPD_2, ... in input order), each with its
+# project information, process collection, flows and usages.
+# Technical resources and information states whose converted collections are
+# identical in two or more projects are stored once, in a shared submodel
+# (FPD_Shared). Two definitions count as identical when the mapping gives the
+# same idShort and the same Property values for them (see content_key), apart
+# from the ids of the project's own export: the uniqueIdent Properties (the
+# FPD id and the characteristic ids) and the isAssignedTo ids (assignment).
+# So the same resource modelled independently in two projects is shared as
+# well. The shared entry leaves these Properties empty. In the process
+# collection of a project a shared element is replaced by a ReferenceElement
+# of the same idShort, and the project's ids of it are kept in its sharedIds
+# collection under the same idShort, at the same paths as in the element's
+# collection; its flows and usages reference the entry in FPD_Shared.
+# Usage: python FPD_Merge.py -o OUTPUT.aasx [--json] [--validate] INPUT [INPUT ...]
+# Each INPUT is an FPD JSON file, a glob pattern or a directory of *.json files.
+# ---------------------------------------------
+
+import argparse
+import copy
+import hashlib
+import json
+import sys
+from basyx.aas import model
+import FPD2AAS_Functions as func
+import FPD2AAS
+import FPD2AAS_Metrics
+import FPD
+import FPD_Mapping
+
+SHARED_TYPES = ("TechnicalResource", "Information")
+SHARED_ID_SHORT = "FPD_Shared"
+SHARED_IDS_ID_SHORT = "sharedIds"
+
+# The Properties that hold ids of a project's own export (its FPD ids, the
+# isAssignedTo ids and the characteristic ids derived from them), by their
+# idShort wherever they appear in a mapped collection. They are left out of
+# content_key and kept per project.
+PROJECT_ID_SHORTS = ("uniqueIdent", "assignment")
+
+# -------------------------------
+# One project of the merged output
+# -------------------------------
+class Project:
+    """
+    The decoded elements of one FPD file; `shared` maps the ids of its
+    elements stored in the shared submodel to their idShort there.
+    """
+    __slots__ = ("id_short", "path", "project", "elements", "shared")
+
+    def __init__(self, id_short, path, project, elements):
+        self.id_short = id_short
+        self.path = path
+        self.project = project
+        self.elements = elements
+        self.shared = {}
+
+def load_projects(paths, validate=False, metrics=None):
+    """
+    Reads and decodes the FPD JSON files, numbered FPD_1, FPD_2, ... in order.
+    With validate each file is checked first (see FPD2AAS.build_aas).
+    """
+    metrics = metrics if metrics is not None else FPD2AAS_Metrics.Metrics()
+    projects = []
+    for n, path in enumerate(paths, 1):
+        with metrics.stage("load"):
+            with open(path, 'r', encoding='utf-8') as f:
+                fpd_data = json.load(f)
+        if validate:
+            FPD2AAS._validate(path, fpd_data[0], fpd_data[1]["elementDataInformation"], False, metrics)
+        for el in fpd_data[1]["elementDataInformation"]:
+            metrics.count_element(el)
+        with metrics.stage("extract_data"):
+            project, _, elements = FPD.extract_data(fpd_data)
+        projects.append(Project(f"FPD_{n}", path, project, elements))
+    return projects
+
+# -------------------------------
+# Find the identical definitions
+# -------------------------------
+def _project_positions(template):
+    """Returns the positions of the Properties named in PROJECT_ID_SHORTS among the values of a template."""
+    return tuple(i for i, field in enumerate(template.fields) if field.rpartition(".")[2] in PROJECT_ID_SHORTS)
+
+def _split_values(template, values):
+    """
+    Returns the values of a template with the project ids left empty and the
+    project ids as a list of (path, value).
+    """
+    values = list(values)
+    ids = []
+    for i in _project_positions(template):
+        ids.append((template.fields[i], values[i]))
+        values[i] = None
+    return tuple(values), ids
+
+def shared_values(el):
+    """
+    Splits the mapped Property values of a decoded element into the content
+    and the project ids. Returns (idShort, root values, list of (compiled
+    group, child idShort, values) of the repeated children, project ids); the
+    values have the project ids left empty, as the entry in FPD_Shared holds
+    them, and the project ids are a list of (dotted path, value).
+    """
+    builder = FPD_Mapping.BUILDERS[el.type]
+    id_short, values = builder.values(el)
+    values, ids = _split_values(builder.root.template, values)
+    repeated = []
+    for compiled, child_id_short, child_values in builder.repeated(el):
+        child_values, child_ids = _split_values(compiled.template, child_values)
+        repeated.append((compiled, child_id_short, child_values))
+        ids.extend((f"{child_id_short}.{path}", value) for path, value in child_ids)
+    return id_short, values, repeated, ids
+
+def content_key(el):
+    """
+    Returns (idShort, SHA-256 hex digest) of the collection the mapping builds
+    for a decoded element, computed from the mapped Property values without
+    building it. The project ids (see PROJECT_ID_SHORTS) are left out, so
+    that definitions of the same content exported with different ids get the
+    same key.
+    """
+    id_short, values, repeated, _ = shared_values(el)
+    repeated = tuple((child_id_short, child_values) for _, child_id_short, child_values in repeated)
+    digest = hashlib.sha256(repr((el.type, id_short, values, repeated)).encode('utf-8')).hexdigest()
+    return id_short, digest
+
+def find_shared(projects, types=SHARED_TYPES):
+    """
+    Returns the shared entries as a dict digest -> (idShort, element) in the
+    order of first appearance, and fills in Project.shared. An entry is shared
+    when two or more projects hold it. Of two shared definitions with the same
+    idShort only the first is shared; the other stays in its projects.
+    """
+    first = {}
+    users = {}
+    keys = []
+    for n, project in enumerate(projects):
+        project_keys = {}
+        for t in types:
+            for el in project.elements.of_type(t):
+                id_short, digest = content_key(el)
+                project_keys.setdefault(el.id, digest)
+                first.setdefault(digest, (id_short, el))
+                users.setdefault(digest, set()).add(n)
+        keys.append(project_keys)
+
+    shared = {}
+    taken = set()
+    for digest, (id_short, el) in first.items():
+        if len(users[digest]) < 2 or id_short in taken:
+            continue
+        taken.add(id_short)
+        shared[digest] = (id_short, el)
+    for project, project_keys in zip(projects, keys):
+        project.shared = {element_id: shared[digest][0] for element_id, digest in project_keys.items()
+                          if digest in shared}
+    return shared
+
+# -------------------------------
+# Build the submodels
+# -------------------------------
+def build_shared_collection(el, trusted=False):
+    """
+    Returns the FPD_Shared entry of a decoded element: its collection with the
+    project ids left empty. With trusted the basyx checks are skipped.
+    """
+    id_short, values, repeated, _ = shared_values(el)
+    smc = FPD_Mapping.BUILDERS[el.type].root.template.stamp_values(id_short, values, trusted)
+    func.add_all(smc, [compiled.template.stamp_values(child_id_short, child_values, trusted)
+                       for compiled, child_id_short, child_values in repeated])
+    return smc
+
+def _ids_collection(id_short, ids):
+    """
+    Returns a collection holding the (dotted path, value) pairs as Properties
+    in nested collections, in the layout of the element's own collection.
+    """
+    value = []
+    nested = {}
+    for path, ids_value in ids:
+        head, _, rest = path.partition(".")
+        if rest:
+            if head not in nested:
+                nested[head] = []
+                value.append(head)
+            nested[head].append((rest, ids_value))
+        else:
+            value.append(model.Property(
+                id_short=head,
+                value_type=model.datatypes.String,
+                value=ids_value,
+                category='CONSTANT'
+            ))
+    value = [_ids_collection(child, nested[child]) if isinstance(child, str) else child for child in value]
+    return model.SubmodelElementCollection(id_short=id_short, category='PARAMETER', value=value)
+
+def create_shared_ids_collection(elements):
+    """
+    Returns the sharedIds collection of a project from (idShort, decoded
+    element) pairs: per shared element a collection of its idShort holding the
+    project's ids of it (see PROJECT_ID_SHORTS) at the same paths as in the
+    element's own collection.
+    """
+    return model.SubmodelElementCollection(
+        id_short=SHARED_IDS_ID_SHORT,
+        category='PARAMETER',
+        value=[_ids_collection(id_short, shared_values(el)[3]) for id_short, el in elements]
+    )
+
+def resolve_shared(entry, ids):
+    """
+    Returns the AAS JSON of a shared entry (a collection in FPD_Shared) with
+    the ids of one project filled in from the AAS JSON of its collection in
+    the project's sharedIds, as the project's own conversion holds it.
+    """
+    entry = copy.deepcopy(entry)
+
+    def fill(node, ids_node):
+        children = {child["idShort"]: child for child in node.get("value", [])}
+        for ids_child in ids_node.get("value", []):
+            child = children[ids_child["idShort"]]
+            if ids_child["modelType"] == "SubmodelElementCollection":
+                fill(child, ids_child)
+            elif ids_child.get("value") is None:
+                child.pop("value", None)
+            else:
+                child["value"] = ids_child["value"]
+
+    fill(entry, ids)
+    return entry
+
+def shared_reference(id_short):
+    """
+    Returns the ReferenceElement standing in for a shared element in a project's process collection.
+    """
+    return model.ReferenceElement(
+        id_short=id_short,
+        value=func.process_element_reference(SHARED_ID_SHORT, id_short),
+        category='PARAMETER'
+    )
+
+def build_shared_submodel(shared, trusted=False):
+    """
+    Returns the shared submodel holding the process collection of the shared entries.
+    """
+    submodel = func.create_fpd_submodel(SHARED_ID_SHORT)
+    submodel.submodel_element.add(func.create_process_collection(
+        'process', [build_shared_collection(el, trusted) for _, el in shared.values()]))
+    return submodel
+
+def build_project_submodel(project, trusted=False):
+    """
+    Builds the submodel of one project. Returns it and the number of flows and
+    usages added. With trusted the basyx checks are skipped (see FPD.build_collection).
+    """
+    elements = project.elements
+    submodel = func.create_fpd_submodel(project.id_short)
+    submodel.submodel_element.add(FPD.add_project_info(project.project))
+    process = []
+    shared = []
+    for el in FPD.mapped_elements(elements):
+        id_short = project.shared.get(el.id)
+        if id_short is None:
+            process.append(FPD.build_collection(el, trusted))
+        else:
+            process.append(shared_reference(id_short))
+            shared.append((id_short, el))
+    submodel.submodel_element.add(func.create_process_collection('process', process))
+    if shared:
+        submodel.submodel_element.add(create_shared_ids_collection(shared))
+
+    counts = {}
+    for t, template, create in (("Flow", func.flow_template, func.create_flows_list),
+                                ("Usage", func.usage_template, func.create_usages_list)):
+        add = template.stamp if trusted else template.factory
+        relations = []
+        for relation in FPD.get_elements_by_type(elements, t):
+            src = elements.name_of(relation.source)
+            tgt = elements.name_of(relation.target)
+            if not (src and tgt):
+                continue
+            source_submodel = SHARED_ID_SHORT if relation.source in project.shared else project.id_short
+            target_submodel = SHARED_ID_SHORT if relation.target in project.shared else project.id_short
+            relations.append(add(source_submodel, src, tgt, target_submodel))
+        submodel.submodel_element.add(create(relations))
+        counts[t] = len(relations)
+    return submodel, counts
+
+def build_merged_aas(paths, types=SHARED_TYPES, metrics=None, validate=False, trusted=False):
+    """
+    Builds the Asset Administration Shell of several FPD JSON files. Returns
+    the AAS and its submodels, the shared submodel first (left out when
+    nothing is shared). validate and trusted work as in FPD2AAS.build_aas.
+    """
+    metrics = metrics if metrics is not None else FPD2AAS_Metrics.Metrics()
+    trusted = trusted or validate
+    projects = load_projects(paths, validate, metrics)
+    with metrics.stage("find_shared"):
+        shared = find_shared(projects, types)
+    metrics.count("shared_elements", len(shared))
+    metrics.count("shared_references", sum(len(project.shared) for project in projects))
+
+    submodels = []
+    with metrics.stage("build_projects"):
+        for project in projects:
+            submodel, counts = build_project_submodel(project, trusted)
+            for t, n in counts.items():
+                metrics.count_relations(t, n)
+            submodels.append(submodel)
+    if shared:
+        with metrics.stage("build_shared"):
+            submodels.insert(0, build_shared_submodel(shared, trusted))
+    metrics.count("submodels", len(submodels))
+
+    aas = func.create_fpd_aas('FPD_AAS')
+    for submodel in submodels:
+        aas.submodel.add(model.ModelReference.from_referable(submodel))
+    return aas, submodels
+
+def merge_files(paths, path_aasx, write_json=False, types=SHARED_TYPES, metrics=None, validate=False,
+                trusted=False):
+    """
+    Converts several FPD JSON files into one AASX package (see build_merged_aas).
+    """
+    metrics = metrics if metrics is not None else FPD2AAS_Metrics.Metrics()
+    aas, submodels = build_merged_aas(paths, types, metrics, validate, trusted)
+    FPD2AAS.write_aasx(aas, submodels, path_aasx, write_json, metrics)
+    return path_aasx
+
+# -------------------------------
+# Command line entry point
+# -------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert several FPD JSON files into one AASX package with a "
+                                                 "submodel per project and shared resource definitions.")
+    parser.add_argument('inputs', nargs='+', help="FPD JSON files, glob patterns or directories")
+    parser.add_argument('-o', '--output', required=True, help="AASX file to write")
+    parser.add_argument('--json', action='store_true', help="write the AAS part as JSON instead of XML")
+    parser.add_argument('--share', nargs='+', metavar='TYPE', default=list(SHARED_TYPES),
+                        choices=list(FPD_Mapping.BUILDERS),
+                        help="element types stored once when identical (default: %(default)s)")
+    parser.add_argument('--validate', action='store_true',
+                        help="check each input first and report all its problems at once")
+    args = parser.parse_args(argv)
+
+    paths = FPD2AAS.expand_inputs(args.inputs)
+    metrics = FPD2AAS_Metrics.Metrics()
+    merge_files(paths, args.output, args.json, tuple(args.share), metrics, args.validate)
+    print(f"{len(paths)} projects -> {args.output}: {metrics.counters.get('shared_elements', 0)} shared elements "
+          f"referenced {metrics.counters.get('shared_references', 0)} times")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# Intermediate representation of FPD elements
+# ---------------------------------------------
+# Compact __slots__ classes that the FPD JSON elements are decoded into once,
+# so the builders read plain attributes instead of walking nested dicts.
+# Repeated short strings (units, limit types, ...) are interned and
+# timestamps are parsed while decoding.
+# ---------------------------------------------
+
+import sys
+from datetime import datetime
+
+_intern = sys.intern
+
+# -------------------------------
+# Parse a datetime string or timestamp to a datetime object
+# -------------------------------
+def parse_datetime(value):
+    """
+    Parses a datetime string or timestamp to a datetime object.
+    Returns None if parsing fails.
+    """
+    try:
+        if isinstance(value, str):
+            return datetime.fromisoformat(value)
+        elif isinstance(value, int) or isinstance(value, float):
+            # Optionally interpret int/float as Unix timestamp
+            return datetime.fromtimestamp(value)
+    except Exception:
+        return None
+    return None
+
+# -------------------------------
+# Identification of an element or of a characteristic's category
+# -------------------------------
+class Identification:
+    __slots__ = ("unique_ident", "long_name", "short_name", "version", "revision")
+
+    def __init__(self, unique_ident="", long_name="", short_name="", version="", revision=""):
+        self.unique_ident = unique_ident
+        self.long_name = long_name
+        self.short_name = short_name
+        self.version = version
+        self.revision = revision
+
+    @classmethod
+    def decode(cls, data):
+        return cls(
+            data.get("uniqueIdent", ""),
+            data.get("longName", ""),
+            data.get("shortName", ""),
+            _intern(data.get("versionNumber", "")),
+            _intern(data.get("revisionNumber", "")),
+        )
+
+# -------------------------------
+# A numeric value with its unit
+# -------------------------------
+class ValueWithUnit:
+    __slots__ = ("value", "unit")
+
+    def __init__(self, value=0.0, unit=""):
+        self.value = value
+        self.unit = unit
+
+    @classmethod
+    def decode(cls, data):
+        return cls(float(data.get("value", 0)), _intern(data.get("unit", "")))
+
+# -------------------------------
+# A characteristic of an element
+# -------------------------------
+class Characteristic:
+    """
+    One entry of an element's characteristics. Only the first validity
+    limit is kept, as it is the only one mapped to the AAS.
+    """
+    __slots__ = ("category", "view", "model", "regulation", "value_determination_process",
+                 "representivity", "actual", "setpoint", "limit_type", "valid_from", "valid_to")
+
+    def __init__(self, category, view, model, regulation, value_determination_process,
+                 representivity, actual, setpoint, limit_type, valid_from, valid_to):
+        self.category = category
+        self.view = view
+        self.model = model
+        self.regulation = regulation
+        self.value_determination_process = value_determination_process
+        self.representivity = representivity
+        self.actual = actual
+        self.setpoint = setpoint
+        self.limit_type = limit_type
+        self.valid_from = valid_from
+        self.valid_to = valid_to
+
+    @classmethod
+    def decode(cls, data):
+        desc = data.get("descriptiveElement", {})
+        rel = data.get("relationalElement", {})
+        validity = (desc.get("validityLimits") or [{}])[0]
+        return cls(
+            Identification.decode(data.get("category", {})),
+            _intern(rel.get("view", "")),
+            _intern(rel.get("model", "")),
+            _intern(rel.get("regulationsForRelationalGeneration", "")),
+            _intern(desc.get("valueDeterminationProcess", "")),
+            _intern(desc.get("representivity", "")),
+            ValueWithUnit.decode(desc.get("actualValues", {})),
+            ValueWithUnit.decode(desc.get("setpointValue", {})),
+            _intern(validity.get("limitType", "")),
+            parse_datetime(validity.get("from")),
+            parse_datetime(validity.get("to")),
+        )
+
+# Stands in for the first characteristic of elements that have none
+EMPTY_CHARACTERISTIC = Characteristic.decode({})
+
+# -------------------------------
+# States, process operators, technical resources and other elements
+# -------------------------------
+class Element:
+    """
+    An FPD element other than a relation. `type` is the $type suffix
+    (e.g. "Product"); elements without identification (e.g. the SystemLimit)
+    get an empty one. `contains` holds the elementsContainer ids (e.g. of a SystemLimit).
+    """
+    __slots__ = ("type", "id", "name", "identification", "assigned_to", "characteristics", "contains")
+
+    def __init__(self, type, id, name, identification, assigned_to=(), characteristics=(), contains=()):
+        self.type = type
+        self.id = id
+        self.name = name
+        self.identification = identification
+        self.assigned_to = assigned_to
+        self.characteristics = characteristics
+        self.contains = contains
+
+    @classmethod
+    def decode(cls, data, t):
+        identification = data.get("identification")
+        return cls(
+            t,
+            data.get("id"),
+            data.get("name"),
+            Identification.decode(identification) if identification else EMPTY_IDENTIFICATION,
+            tuple(data.get("isAssignedTo", ())),
+            tuple(Characteristic.decode(ch) for ch in data.get("characteristics", ())),
+            tuple(data.get("elementsContainer", ())),
+        )
+
+EMPTY_IDENTIFICATION = Identification()
+
+# -------------------------------
+# Flows and usages
+# -------------------------------
+class Relation:
+    __slots__ = ("type", "id", "source", "target")
+
+    def __init__(self, type, id, source, target):
+        self.type = type
+        self.id = id
+        self.source = source
+        self.target = target
+
+    @property
+    def name(self):
+        # Relations have no name; lets an index resolve any element id uniformly
+        return None
+
+RELATION_TYPES = ("Flow", "Usage")
+
+# -------------------------------
+# Decode a JSON element
+# -------------------------------
+def decode(el):
+    """
+    Decodes one elementDataInformation entry into an Element or a Relation.
+    Objects that are already decoded are returned unchanged.
+    """
+    if not isinstance(el, dict):
+        return el
+    t = _intern(el["$type"].rpartition(":")[2])
+    if t in RELATION_TYPES:
+        return Relation(t, el.get("id"), el["sourceRef"], el["targetRef"])
+    return Element.decode(el, t)
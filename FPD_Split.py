@@ -0,0 +1,247 @@
+# Split the FPD Output into several Submodels
+# ---------------------------------------------
+# Distributes the process collection of a large FPD over several submodels
+# (FPD_1, FPD_2, ...) so that AAS consumers can load only the part they need:
+#   systemlimit  one submodel per SystemLimit with the elements it contains
+#   operator     one submodel per ProcessOperator with the states and
+#                technical resources assigned to it (isAssignedTo)
+#   size         consecutive elements, at most `size` per submodel
+# Elements that fall into no part go to one more submodel at the end.
+# Each flow and usage is stored in the submodel of its source element and
+# references its target in whichever submodel holds it. A small index
+# submodel (FPD_Index) keeps the project information and lists per part a
+# reference to its submodel, its label, its number of elements and their ids
+# (one Property per part), so that the submodel of an element id is found
+# without loading any part; in size mode also the position of its first
+# element, as each part is a range.
+# ---------------------------------------------
+
+from collections import namedtuple
+from basyx.aas import model
+import FPD2AAS_Functions as func
+import FPD
+
+MODES = ("systemlimit", "operator", "size")
+DEFAULT_PART_SIZE = 5000
+INDEX_ID_SHORT = "FPD_Index"
+
+# One part as listed in the index submodel; `first` is None unless the split mode is size
+IndexEntry = namedtuple("IndexEntry", "submodel label first count elements")
+
+# -------------------------------
+# One submodel of the split output
+# -------------------------------
+class Part:
+    """
+    The elements of one part; `label` names the group it was formed from
+    (SystemLimit id, operator name, or None).
+    """
+    __slots__ = ("id_short", "label", "elements")
+
+    def __init__(self, label=None):
+        self.id_short = None
+        self.label = label
+        self.elements = []
+
+# -------------------------------
+# Assign the elements to parts
+# -------------------------------
+def _groups(elements, mode):
+    """
+    Returns (list of Part, dict element id -> Part) for the systemlimit and
+    operator modes. Elements matching several groups go to the first one.
+    """
+    groups = []
+    by_id = {}
+    if mode == "systemlimit":
+        for system_limit in FPD.get_elements_by_type(elements, "SystemLimit"):
+            part = Part(system_limit.id)
+            groups.append(part)
+            for element_id in system_limit.contains:
+                by_id.setdefault(element_id, part)
+    else:
+        operators = {}
+        for op in FPD.get_elements_by_type(elements, "ProcessOperator"):
+            part = Part(op.name)
+            groups.append(part)
+            operators.setdefault(op.id, part)
+        by_id.update(operators)
+        for el in FPD.mapped_elements(elements):
+            if el.id in operators:
+                continue
+            for element_id in el.assigned_to:
+                if element_id in operators:
+                    by_id.setdefault(el.id, operators[element_id])
+                    break
+    return groups, by_id
+
+def split_elements(elements, mode="size", size=DEFAULT_PART_SIZE):
+    """
+    Splits the elements of the process collection into parts.
+    Returns (list of non-empty Part, dict element id -> Part); the parts are
+    numbered FPD_1, FPD_2, ... in order and keep the process order inside.
+    Without any element in the process collection a single empty part is
+    returned, which then holds the flows and usages.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown split mode {mode!r}, expected one of {', '.join(MODES)}")
+    if size < 1:
+        raise ValueError(f"Part size must be at least 1, got {size}")
+    elements = FPD._as_index(elements)
+    owner = {}
+    if mode == "size":
+        parts = []
+        for el in FPD.mapped_elements(elements):
+            if not parts or len(parts[-1].elements) >= size:
+                parts.append(Part())
+            parts[-1].elements.append(el)
+            owner.setdefault(el.id, parts[-1])
+    else:
+        parts, by_id = _groups(elements, mode)
+        rest = Part()
+        for el in FPD.mapped_elements(elements):
+            part = by_id.get(el.id, rest)
+            part.elements.append(el)
+            owner.setdefault(el.id, part)
+        parts = [part for part in parts + [rest] if part.elements]
+    parts = parts or [Part()]
+    for n, part in enumerate(parts, 1):
+        part.id_short = f"FPD_{n}"
+    return parts, owner
+
+# -------------------------------
+# Build the part submodels and the index submodel
+# -------------------------------
+def build_parts(parts, owner, elements, trusted=False):
+    """
+    Builds one FPD submodel per part with its process collection, flows and
+    usages. Returns the submodels and the number of flows and usages added.
+    With trusted the basyx checks are skipped (see FPD.build_collection).
+    Needs at least one part, as split_elements returns.
+    """
+    if not parts:
+        raise ValueError("No parts to build; split_elements returns at least one")
+    elements = FPD._as_index(elements)
+    submodels = {}
+    for part in parts:
+        submodel = func.create_fpd_submodel(part.id_short)
+        submodel.submodel_element.add(func.create_process_collection(
+            'process', [FPD.build_collection(el, trusted) for el in part.elements]))
+        submodels[part.id_short] = submodel
+
+    # The flows and usages of each part are collected first and inserted in bulk
+    counts = {}
+    relations = {part.id_short: ([], []) for part in parts}
+    for i, t, template in ((0, "Flow", func.flow_template), (1, "Usage", func.usage_template)):
+        add = template.stamp if trusted else template.factory
+        counts[t] = 0
+        for relation in FPD.get_elements_by_type(elements, t):
+            src = elements.name_of(relation.source)
+            tgt = elements.name_of(relation.target)
+            if not (src and tgt):
+                continue
+            # Relations between elements outside the process collection stay with the first part
+            source_part = owner.get(relation.source) or owner.get(relation.target) or parts[0]
+            target_part = owner.get(relation.target, source_part)
+            relations[source_part.id_short][i].append(add(source_part.id_short, src, tgt, target_part.id_short))
+            counts[t] += 1
+    for part in parts:
+        flows, usages = relations.pop(part.id_short)
+        submodels[part.id_short].submodel_element.add(func.create_flows_list(flows))
+        submodels[part.id_short].submodel_element.add(func.create_usages_list(usages))
+    return [submodels[part.id_short] for part in parts], counts
+
+def create_index_submodel(project, mode, parts, submodels):
+    """
+    Returns the index submodel: the project information, the split mode and
+    per part a reference to its submodel, its label, its number of elements
+    and their ids (separated by spaces, in process order). In size mode,
+    where every part is a range of the process order, also the position of
+    its first element.
+    """
+    submodel = func.create_fpd_submodel(INDEX_ID_SHORT)
+    submodel.submodel_element.add(FPD.add_project_info(project))
+    submodel.submodel_element.add(model.Property(
+        id_short='split',
+        value_type=model.datatypes.String,
+        value=mode,
+        category='CONSTANT'
+    ))
+    sml_parts = model.SubmodelElementList(
+        id_short='parts',
+        type_value_list_element=model.SubmodelElementCollection
+    )
+    first = 0
+    for part, part_submodel in zip(parts, submodels):
+        value = [
+            model.ReferenceElement(
+                id_short='submodel',
+                value=model.ModelReference.from_referable(part_submodel),
+                category='PARAMETER'
+            ),
+            model.Property(
+                id_short='label',
+                value_type=model.datatypes.String,
+                value=part.label,
+                category='CONSTANT'
+            ),
+            model.Property(
+                id_short='count',
+                value_type=model.datatypes.Int,
+                value=len(part.elements),
+                category='CONSTANT'
+            ),
+            model.Property(
+                id_short='elements',
+                value_type=model.datatypes.String,
+                value=" ".join(el.id for el in part.elements),
+                category='CONSTANT'
+            ),
+        ]
+        if mode == "size":
+            value.append(model.Property(
+                id_short='first',
+                value_type=model.datatypes.Int,
+                value=first,
+                category='CONSTANT'
+            ))
+        first += len(part.elements)
+        sml_parts.add_referable(model.SubmodelElementCollection(
+            id_short=None,
+            category='PARAMETER',
+            value=value
+        ))
+    submodel.submodel_element.add(sml_parts)
+    return submodel
+
+def read_index(submodel):
+    """
+    Returns the parts listed in an index submodel as IndexEntry tuples
+    (submodel id, label, first, count, element ids), so that a consumer can
+    load only the submodel it needs: the one holding an element id (see
+    find_submodel), the one whose range holds a process position (size
+    mode), or the one of a SystemLimit id (systemlimit) or operator name
+    (operator mode) given as label.
+    """
+    entries = []
+    for smc in submodel.get_referable('parts'):
+        first = smc.get_referable('first').value if smc.value.contains_id('id_short', 'first') else None
+        ids = smc.get_referable('elements').value if smc.value.contains_id('id_short', 'elements') else None
+        entries.append(IndexEntry(
+            smc.get_referable('submodel').value.key[0].value,
+            smc.get_referable('label').value,
+            first,
+            smc.get_referable('count').value,
+            tuple(ids.split()) if ids else (),
+        ))
+    return entries
+
+def find_submodel(entries, element_id):
+    """
+    Returns the id of the submodel that holds the element with the given id
+    in its process collection, from the entries read_index returns, or None.
+    """
+    for entry in entries:
+        if element_id in entry.elements:
+            return entry.submodel
+    return None
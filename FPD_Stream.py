@@ -0,0 +1,222 @@
+# Streaming reader for FPD JSON exports
+# ---------------------------------------------
+# Reads the FPD document incrementally so that the elementDataInformation
+# array is never held in memory as a whole.
+# Opened with encoding="latin-1", every byte of the file is one character, so
+# the positions reported by FPDStream.spans are byte offsets (used by FPD_Index).
+# ---------------------------------------------
+
+import json
+
+# -------------------------------
+# Default number of characters read from the file per chunk
+# -------------------------------
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = " \t\n\r"
+
+# -------------------------------
+# Incremental JSON value decoder over a text file
+# -------------------------------
+class _JsonChunkReader:
+    """
+    Decodes JSON values one at a time from a file that is read in chunks.
+    Only the current chunk and the value being decoded are kept in memory.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.offset = 0      # position of buf[0] in the file
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, min_size=0):
+        """
+        Drops the consumed part of the buffer and reads the next chunk.
+        Returns False once the end of the file is reached.
+        """
+        if self.eof:
+            return False
+        chunk = self.f.read(max(self.chunk_size, min_size))
+        self.offset += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+        return bool(chunk)
+
+    def peek(self):
+        """
+        Returns the next non-whitespace character without consuming it,
+        or an empty string at the end of the file.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def tell(self):
+        """
+        Returns the position of the next character in the file (in characters).
+        """
+        return self.offset + self.pos
+
+    def expect(self, ch):
+        """
+        Consumes the next non-whitespace character, which must be ch.
+        """
+        found = self.peek()
+        if found != ch:
+            raise ValueError(f"Expected {ch!r} in FPD JSON, found {found!r}")
+        self.pos += 1
+
+    def decode(self):
+        """
+        Decodes and returns the next complete JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # The value is cut off at the end of the buffer; read on
+                if not self._fill(len(self.buf)):
+                    raise
+                continue
+            # A number ending exactly at the buffer end may continue in the next chunk
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def iter_array(self):
+        """
+        Yields the items of the next JSON array one at a time.
+        """
+        for _, _, value in self.iter_spans():
+            yield value
+
+    def iter_spans(self):
+        """
+        Yields (start, end, item) for the items of the next JSON array, with
+        the positions of each item in the file (end exclusive).
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            self.peek()
+            start = self.tell()
+            value = self.decode()
+            yield start, self.tell(), value
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+    def iter_keys(self):
+        """
+        Yields the keys of the next JSON object. The caller must consume the
+        value of each key (decode, skip or iterate it) before resuming.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.decode()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def skip(self):
+        """
+        Skips the next JSON value. Arrays are skipped item by item so that
+        large sections are never decoded as a whole.
+        """
+        if self.peek() == "[":
+            for _ in self.iter_array():
+                pass
+        else:
+            self.decode()
+
+# -------------------------------
+# Streaming view of an FPD JSON file
+# -------------------------------
+class FPDStream:
+    """
+    Streams an FPD JSON file of the form [project, {"process": ...,
+    "elementDataInformation": [...], ...}].
+    Iterating the stream yields the elementDataInformation entries one at a
+    time. The project is available as soon as the stream is opened; the
+    process is available once it has been read, which is before the first
+    element for files exported in the usual key order.
+    project_span and process_span are the (start, end) positions of both in
+    the file.
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE, encoding="utf-8"):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.project = None
+        self.process = None
+        self.process_span = None
+        self._file = open(path, "r", encoding=encoding)
+        self._reader = _JsonChunkReader(self._file, chunk_size)
+        self._reader.expect("[")
+        self.project, self.project_span = self._decode_span()
+        self._reader.expect(",")
+        self._consumed = False
+
+    def _decode_span(self):
+        self._reader.peek()
+        start = self._reader.tell()
+        value = self._reader.decode()
+        return value, (start, self._reader.tell())
+
+    def __iter__(self):
+        for _, _, el in self.spans():
+            yield el
+
+    def spans(self):
+        """
+        Yields (start, end, element) for the elementDataInformation entries,
+        with the positions of each entry in the file (end exclusive).
+        """
+        if self._consumed:
+            raise RuntimeError("FPDStream can only be iterated once")
+        self._consumed = True
+        try:
+            for key in self._reader.iter_keys():
+                if key == "elementDataInformation":
+                    yield from self._reader.iter_spans()
+                elif key == "process":
+                    self.process, self.process_span = self._decode_span()
+                else:
+                    self._reader.skip()
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Closes the underlying file.
+        """
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
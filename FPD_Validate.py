@@ -0,0 +1,353 @@
+# FPD Input Validation
+# ---------------------------------------------
+# Checks an FPD JSON document in a single pass over its elements and reports
+# every problem at once, instead of failing on the first one somewhere in
+# the conversion:
+#   structure   $type and id present, the nested objects of the expected kind
+#   references  sourceRef/targetRef of flows and usages, isAssignedTo and
+#               elementsContainer name elements of the document
+#   id_shorts   the names of the process elements are valid, unique idShorts
+#   values      strings, numbers (setpoint and actual values) and dates
+# Relations are only recorded while reading and resolved at the end, so the
+# check stays linear in the size of the document.
+# A document without problems converts without errors and without dropped
+# flows or usages, so the builders can skip their own per-element checks
+# (FPD2AAS.py --validate or --trusted).
+# Usage: python FPD_Validate.py [--stream] INPUT [INPUT ...]
+# ---------------------------------------------
+
+import argparse
+import json
+import re
+import sys
+from collections import namedtuple
+import FPD_Mapping
+import FPD_Model
+import FPD_Stream
+
+# Constraint AASd-002 and the length limit of basyx's NameType
+ID_SHORT_PATTERN = re.compile(r"[A-Za-z](?:[A-Za-z0-9_-]*[A-Za-z0-9_])?")
+ID_SHORT_MAX_LENGTH = 128
+
+# Problems listed in the message of a ValidationError; the report keeps all of them
+MAX_REPORTED = 50
+
+# Fields of an identification that are decoded without conversion and may be null
+_NULLABLE = ("uniqueIdent", "longName", "shortName")
+_IDENTIFICATION_FIELDS = _NULLABLE + ("versionNumber", "revisionNumber")
+
+# -------------------------------
+# Problems and the report
+# -------------------------------
+# `element` is the id of the element, or #N (its position) if it has no usable id
+Problem = namedtuple("Problem", "element field message")
+
+def format_problem(problem):
+    return f"{problem.element}: {problem.field}: {problem.message}"
+
+def _count(n):
+    return f"{n} problem" if n == 1 else f"{n} problems"
+
+class ValidationReport:
+    """
+    The problems found in one document, in the order they were found.
+    """
+
+    def __init__(self, problems, elements=0):
+        self.problems = problems
+        self.elements = elements
+
+    @property
+    def ok(self):
+        return not self.problems
+
+    def __len__(self):
+        return len(self.problems)
+
+    def __iter__(self):
+        return iter(self.problems)
+
+    def format(self, limit=None):
+        """
+        Returns the problems as text, one per line; with a limit, at most that many.
+        """
+        lines = [format_problem(problem) for problem in self.problems[:limit]]
+        if limit is not None and len(self.problems) > limit:
+            lines.append(f"... and {len(self.problems) - limit} more")
+        return "\n".join(lines)
+
+    def raise_for_problems(self):
+        """
+        Raises a ValidationError if any problem was found.
+        """
+        if self.problems:
+            raise ValidationError(self)
+
+class ValidationError(ValueError):
+    """
+    Raised for an invalid document; `report` holds all problems.
+    """
+
+    def __init__(self, report):
+        self.report = report
+        super().__init__(f"{_count(len(report))} in the FPD input:\n{report.format(MAX_REPORTED)}")
+
+# -------------------------------
+# Single-pass validator
+# -------------------------------
+def _id_short(t, name):
+    """
+    Returns the id_short the mapping of type t derives from a name.
+    """
+    transform = FPD_Mapping.MAPPINGS[t].id_short.transform
+    return FPD_Mapping.TRANSFORMS[transform](name) if transform else name
+
+def _is_number(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    if isinstance(value, str):
+        try:
+            float(value)
+        except ValueError:
+            return False
+        return True
+    return False
+
+class Validator:
+    """
+    Collects the problems of FPD JSON elements, one element at a time, and
+    resolves the references at the end (see finish). References may also name
+    the ids in `known`, elements of the document that are not checked (e.g.
+    those left out of a partial conversion, see FPD_Index).
+    """
+
+    def __init__(self, project=None, known=()):
+        self.problems = []
+        self.count = 0
+        self.known = known
+        self.names = {}          # element id -> name of the first element with that id
+        self.id_shorts = {}      # id_short of a process element -> its element id
+        self.references = []     # (element, field, referenced id, needs a name)
+        if project is not None:
+            self.check_project(project)
+
+    def problem(self, element, field, message):
+        self.problems.append(Problem(element, field, message))
+
+    def check_project(self, project):
+        """
+        Checks the project information (the first item of the document).
+        """
+        if not isinstance(project, dict):
+            self.problem("project", "project", "must be an object")
+            return
+        for field in ("name", "targetNamespace", "entryPoint"):
+            if not isinstance(project.get(field), str):
+                self.problem("project", field, "missing or not a string")
+
+    def add(self, el):
+        """
+        Checks one FPD JSON element (an element or a relation).
+        """
+        label = f"#{self.count}"
+        self.count += 1
+        if not isinstance(el, dict):
+            self.problem(label, "element", "must be an object")
+            return
+        element_id = el.get("id")
+        if isinstance(element_id, str):
+            label = element_id
+            if element_id in self.names:
+                self.problem(label, "id", "duplicate element id")
+            else:
+                self.names[element_id] = el.get("name")
+        else:
+            self.problem(label, "id", "missing or not a string")
+        t = el.get("$type")
+        if not isinstance(t, str):
+            self.problem(label, "$type", "missing or not a string")
+            return
+        t = t.rpartition(":")[2]
+        if t in FPD_Model.RELATION_TYPES:
+            for field in ("sourceRef", "targetRef"):
+                ref = el.get(field)
+                if isinstance(ref, str):
+                    self.references.append((label, field, ref, True))
+                else:
+                    self.problem(label, field, "missing or not a string")
+            return
+        self._check_ids(label, "elementsContainer", el.get("elementsContainer", ()))
+        if t in FPD_Mapping.MAPPINGS:
+            self._check_process_element(label, t, el)
+
+    def collect(self, elements):
+        """
+        Yields the given elements while checking them.
+        """
+        for el in elements:
+            self.add(el)
+            yield el
+
+    def finish(self):
+        """
+        Resolves the recorded references and returns the ValidationReport.
+        """
+        names = self.names
+        for label, field, ref, needs_name in self.references:
+            if ref not in names and ref in self.known and not needs_name:
+                continue
+            if ref not in names:
+                self.problem(label, field, f"unknown element {ref}")
+            elif needs_name and not (names[ref] and isinstance(names[ref], str)):
+                self.problem(label, field, f"element {ref} has no name")
+        self.references = []
+        return ValidationReport(self.problems, self.count)
+
+    # -------------------------------
+    # Checks of the parts of an element
+    # -------------------------------
+    def _check_ids(self, label, field, ids):
+        if not isinstance(ids, (list, tuple)):
+            self.problem(label, field, "must be a list")
+            return
+        for ref in ids:
+            if isinstance(ref, str):
+                self.references.append((label, field, ref, False))
+            else:
+                self.problem(label, field, f"{ref!r} is not an element id")
+
+    def _check_process_element(self, label, t, el):
+        name = el.get("name")
+        if not isinstance(name, str):
+            self.problem(label, "name", "missing or not a string")
+        else:
+            id_short = _id_short(t, name)
+            if len(id_short) > ID_SHORT_MAX_LENGTH or not ID_SHORT_PATTERN.fullmatch(id_short):
+                self.problem(label, "name", f"{id_short!r} is not a valid idShort (a letter followed by letters, "
+                                            f"digits, '_' or '-', not ending with '-', at most "
+                                            f"{ID_SHORT_MAX_LENGTH} characters)")
+            elif id_short in self.id_shorts:
+                self.problem(label, "name", f"idShort {id_short!r} is already used by element "
+                                            f"{self.id_shorts[id_short]}")
+            else:
+                self.id_shorts[id_short] = label
+        identification = el.get("identification")
+        if identification:
+            self._check_identification(label, "identification", identification,
+                                       strip_short_name=t == "ProcessOperator")
+        self._check_ids(label, "isAssignedTo", el.get("isAssignedTo", ()))
+        characteristics = el.get("characteristics", ())
+        if not isinstance(characteristics, (list, tuple)):
+            self.problem(label, "characteristics", "must be a list")
+            return
+        for i, ch in enumerate(characteristics):
+            self._check_characteristic(label, f"characteristics[{i}]", ch)
+
+    def _check_object(self, label, field, data):
+        if isinstance(data, dict):
+            return True
+        self.problem(label, field, "must be an object")
+        return False
+
+    def _check_strings(self, label, field, data, fields, nullable=()):
+        for name in fields:
+            value = data.get(name, "")
+            if not isinstance(value, str) and not (value is None and name in nullable):
+                self.problem(label, f"{field}.{name}", f"{value!r} is not a string")
+
+    def _check_identification(self, label, field, data, strip_short_name=False):
+        if self._check_object(label, field, data):
+            nullable = tuple(name for name in _NULLABLE if not (strip_short_name and name == "shortName"))
+            self._check_strings(label, field, data, _IDENTIFICATION_FIELDS, nullable)
+
+    def _check_value(self, label, field, data):
+        if self._check_object(label, field, data):
+            if not _is_number(data.get("value", 0)):
+                self.problem(label, f"{field}.value", f"{data['value']!r} is not a number")
+            self._check_strings(label, field, data, ("unit",))
+
+    def _check_characteristic(self, label, field, ch):
+        if not self._check_object(label, field, ch):
+            return
+        self._check_identification(label, f"{field}.category", ch.get("category", {}))
+        rel = ch.get("relationalElement", {})
+        if self._check_object(label, f"{field}.relationalElement", rel):
+            self._check_strings(label, f"{field}.relationalElement", rel,
+                                ("view", "model", "regulationsForRelationalGeneration"))
+        field = f"{field}.descriptiveElement"
+        desc = ch.get("descriptiveElement", {})
+        if not self._check_object(label, field, desc):
+            return
+        self._check_strings(label, field, desc, ("valueDeterminationProcess", "representivity"))
+        self._check_value(label, f"{field}.setpointValue", desc.get("setpointValue", {}))
+        self._check_value(label, f"{field}.actualValues", desc.get("actualValues", {}))
+        limits = desc.get("validityLimits")
+        if not limits:
+            return
+        if not isinstance(limits, list):
+            self.problem(label, f"{field}.validityLimits", "must be a list")
+            return
+        for i, limit in enumerate(limits):
+            limit_field = f"{field}.validityLimits[{i}]"
+            if not self._check_object(label, limit_field, limit):
+                continue
+            self._check_strings(label, limit_field, limit, ("limitType",))
+            for name in ("from", "to"):
+                value = limit.get(name)
+                if value is not None and FPD_Model.parse_datetime(value) is None:
+                    self.problem(label, f"{limit_field}.{name}", f"{value!r} is not a date")
+
+# -------------------------------
+# Validate a document or a file
+# -------------------------------
+def validate(project, elements, known=()):
+    """
+    Returns the ValidationReport of the project information and the FPD JSON
+    elements; references may also name the ids in known (see Validator).
+    """
+    validator = Validator(project, known)
+    for el in elements:
+        validator.add(el)
+    return validator.finish()
+
+def validate_document(fpd_data):
+    """
+    Returns the ValidationReport of a loaded FPD JSON document.
+    """
+    if (not isinstance(fpd_data, list) or len(fpd_data) < 2 or not isinstance(fpd_data[1], dict)
+            or not isinstance(fpd_data[1].get("elementDataInformation"), list)):
+        return ValidationReport([Problem("document", "elementDataInformation",
+                                         "expected [project, {process, elementDataInformation: [...]}]")])
+    return validate(fpd_data[0], fpd_data[1]["elementDataInformation"])
+
+def validate_file(path_json, stream_input=False):
+    """
+    Returns the ValidationReport of an FPD JSON file. With stream_input the
+    elements are read one at a time (see FPD_Stream).
+    """
+    if stream_input:
+        stream = FPD_Stream.FPDStream(path_json)
+        return validate(stream.project, stream)
+    with open(path_json, 'r', encoding='utf-8') as f:
+        return validate_document(json.load(f))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check FPD JSON files and report all problems.")
+    parser.add_argument("inputs", nargs="+", help="FPD JSON files")
+    parser.add_argument("--stream", action="store_true", help="read the files element by element")
+    args = parser.parse_args(argv)
+    failed = 0
+    for path in args.inputs:
+        report = validate_file(path, args.stream)
+        if report.ok:
+            print(f"OK   {path} ({report.elements} elements)")
+        else:
+            failed += 1
+            print(f"FAIL {path}: {_count(len(report))}")
+            print(report.format())
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+# The modules of this repository live at its top level
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import FPD2AAS_Functions as func
+
+@pytest.fixture(params=[True, False], ids=["internals", "public-api"])
+def internals(request, monkeypatch):
+    """Runs a test on the fast paths over the basyx internals and on their public API fallbacks."""
+    monkeypatch.setattr(func, "BASYX_INTERNALS", request.param and func.BASYX_INTERNALS)
+    return request.param
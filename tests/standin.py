@@ -0,0 +1,83 @@
+# Stand-in AAS repository on localhost, for tests/test_publish.py and FPD_Benchmark.py --publish
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class Repository(ThreadingHTTPServer):
+    """
+    Keeps the shells and submodels PUT or POSTed to /shells and /submodels,
+    answering PUT on an unknown id with 404 and POST on a known one with 409.
+    The next requests are answered with the (status, headers) in `script`
+    instead. Every request is logged as (method, kind) and every connection counted.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.stored = {"shells": {}, "submodels": {}}
+        self.script = []
+        self.log = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/v3.0"
+
+    def start(self):
+        """
+        Serves on a daemon thread; returns the repository.
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _answer(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _store(self, method):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        path = self.path.split("/")[3:]           # /api/v3.0/<kind>[/<id>]
+        server = self.server
+        with server.lock:
+            kind = path[0]
+            server.log.append((method, kind))
+            if server.script:
+                return self._answer(*server.script.pop(0))
+            if kind not in server.stored:
+                return self._answer(404)
+            if method == "PUT":
+                padded = path[1] + "=" * (-len(path[1]) % 4)
+                if base64.urlsafe_b64decode(padded).decode("utf-8") != body["id"]:
+                    return self._answer(400)
+                if body["id"] not in server.stored[kind]:
+                    return self._answer(404)
+            elif body["id"] in server.stored[kind]:
+                return self._answer(409)
+            server.stored[kind][body["id"]] = body
+        self._answer(204 if method == "PUT" else 201)
+
+    def do_PUT(self):
+        self._store("PUT")
+
+    def do_POST(self):
+        self._store("POST")
@@ -0,0 +1,62 @@
+# Bulk insertion (func.add_all) against add_referable
+import pytest
+from basyx.aas import model
+import FPD2AAS_Functions as func
+from test_templates import to_json
+
+def properties(*names):
+    return [model.Property(id_short=name, value_type=model.datatypes.String, value=name) for name in names]
+
+def flows(n):
+    return [func.add_flow("FPD", f"a{i}", f"b{i}") for i in range(n)]
+
+def test_collection_equals_add_referable(internals):
+    bulk = model.SubmodelElementCollection(id_short="c")
+    func.add_all(bulk, properties("x", "y", "z"))
+    single = model.SubmodelElementCollection(id_short="c")
+    for element in properties("x", "y", "z"):
+        single.add_referable(element)
+    assert to_json(bulk) == to_json(single)
+    assert [element.parent for element in bulk.value] == [bulk] * 3
+    assert bulk.get_referable("y").value == "y"
+
+def test_list_equals_add_referable(internals):
+    bulk = func.create_flows_list([])
+    func.add_all(bulk, flows(3))
+    func.add_all(bulk, flows(2))
+    single = func.create_flows_list([])
+    for element in flows(3) + flows(2):
+        single.add_referable(element)
+    assert to_json(bulk) == to_json(single)
+    # The generated id_shorts stay unique over several calls
+    assert len({element.id_short for element in bulk.value}) == 5
+
+def test_duplicate_id_short_adds_nothing(internals):
+    smc = model.SubmodelElementCollection(id_short="c", value=properties("x"))
+    with pytest.raises(model.AASConstraintViolation):
+        func.add_all(smc, properties("y", "x"))
+    with pytest.raises(model.AASConstraintViolation):
+        func.add_all(smc, properties("y", "y"))
+    if internals:
+        assert [element.id_short for element in smc.value] == ["x"]
+
+def test_list_constraints(internals):
+    sml = func.create_flows_list([])
+    with pytest.raises(model.AASConstraintViolation) as e:
+        func.add_all(sml, properties("x"))
+    assert e.value.constraint_id == 108
+    first, second = flows(2)
+    first.semantic_id = model.ExternalReference((model.Key(model.KeyTypes.GLOBAL_REFERENCE, "urn:a"),))
+    second.semantic_id = model.ExternalReference((model.Key(model.KeyTypes.GLOBAL_REFERENCE, "urn:b"),))
+    with pytest.raises(model.AASConstraintViolation) as e:
+        func.add_all(sml, [first, second])
+    assert e.value.constraint_id == 114
+
+def test_falls_back_for_foreign_hooks():
+    calls = []
+    smc = model.SubmodelElementCollection(id_short="c")
+    smc.value._item_add_hook = lambda element, existing: calls.append(element.id_short)
+    func.add_all(smc, properties("x", "y"))
+    assert calls == ["x", "y"]
+    assert not func._bulk_add_supported(smc)
+    assert func._bulk_add_supported(model.SubmodelElementCollection(id_short="c")) == func.BASYX_INTERNALS
@@ -0,0 +1,152 @@
+# Delta patches: applying the patch gives the AAS part of a full re-conversion
+import copy
+import json
+import os
+import random
+import zipfile
+import pytest
+import FPD2AAS
+import FPD_Delta
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAPPED = ("fpb:Product", "fpb:Energy", "fpb:Information", "fpb:ProcessOperator", "fpb:TechnicalResource")
+
+def load_fpd():
+    with open(os.path.join(REPO, "FPD.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def elements(doc):
+    return doc[1]["elementDataInformation"]
+
+def of_type(doc, *types):
+    return [el for el in elements(doc) if el["$type"] in types]
+
+def aas_part(path_aasx):
+    with zipfile.ZipFile(path_aasx) as package:
+        name = next(n for n in package.namelist() if n.startswith("aasx/data."))
+        return json.loads(package.read(name))
+
+def check(old, new, tmp_path):
+    """Asserts that the patch between old and new turns the old package into the new one; returns the patch."""
+    paths = {}
+    for label, doc in (("old", old), ("new", new)):
+        paths[label] = str(tmp_path / f"{label}.json")
+        with open(paths[label], "w", encoding="utf-8") as f:
+            json.dump(doc, f)
+        FPD2AAS.convert_file(paths[label], paths[label] + ".aasx", direct=True, write_json=True)
+    patch = json.loads(json.dumps(FPD_Delta.diff(old, new)))       # As written to and read from a file
+    path_patched = str(tmp_path / "patched.aasx")
+    FPD_Delta.apply_aasx(paths["old"] + ".aasx", patch, path_patched)
+    assert aas_part(path_patched) == aas_part(paths["new"] + ".aasx")
+    return patch
+
+def added_element(doc, template, n):
+    el = copy.deepcopy(template)
+    el["id"] = el["identification"]["uniqueIdent"] = f"added-{n}"
+    el["name"] = el["identification"]["shortName"] = f"Added_{n}"
+    return el
+
+def test_unchanged(tmp_path):
+    assert check(load_fpd(), load_fpd(), tmp_path)["operations"] == []
+
+def test_characteristic_change_is_one_operation(tmp_path):
+    old, new = load_fpd(), load_fpd()
+    product = next(el for el in of_type(new, "fpb:Product") if el.get("characteristics"))
+    product["characteristics"][0]["descriptiveElement"]["setpointValue"]["value"] += 1
+    ops = check(old, new, tmp_path)["operations"]
+    assert len(ops) == 1 and ops[0]["op"] == "replace"
+
+def test_added_characteristic(tmp_path):
+    old, new = load_fpd(), load_fpd()
+    product = next(el for el in of_type(new, "fpb:Product") if el.get("characteristics"))
+    product["characteristics"].append(copy.deepcopy(product["characteristics"][0]))
+    check(old, new, tmp_path)
+
+def test_added_element_with_relations(tmp_path):
+    old, new = load_fpd(), load_fpd()
+    product = of_type(new, "fpb:Product")[0]
+    operator = of_type(new, "fpb:ProcessOperator")[0]
+    el = added_element(new, product, 1)
+    elements(new).insert(elements(new).index(product) + 1, el)
+    elements(new).append({"$type": "fpb:Flow", "id": "added-flow", "sourceRef": el["id"], "targetRef": operator["id"]})
+    ops = check(old, new, tmp_path)["operations"]
+    assert {op["op"] for op in ops} == {"add"}
+
+def test_removed_element_with_relations(tmp_path):
+    old, new = load_fpd(), load_fpd()
+    removed = of_type(new, "fpb:TechnicalResource")[0]
+    new[1]["elementDataInformation"] = [el for el in elements(new) if removed["id"] not in
+                                        (el["id"], el.get("sourceRef"), el.get("targetRef"))]
+    ops = check(old, new, tmp_path)["operations"]
+    assert {op["op"] for op in ops} == {"remove"}
+
+def test_renamed_element(tmp_path):
+    # The flows and usages name their ends, so they change with it
+    old, new = load_fpd(), load_fpd()
+    el = of_type(new, "fpb:Information")[0]
+    el["name"] = "Renamed_I"
+    check(old, new, tmp_path)
+
+def test_type_change_and_reorder(tmp_path):
+    old, new = load_fpd(), load_fpd()
+    of_type(new, "fpb:Product")[0]["$type"] = "fpb:Energy"
+    elements(new).reverse()
+    check(old, new, tmp_path)
+
+def test_relation_changes(tmp_path):
+    old, new = load_fpd(), load_fpd()
+    flows = of_type(new, "fpb:Flow")
+    usages = of_type(new, "fpb:Usage")
+    flows[0]["sourceRef"], flows[0]["targetRef"] = flows[0]["targetRef"], flows[0]["sourceRef"]
+    elements(new).remove(flows[1])
+    elements(new).remove(usages[0])
+    elements(new).append({"$type": "fpb:Usage", "id": "added-usage",
+                          "sourceRef": of_type(new, "fpb:TechnicalResource")[0]["id"],
+                          "targetRef": of_type(new, "fpb:ProcessOperator")[-1]["id"]})
+    ops = check(old, new, tmp_path)["operations"]
+    assert all(op["path"][0] in ("flows", "usages") for op in ops)
+
+def test_project_information(tmp_path):
+    old, new = load_fpd(), load_fpd()
+    new[0]["name"] = "Another name"
+    ops = check(old, new, tmp_path)["operations"]
+    assert [op["path"][0] for op in ops] == ["projectInformation"]
+
+@pytest.mark.parametrize("seed", range(8))
+def test_random_edits(seed, tmp_path):
+    rng = random.Random(seed)
+    old, new = load_fpd(), load_fpd()
+    for n in range(rng.randint(1, 6)):
+        mapped = of_type(new, *MAPPED)
+        edit = rng.choice(("add", "remove", "rename", "setpoint", "type", "move", "flow"))
+        el = rng.choice(mapped)
+        if edit == "add":
+            elements(new).insert(rng.randrange(len(elements(new)) + 1), added_element(new, el, n))
+        elif edit == "remove":
+            elements(new).remove(el)
+        elif edit == "rename":
+            el["name"] = f"Renamed_{n}"
+        elif edit == "setpoint" and el.get("characteristics"):
+            el["characteristics"][0]["descriptiveElement"]["setpointValue"]["value"] = rng.random()
+        elif edit == "type" and el["$type"] in MAPPED[:3]:
+            el["$type"] = rng.choice(MAPPED[:3])
+        elif edit == "move":
+            elements(new).remove(el)
+            elements(new).insert(rng.randrange(len(elements(new)) + 1), el)
+        elif edit == "flow":
+            other = rng.choice(mapped)
+            elements(new).append({"$type": "fpb:Flow", "id": f"flow-{n}", "sourceRef": el["id"],
+                                  "targetRef": other["id"]})
+    check(old, new, tmp_path)
+
+def test_apply_aasx_rejects_xml_package(tmp_path):
+    path_aasx = str(tmp_path / "xml.aasx")
+    FPD2AAS.convert_file(os.path.join(REPO, "FPD.json"), path_aasx)
+    patch = FPD_Delta.diff(load_fpd(), load_fpd())
+    with pytest.raises(FPD_Delta.PatchError):
+        FPD_Delta.apply_aasx(path_aasx, patch, str(tmp_path / "out.aasx"))
+    assert not os.path.exists(tmp_path / "out.aasx")
+
+def test_apply_rejects_foreign_patch():
+    with pytest.raises(FPD_Delta.PatchError):
+        FPD_Delta.apply({"submodels": []}, {"format": "other", "version": 1, "operations": []})
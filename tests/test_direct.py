@@ -0,0 +1,37 @@
+# The direct emitter (--direct) against the basyx AASXWriter
+import os
+import zipfile
+import pytest
+import FPD2AAS
+import FPD_Generate
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def aas_part(path_aasx):
+    """Returns the name and content of the AAS part of a package."""
+    with zipfile.ZipFile(path_aasx) as package:
+        name = next(n for n in package.namelist() if n.startswith("aasx/data."))
+        return name, package.read(name)
+
+@pytest.fixture(scope="module", params=["FPD.json", "generated"])
+def path_json(request, tmp_path_factory):
+    if request.param == "FPD.json":
+        return os.path.join(REPO, "FPD.json")
+    # Several characteristics per element, so that characteristics_2, ... are emitted as well
+    path = str(tmp_path_factory.mktemp("direct") / "generated.json")
+    FPD_Generate.generate(500, seed=7, characteristics=3).write(path)
+    return path
+
+@pytest.mark.parametrize("write_json", [False, True], ids=["xml", "json"])
+@pytest.mark.parametrize("options", [{}, {"stream_input": True}], ids=["load", "stream"])
+def test_direct_output_equals_aasx_writer(path_json, write_json, options, tmp_path):
+    path_basyx = str(tmp_path / "basyx.aasx")
+    path_direct = str(tmp_path / "direct.aasx")
+    FPD2AAS.convert_file(path_json, path_basyx, write_json=write_json)
+    FPD2AAS.convert_file(path_json, path_direct, direct=True, write_json=write_json, **options)
+    assert aas_part(path_direct) == aas_part(path_basyx)
+    # The relationships and content types are written without AASXWriter; the packages match part by part
+    with zipfile.ZipFile(path_basyx) as basyx, zipfile.ZipFile(path_direct) as direct:
+        assert direct.namelist() == basyx.namelist()
+        for name in basyx.namelist():
+            assert direct.read(name) == basyx.read(name), name
@@ -0,0 +1,47 @@
+# The relation graph stored with --graph
+import json
+import os
+import zipfile
+import numpy as np
+import pytest
+import FPD2AAS
+import FPD_Graph
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATH_JSON = os.path.join(REPO, "FPD.json")
+
+def expected_graph():
+    with open(PATH_JSON, 'r', encoding='utf-8') as f:
+        return FPD_Graph.RelationGraph.from_elements(json.load(f)[1]["elementDataInformation"])
+
+def assert_same_graph(graph, expected):
+    assert sorted(graph.arrays) == sorted(expected.arrays)
+    for key, array in expected.arrays.items():
+        assert np.array_equal(graph.arrays[key], array), key
+
+@pytest.mark.parametrize("write_json", [False, True], ids=["xml", "json"])
+@pytest.mark.parametrize("direct", [False, True], ids=["basyx", "direct"])
+def test_from_aasx(direct, write_json, tmp_path):
+    path_aasx = str(tmp_path / "graph.aasx")
+    FPD2AAS.convert_file(PATH_JSON, path_aasx, direct=direct, write_json=write_json, graph=True)
+    assert_same_graph(FPD_Graph.RelationGraph.from_aasx(path_aasx), expected_graph())
+
+@pytest.mark.parametrize("write_json", [False, True], ids=["xml", "json"])
+def test_from_aasx_follows_file_element(write_json, tmp_path):
+    # The package writer may store the file under another name than GRAPH_PATH
+    path_aasx = str(tmp_path / "graph.aasx")
+    path_renamed = str(tmp_path / "renamed.aasx")
+    FPD2AAS.convert_file(PATH_JSON, path_aasx, write_json=write_json, graph=True)
+    old = FPD_Graph.GRAPH_PATH
+    new = old.replace(".npz", "_1.npz")
+    with zipfile.ZipFile(path_aasx) as source, zipfile.ZipFile(path_renamed, "w") as target:
+        for name in source.namelist():
+            data = source.read(name).replace(old.encode(), new.encode())
+            target.writestr(new.lstrip("/") if name == old.lstrip("/") else name, data)
+    assert_same_graph(FPD_Graph.RelationGraph.from_aasx(path_renamed), expected_graph())
+
+def test_from_aasx_without_graph(tmp_path):
+    path_aasx = str(tmp_path / "plain.aasx")
+    FPD2AAS.convert_file(PATH_JSON, path_aasx)
+    with pytest.raises(ValueError):
+        FPD_Graph.RelationGraph.from_aasx(path_aasx)
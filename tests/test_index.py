@@ -0,0 +1,72 @@
+# The element offset index of partial conversion
+import json
+import os
+import pytest
+import FPD_Generate
+import FPD_Index
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def path_json(tmp_path):
+    path = str(tmp_path / "generated.json")
+    FPD_Generate.generate(300, seed=3).write(path)
+    return path
+
+def columns(index):
+    return (list(index.ranges), list(index.codes), index.types, index.spans,
+            [list(getattr(index, name)) for name in FPD_Index.COLUMNS])
+
+def test_saved_index_equals_built(path_json):
+    built = FPD_Index.ElementOffsetIndex.build(path_json)
+    built.save()
+    with FPD_Index.ElementOffsetIndex.load(path_json) as loaded:
+        assert len(loaded) == len(built)
+        assert columns(loaded) == columns(built)
+        # Single values are read without decoding the whole column
+        for i in (0, len(built) // 2, len(built) - 1):
+            assert loaded.ids[i] == built.ids[i]
+            assert loaded.assigned[i] == built.assigned[i]
+            assert loaded.element(i) == built.element(i)
+        operator = next(element_id for element_id, code in zip(built.ids, built.codes)
+                        if built.types[code] == "ProcessOperator")
+        selection = FPD_Index.Selection(types=["Product"], assigned_to=[operator])
+        assert loaded.select(selection) == built.select(selection)
+        assert loaded.document(selection) == built.document(selection)
+    built.close()
+
+def test_file_without_elements_and_process(tmp_path):
+    path = str(tmp_path / "empty.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"name": "empty"}, {"elementDataInformation": []}], f)
+    with FPD_Index.open_index(path) as built:
+        assert len(built) == 0
+    with FPD_Index.ElementOffsetIndex.load(path) as loaded:
+        assert len(loaded) == 0 and list(loaded.ids) == []
+        assert loaded.project() == {"name": "empty"}
+        assert loaded.process() is None
+
+def test_invalid_index_is_rebuilt(path_json):
+    count = len(FPD_Index.ElementOffsetIndex.build(path_json))
+    with open(FPD_Index.index_path(path_json), "wb") as f:
+        f.write(b"FPDIDX01" + bytes(64))
+    with pytest.raises(ValueError):
+        FPD_Index.ElementOffsetIndex.load(path_json)
+    with FPD_Index.open_index(path_json) as index:
+        assert len(index) == count
+    with FPD_Index.ElementOffsetIndex.load(path_json) as loaded:
+        assert len(loaded) == count
+
+def test_saved_index_is_reused(path_json, monkeypatch):
+    built = FPD_Index.ElementOffsetIndex.build(path_json)
+    built.save()
+    built.close()
+
+    def build(path_json):
+        raise AssertionError("the saved index was rebuilt")
+
+    monkeypatch.setattr(FPD_Index.ElementOffsetIndex, "build", classmethod(lambda cls, path: build(path)))
+    with FPD_Index.open_index(path_json) as index:
+        assert index.fresh
+        assert tuple(index.source_stat) == tuple(built.source_stat)
+        assert index._index_map is not None         # Memory-mapped from the saved file
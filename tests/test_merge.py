@@ -0,0 +1,115 @@
+# Merging several projects with shared resource and information definitions
+import json
+import os
+import re
+import uuid
+import pytest
+import FPD2AAS
+import FPD2AAS_Functions as func
+import FPD2AAS_Publish
+import FPD_Merge
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UUID = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+CHANGED = "Demolding_TR"
+
+def load_fpd():
+    with open(os.path.join(REPO, "FPD.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+@pytest.fixture(scope="module")
+def paths(tmp_path_factory):
+    """
+    FPD.json and the same model exported on its own: every id differs, one
+    technical resource has another longName and one product another setpoint.
+    """
+    tmp = tmp_path_factory.mktemp("merge")
+    first = load_fpd()
+    text = UUID.sub(lambda m: str(uuid.uuid5(uuid.NAMESPACE_URL, m.group(0))), json.dumps(first))
+    second = json.loads(text)
+    second[0]["name"] = "Second project"
+    for el in second[1]["elementDataInformation"]:
+        if el.get("name") == CHANGED:
+            el["identification"]["longName"] = "Demolding station, second line"
+        if el["$type"] == "fpb:Product" and el.get("characteristics"):
+            el["characteristics"][0]["descriptiveElement"]["setpointValue"]["value"] += 1
+    result = []
+    for n, doc in enumerate((first, second), 1):
+        result.append(str(tmp / f"project{n}.json"))
+        with open(result[-1], "w", encoding="utf-8") as f:
+            json.dump(doc, f)
+    return result
+
+@pytest.fixture(scope="module")
+def merged(paths):
+    aas, submodels = FPD_Merge.build_merged_aas(paths)
+    return {submodel.id_short: submodel for submodel in submodels}
+
+def names(path, t):
+    with open(path, "r", encoding="utf-8") as f:
+        return [el["name"] for el in json.load(f)[1]["elementDataInformation"] if el["$type"] == f"fpb:{t}"]
+
+def to_json(element):
+    return json.loads(FPD2AAS_Publish.to_json(element))
+
+def test_independent_exports_share_definitions(paths, merged):
+    shared = {smc.id_short for smc in merged[FPD_Merge.SHARED_ID_SHORT].get_referable("process").value}
+    expected = set(names(paths[0], "Information")) | set(names(paths[0], "TechnicalResource")) - {CHANGED}
+    assert shared == expected
+    for n, path in enumerate(paths, 1):
+        submodel = merged[f"FPD_{n}"]
+        process = {element.id_short: element for element in submodel.get_referable("process").value}
+        ids = {smc.id_short: smc for smc in submodel.get_referable(FPD_Merge.SHARED_IDS_ID_SHORT).value}
+        assert set(ids) == shared
+        with open(path, "r", encoding="utf-8") as f:
+            elements = {el.get("name"): el for el in json.load(f)[1]["elementDataInformation"]}
+        for id_short in shared:
+            assert isinstance(process[id_short], func.model.ReferenceElement)
+            # Each project keeps its own ids of the shared definition
+            identification = ids[id_short].get_referable("identification")
+            assert identification.get_referable("uniqueIdent").value == elements[id_short]["id"]
+    # The shared entry holds no project's ids
+    entry = next(iter(merged[FPD_Merge.SHARED_ID_SHORT].get_referable("process").value))
+    assert entry.get_referable("identification").get_referable("uniqueIdent").value is None
+
+def test_other_definitions_stay_in_their_projects(paths, merged):
+    shared = {smc.id_short for smc in merged[FPD_Merge.SHARED_ID_SHORT].get_referable("process").value}
+    own = {CHANGED} | set(names(paths[0], "Product")) | set(names(paths[0], "ProcessOperator"))
+    assert not own & shared
+    for n in (1, 2):
+        process = {element.id_short: element for element in merged[f"FPD_{n}"].get_referable("process").value}
+        for id_short in own:
+            assert isinstance(process[id_short], func.model.SubmodelElementCollection)
+
+def test_single_project_shares_nothing(paths):
+    aas, submodels = FPD_Merge.build_merged_aas(paths[:1])
+    assert [submodel.id_short for submodel in submodels] == ["FPD_1"]
+    assert not submodels[0].submodel_element.contains_id("id_short", FPD_Merge.SHARED_IDS_ID_SHORT)
+
+def test_relations_reference_shared_entries(merged):
+    shared = {smc.id_short for smc in merged[FPD_Merge.SHARED_ID_SHORT].get_referable("process").value}
+    shared_id = merged[FPD_Merge.SHARED_ID_SHORT].id
+    into_shared = 0
+    for n in (1, 2):
+        submodel = merged[f"FPD_{n}"]
+        for name in ("flows", "usages"):
+            for relation in submodel.get_referable(name).value:
+                for end in relation.value:
+                    keys = end.value.key
+                    target = keys[-1].value
+                    assert keys[0].value == (shared_id if target in shared else submodel.id)
+                    into_shared += target in shared
+    assert into_shared
+
+def test_resolved_projects_equal_own_conversion(paths, merged):
+    shared = {entry["idShort"]: entry
+              for entry in to_json(merged[FPD_Merge.SHARED_ID_SHORT].get_referable("process"))["value"]}
+    for n, path in enumerate(paths, 1):
+        submodel = merged[f"FPD_{n}"]
+        ids = {entry["idShort"]: entry
+               for entry in to_json(submodel.get_referable(FPD_Merge.SHARED_IDS_ID_SHORT))["value"]}
+        process = to_json(submodel.get_referable("process"))
+        process["value"] = [FPD_Merge.resolve_shared(shared[entry["idShort"]], ids[entry["idShort"]])
+                            if entry["modelType"] == "ReferenceElement" else entry for entry in process["value"]]
+        _, own = FPD2AAS.build_aas(path, columnar=False)
+        assert process == to_json(own.get_referable("process"))
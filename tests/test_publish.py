@@ -0,0 +1,107 @@
+# The publisher against a stand-in AAS repository on localhost
+import json
+import os
+import time
+from concurrent.futures import Future
+import pytest
+import FPD2AAS
+import FPD2AAS_Publish
+from tests.standin import Repository
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATH_JSON = os.path.join(REPO, "FPD.json")
+
+@pytest.fixture
+def server():
+    server = Repository().start()
+    yield server
+    server.stop()
+
+@pytest.fixture(scope="module")
+def built():
+    return FPD2AAS.build_aas(PATH_JSON)
+
+def publisher(server, retries=2):
+    return FPD2AAS_Publish.Publisher(server.url, connections=2, retries=retries, backoff=0.01)
+
+def test_creates_with_post_after_404(server, built):
+    aas, submodels = built              # build_aas gives one submodel
+    with publisher(server) as p:
+        assert p.publish(aas, submodels) == aas.id
+    assert server.log == [("PUT", "submodels"), ("POST", "submodels"), ("PUT", "shells"), ("POST", "shells")]
+    assert server.stored["shells"] == {aas.id: json.loads(FPD2AAS_Publish.to_json(aas))}
+    assert server.stored["submodels"] == {submodels.id: json.loads(FPD2AAS_Publish.to_json(submodels))}
+
+def test_replaces_with_put_after_409(server, built):
+    # The answer to an earlier PUT was lost: the server has the submodel, but the PUT is answered with 404
+    aas, submodels = built
+    server.stored["submodels"][submodels.id] = {}
+    server.script = [(404, {})]
+    with publisher(server) as p:
+        p.publish(aas, submodels)
+    assert server.log[:3] == [("PUT", "submodels"), ("POST", "submodels"), ("PUT", "submodels")]
+    assert server.stored["submodels"][submodels.id] == json.loads(FPD2AAS_Publish.to_json(submodels))
+
+def test_retries_honour_retry_after(server, built):
+    aas, submodels = built
+    server.script = [(503, {"Retry-After": "0.3"}), (429, {})]
+    start = time.perf_counter()
+    with publisher(server) as p:
+        p.publish(aas, submodels)
+    assert time.perf_counter() - start >= 0.3
+    assert p.metrics.counters["http_retries"] == 2
+    assert server.log[:3] == [("PUT", "submodels")] * 3
+    assert aas.id in server.stored["shells"]
+
+def test_failures_propagate(server, built):
+    aas, submodels = built
+    # Retries used up
+    server.script = [(503, {})] * 3
+    with publisher(server) as p:
+        with pytest.raises(FPD2AAS_Publish.PublishError) as e:
+            p.publish(aas, submodels)
+    assert e.value.status == 503
+    assert server.stored["shells"] == {}
+    # A final answer is not retried, and the shell is not uploaded without its submodels
+    server.log.clear()
+    server.script = [(400, {})]
+    with publisher(server) as p:
+        with pytest.raises(FPD2AAS_Publish.PublishError) as e:
+            p.publish(aas, submodels)
+    assert e.value.status == 400
+    assert server.log == [("PUT", "submodels")]
+
+def test_publish_files_reports_failures(server):
+    server.script = [(400, {})]
+    lines = []
+    with publisher(server) as p:
+        failures = FPD2AAS_Publish.publish_files([PATH_JSON, PATH_JSON + ".missing"], p, report=lines.append)
+    assert [path for path, _ in failures] == [PATH_JSON + ".missing", PATH_JSON]
+    assert all(line.startswith("FAIL") for line in lines)
+
+class RecordingPublisher:
+    """Stands in for Publisher; its uploads finish as soon as they are waited for."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def submit(self, aas, submodels):
+        future = Future()
+        future.set_result(aas)
+        return future
+
+@pytest.mark.parametrize("window, expected", [
+    (1, ["build a", "OK a", "build b", "OK b", "build c", "OK c"]),
+    (2, ["build a", "build b", "OK a", "build c", "OK b", "OK c"]),
+])
+def test_publish_files_window(monkeypatch, window, expected):
+    events = []
+
+    def build_aas(path_json, **options):
+        events.append(f"build {path_json}")
+        return path_json, []
+
+    monkeypatch.setattr(FPD2AAS, "build_aas", build_aas)
+    FPD2AAS_Publish.publish_files(["a", "b", "c"], RecordingPublisher(events), window=window,
+                                  report=lambda line: events.append(" ".join(line.split()[:2])))
+    assert events == expected
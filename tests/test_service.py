@@ -0,0 +1,92 @@
+# The conversion service on localhost: conversion, 503 when full and 504 on timeout
+import asyncio
+import http.client
+import io
+import json
+import os
+import time
+import zipfile
+import FPD2AAS_Service
+import FPD_Generate
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def request(port, method, path, body=None):
+    """Sends one request and returns (status, headers, body)."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    try:
+        connection.request(method, path, body=body)
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+def run_service(check, **options):
+    """Runs check(service) as a coroutine against a started service with one worker."""
+    async def main():
+        service = FPD2AAS_Service.ConversionService(port=0, workers=1, **options)
+        await service.start()
+        try:
+            await check(service)
+        finally:
+            await service.close()
+    asyncio.run(main())
+
+def fpd_body():
+    with open(os.path.join(REPO, "FPD.json"), "rb") as f:
+        return f.read()
+
+def test_convert_and_download_name():
+    body = fpd_body()
+
+    async def check(service):
+        status, headers, payload = await asyncio.to_thread(request, service.port, "POST", "/convert?name=plant-1", body)
+        assert status == 200
+        assert headers["Content-Type"] == FPD2AAS_Service.AASX_CONTENT_TYPE
+        assert headers["Content-Disposition"] == 'attachment; filename="plant-1.aasx"'
+        with zipfile.ZipFile(io.BytesIO(payload)) as package:
+            assert any(name.startswith("aasx/data.") for name in package.namelist())
+
+        # Names that could split the header or cannot be encoded fall back to the default
+        for name in ("a%0d%0aX-Injected:%201", "x%22%3B%20b", "na%C3%AFve"):
+            status, headers, _ = await asyncio.to_thread(request, service.port, "POST", f"/convert?name={name}", body)
+            assert status == 200
+            assert headers["Content-Disposition"] == 'attachment; filename="FPD.aasx"'
+            assert "X-Injected" not in headers
+
+        status, _, health = await asyncio.to_thread(request, service.port, "GET", "/health")
+        assert status == 200 and json.loads(health)["running"] == 0
+        status, _, _ = await asyncio.to_thread(request, service.port, "GET", "/convert")
+        assert status == 405
+        status, _, _ = await asyncio.to_thread(request, service.port, "POST", "/convert", b"[]")
+        assert status == 422
+    run_service(check, queue=0)
+
+def test_timeout_keeps_the_slot_until_the_job_finishes(tmp_path):
+    path_big = tmp_path / "big.json"
+    FPD_Generate.generate(5000, seed=1).write(str(path_big))
+    big = path_big.read_bytes()
+    small = fpd_body()
+
+    async def check(service):
+        service.timeout = 0.2
+        status, _, _ = await asyncio.to_thread(request, service.port, "POST", "/convert", big)
+        assert status == 504
+        service.timeout = 60.0
+
+        # The timed-out job still occupies the only worker, and queue=0 allows no waiting
+        status, _, health = await asyncio.to_thread(request, service.port, "GET", "/health")
+        assert json.loads(health)["running"] == 1
+        status, headers, _ = await asyncio.to_thread(request, service.port, "POST", "/convert", small)
+        assert status == 503
+        assert headers["Retry-After"] == "1"
+
+        deadline = time.monotonic() + 120
+        while json.loads((await asyncio.to_thread(request, service.port, "GET", "/health"))[2])["running"]:
+            assert time.monotonic() < deadline
+            await asyncio.sleep(0.1)
+        status, _, _ = await asyncio.to_thread(request, service.port, "POST", "/convert", small)
+        assert status == 200
+        assert service.metrics.counters["conversions_timed_out"] == 1
+        assert service.metrics.counters["requests_rejected"] == 1
+    run_service(check, queue=0)
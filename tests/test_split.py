@@ -0,0 +1,37 @@
+# Split output: the index submodel maps element ids to the part submodels
+import json
+import os
+import pytest
+import FPD
+import FPD2AAS
+import FPD_Split
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATH_JSON = os.path.join(REPO, "FPD.json")
+
+def process_ids(submodel):
+    return {element.id_short for element in submodel.get_referable("process").value}
+
+@pytest.mark.parametrize("mode", FPD_Split.MODES)
+def test_index_finds_submodel_of_element(mode):
+    aas, submodels = FPD2AAS.build_split_aas(PATH_JSON, mode, size=3, columnar=False)
+    index, parts = submodels[0], {submodel.id: submodel for submodel in submodels[1:]}
+    entries = FPD_Split.read_index(index)
+    assert [entry.submodel for entry in entries] == list(parts)
+    assert sum(entry.count for entry in entries) == sum(len(entry.elements) for entry in entries)
+
+    with open(PATH_JSON, "r", encoding="utf-8") as f:
+        elements = FPD.ElementIndex(json.load(f)[1]["elementDataInformation"])
+    mapped = list(FPD.mapped_elements(elements))
+    assert mapped
+    for el in mapped:
+        submodel_id = FPD_Split.find_submodel(entries, el.id)
+        # The element's collection is in the process of that submodel
+        assert el.name in process_ids(parts[submodel_id]), (mode, el.id)
+    assert FPD_Split.find_submodel(entries, "no such id") is None
+
+def test_size_index_positions():
+    aas, submodels = FPD2AAS.build_split_aas(PATH_JSON, "size", size=3, columnar=False)
+    entries = FPD_Split.read_index(submodels[0])
+    assert [entry.first for entry in entries] == [3 * n for n in range(len(entries))]
+    assert all(entry.count == len(entry.elements) for entry in entries)
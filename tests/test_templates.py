@@ -0,0 +1,69 @@
+# Stamped collections against collections built with the basyx constructors
+import datetime
+import json
+import pytest
+from basyx.aas import model
+from basyx.aas.adapter.json import json_serialization
+import FPD2AAS_Functions as func
+
+def to_json(element):
+    return json.dumps(element, cls=json_serialization.AASToJsonEncoder)
+
+def sample_values(template):
+    """One value per Property of the template, of its value type."""
+    values = []
+    for i, value_type in enumerate(template.value_types):
+        if value_type is model.datatypes.Double:
+            values.append(i + 0.5)
+        elif value_type is model.datatypes.DateTime:
+            values.append(datetime.datetime(2024, 1, i % 28 + 1, tzinfo=datetime.timezone.utc))
+        else:
+            values.append(f"value {i}")
+    return values
+
+TEMPLATES = [
+    (func.state_template, func.create_state_collection),
+    (func.process_operator_template, func.create_process_operator_collection),
+    (func.technical_resource_template, func.create_technical_resource_collection),
+]
+
+def test_basyx_internals_supported():
+    # The fast paths are written against the pinned basyx release
+    assert func.BASYX_INTERNALS
+
+@pytest.mark.parametrize("template, create", TEMPLATES)
+@pytest.mark.parametrize("trusted", [False, True])
+def test_stamped_collection_equals_built(template, create, trusted, internals):
+    values = sample_values(template)
+    stamped = template.stamp_values("Element_1", values, trusted)
+    fields = dict(zip(template.fields, values))
+    state_type = fields.pop("state_type", None)
+    built = create("Element_1", **fields)
+    if state_type is not None:
+        # create_state_collection always leaves stateType empty
+        built.get_referable("stateType").value = state_type
+    assert to_json(stamped) == to_json(built)
+
+@pytest.mark.parametrize("template, create", TEMPLATES)
+def test_stamped_collection_with_empty_values(template, create, internals):
+    assert to_json(template.stamp("Element_1")) == to_json(create("Element_1"))
+
+@pytest.mark.parametrize("template, factory", [(func.flow_template, func.add_flow),
+                                               (func.usage_template, func.add_usage)])
+def test_stamped_relation_equals_built(template, factory, internals):
+    assert to_json(template.stamp("FPD_1", "a", "b", "FPD_2")) == to_json(factory("FPD_1", "a", "b", "FPD_2"))
+    assert to_json(template.stamp("FPD", "a", "b")) == to_json(factory("FPD", "a", "b"))
+
+def test_stamped_collection_is_a_working_namespace(internals):
+    smc = func.state_template.stamp("Element_1", long_name_ident="long")
+    identification = smc.get_referable("identification")
+    assert identification.parent is smc
+    assert identification.get_referable("longName").value == "long"
+    with pytest.raises(model.AASConstraintViolation):
+        smc.add_referable(model.Property(id_short="identification", value_type=model.datatypes.String))
+    process = func.create_process_collection("process", [smc])
+    assert smc.parent is process
+    # Stamps share nothing mutable with each other or with the prototype
+    other = func.state_template.stamp("Element_2")
+    assert other.get_referable("identification").get_referable("longName").value is None
+    assert func.state_template.prototype.get_referable("identification").get_referable("longName").value is None
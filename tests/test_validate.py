@@ -0,0 +1,87 @@
+# Validation reports every problem at once; validated input builds the same without the basyx checks
+import json
+import os
+import pytest
+from basyx.aas.adapter.json import json_serialization
+import FPD2AAS
+import FPD_Generate
+import FPD_Validate
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATH_JSON = os.path.join(REPO, "FPD.json")
+
+def load():
+    with open(PATH_JSON, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def of_type(doc, fpd_type):
+    return [el for el in doc[1]["elementDataInformation"] if el["$type"] == fpd_type]
+
+def broken_document():
+    """
+    FPD.json with one of each problem; returns the document and the expected (element, field) pairs.
+    """
+    doc = load()
+    flow, usage = of_type(doc, "fpb:Flow")[0], of_type(doc, "fpb:Usage")[0]
+    products = of_type(doc, "fpb:Product")
+    del flow["sourceRef"]
+    del usage["targetRef"]
+    products[1]["name"] = products[0]["name"]
+    products[2]["name"] = "not valid"
+    measured = next(el for el in products if el.get("characteristics"))
+    measured["characteristics"][0]["descriptiveElement"]["setpointValue"]["value"] = "abc"
+    expected = {
+        (flow["id"], "sourceRef"),
+        (usage["id"], "targetRef"),
+        (products[2]["id"], "name"),
+        (measured["id"], "characteristics[0].descriptiveElement.setpointValue.value"),
+    }
+    return doc, expected, products[:2]
+
+def test_valid_documents():
+    assert FPD_Validate.validate_document(load()).ok
+    assert FPD_Validate.validate_document(FPD_Generate.generate(500, seed=1).document()).ok
+
+def test_all_problems_reported_at_once():
+    doc, expected, duplicates = broken_document()
+    report = FPD_Validate.validate_document(doc)
+    problems = {(problem.element, problem.field) for problem in report}
+    assert len(report) == len(expected) + 1
+    assert expected <= problems
+    # The duplicate idShort is reported on one of the two elements using it
+    (duplicate,) = problems - expected
+    assert duplicate[1] == "name" and duplicate[0] in {el["id"] for el in duplicates}
+
+def test_every_broken_name_reported():
+    doc = FPD_Generate.generate(2000, seed=0).document()
+    named = [el for el in doc[1]["elementDataInformation"] if "name" in el]
+    for el in named[::100]:
+        el["name"] = "not valid"
+    report = FPD_Validate.validate_document(doc)
+    assert {(problem.element, problem.field) for problem in report} == {(el["id"], "name") for el in named[::100]}
+
+@pytest.mark.parametrize("stream_input", [False, True])
+def test_validation_error_lists_all_problems(tmp_path, stream_input):
+    doc, expected, _ = broken_document()
+    path = str(tmp_path / "broken.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f)
+    with pytest.raises(FPD_Validate.ValidationError) as error:
+        FPD2AAS.build_aas(path, stream_input=stream_input, validate=True)
+    assert len(error.value.report) == len(expected) + 1
+    message = str(error.value)
+    assert all(element in message for element, _ in expected)
+
+def serialized(path, **kwargs):
+    aas, submodel = FPD2AAS.build_aas(path, columnar=False, **kwargs)
+    return json.dumps(submodel, cls=json_serialization.AASToJsonEncoder)
+
+@pytest.mark.parametrize("stream_input", [False, True])
+def test_trusted_build_matches_default(tmp_path, stream_input):
+    path = str(tmp_path / "generated.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(FPD_Generate.generate(1000, seed=2).document(), f)
+    for source in (PATH_JSON, path):
+        default = serialized(source, stream_input=stream_input)
+        assert serialized(source, stream_input=stream_input, trusted=True) == default
+        assert serialized(source, stream_input=stream_input, validate=True) == default
@@ -0,0 +1,97 @@
+# Watch mode: debounce, change detection by hash and the state kept across restarts
+import os
+import shutil
+import pytest
+import FPD2AAS_Watch
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def folder(tmp_path):
+    inputs = tmp_path / "inputs"
+    inputs.mkdir()
+    shutil.copy(os.path.join(REPO, "FPD.json"), inputs / "model.json")
+    return tmp_path
+
+def watcher(folder, **options):
+    """A watcher whose scans are driven with an explicit clock (scan(now=...))."""
+    options.setdefault("debounce", 2.0)
+    return FPD2AAS_Watch.Watcher([str(folder / "inputs")], str(folder / "out"), jobs=1,
+                                 report=lambda message: None, **options)
+
+def rewrite(path, extra):
+    """Changes the content (and so the size) of an FPD JSON file."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(" " * extra)
+
+def test_debounce(folder):
+    w = watcher(folder)
+    path = str(folder / "inputs" / "model.json")
+    assert w.scan(now=0.0) == 0         # First seen
+    assert w.scan(now=1.0) == 0         # Not settled yet
+    rewrite(path, 1)                    # Still being written: the wait starts again
+    assert w.scan(now=1.5) == 0
+    assert w.scan(now=3.0) == 0
+    assert w.scan(now=3.6) == 1
+    assert [entry[0] for entry in w._queue] == [path]
+    assert w.scan(now=10.0) == 0        # Queued once
+    w.close()
+
+def test_unchanged_content_is_not_converted_again(folder):
+    w = watcher(folder)
+    path = str(folder / "inputs" / "model.json")
+    assert w.run_once() == 0
+    record = dict(w.files[path])
+    assert os.path.exists(record["output"])
+    assert w.scan(now=0.0) == 0
+
+    # Touching changes the modification time only: hashed once, then recorded as unchanged
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert w.scan(now=10.0) == 0
+    assert w.scan(now=12.5) == 0
+    assert w.metrics.counters["files_unchanged"] == 1
+    assert w.files[path]["stat"] != record["stat"]
+    assert w.files[path]["sha256"] == record["sha256"]
+    assert w.scan(now=20.0) == 0        # Up to date by stat again: not hashed
+
+    rewrite(path, 1)
+    assert w.scan(now=30.0) == 0
+    assert w.scan(now=32.5) == 1
+    w.close()
+
+def test_restart_keeps_state(folder):
+    path = str(folder / "inputs" / "model.json")
+    first = watcher(folder)
+    assert first.run_once() == 0
+    first.close()
+    assert os.path.exists(folder / "out" / FPD2AAS_Watch.STATE_NAME)
+
+    # Nothing changed while it was stopped
+    second = watcher(folder)
+    assert second.files[path]["sha256"] == first.files[path]["sha256"]
+    assert second.scan(now=0.0) == 0 and second.scan(now=5.0) == 0
+    second.close()
+
+    # A file changed while it was stopped is converted once settled
+    rewrite(path, 1)
+    third = watcher(folder)
+    assert third.scan(now=0.0) == 0
+    assert third.scan(now=2.5) == 1
+    third.close()
+
+    # Other conversion options convert every file again
+    fourth = watcher(folder, debounce=0, write_json=True)
+    assert fourth.files == {}
+    assert fourth.scan(now=0.0) == 1
+    fourth.close()
+
+def test_removed_file_is_forgotten(folder):
+    path = str(folder / "inputs" / "model.json")
+    w = watcher(folder)
+    assert w.run_once() == 0
+    os.remove(path)
+    w.scan(now=0.0)
+    assert path not in w.files
+    assert w.metrics.counters["files_removed"] == 1
+    w.close()